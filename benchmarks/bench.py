@@ -0,0 +1,272 @@
+"""
+PersonaOCEAN benchmark suite
+
+Measures the hot paths on synthetic data and writes machine-readable results:
+- matcher: compiled batch matching and single-member matching (10–1,000,000
+  members × 10–10,000 roles)
+- aggregates: full recompute (entry dicts and columnar table) vs O(1) incremental
+  update of per-guild aggregates
+- facets: normalize_facets_payload on bigfive-web style payloads
+
+Each case reports ops/sec (one op = one call of the measured function) and peak
+traced memory in bytes. Use --compare to flag regressions against a baseline.
+
+Usage:
+  python benchmarks/bench.py --quick --out bench_results.json
+  python benchmarks/bench.py --out new.json --compare bench_baseline.json --threshold 0.15
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from persona.aggregates import GuildAggregates  # noqa: E402
+from persona.columnar import GuildTable  # noqa: E402
+from persona.facets import FACET_MAP, FACET_NAMES, normalize_facets_payload  # noqa: E402
+from persona.matcher import compile_roles, match_one, match_roles_batch  # noqa: E402
+
+MEMBER_SIZES = (10, 1_000, 100_000, 1_000_000)
+ROLE_SIZES = (10, 100, 1_000, 10_000)
+# Skip batch grid points whose (members × roles) score matrix would be too large
+MAX_SCORE_CELLS = 100_000_000
+QUICK_MAX_MEMBERS = 100_000
+QUICK_MAX_ROLES = 1_000
+SEED = 1234
+
+# name -> (params, setup) where setup() returns the zero-arg callable to measure
+Case = tuple[str, dict, Callable[[], Callable[[], object]]]
+
+
+# --- Synthetic data ---
+def synthetic_roles(n: int, seed: int = SEED, *, facets: bool = False) -> dict:
+    rng = random.Random(seed)
+    depts = [f"Dept {i}" for i in range(max(1, n // 10))]
+    roles = {
+        f"Role{i}": {
+            "pattern": {t: round(rng.uniform(-1.0, 1.0), 2) for t in "OCEAN"},
+            "dept": rng.choice(depts),
+            "desc": f"Synthetic role {i}",
+        }
+        for i in range(n)
+    }
+    if facets:
+        for role in roles.values():
+            role["facet_pattern"] = {name: round(rng.uniform(-1.0, 1.0), 2) for name in rng.sample(FACET_NAMES, 4)}
+    return roles
+
+
+def synthetic_scores(n: int, seed: int = SEED) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 121, size=(n, 5)).astype(np.float64)
+
+
+def synthetic_facets(n: int, seed: int = SEED) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(-1.0, 1.0, size=(n, len(FACET_NAMES)))
+
+
+def synthetic_registry(n: int, roles: dict, seed: int = SEED) -> dict[int, dict]:
+    compiled = compile_roles(roles)
+    scores = synthetic_scores(n, seed)
+    result = match_roles_batch(compiled, scores)
+    names, depts = result.names(), result.depts()
+    ints = scores.astype(int).tolist()
+    return {
+        uid: {"traits": dict(zip("OCEAN", ints[uid])), "role": names[uid], "dept": depts[uid]}
+        for uid in range(n)
+    }
+
+
+def bigfive_payload(rng: random.Random, *, junk: int = 0) -> dict:
+    facets = {
+        domain: {name.lower(): rng.random() for name in names}
+        for domain, names in FACET_MAP.items()
+    }
+    for i in range(junk):
+        facets.setdefault("extra", {})[f"unknown-{i}"] = "n/a"
+    return {"domains": {d: rng.random() for d in FACET_MAP}, "facets": facets}
+
+
+# --- Cases ---
+def iter_cases(quick: bool) -> Iterator[Case]:
+    members = [m for m in MEMBER_SIZES if not quick or m <= QUICK_MAX_MEMBERS]
+    role_sizes = [r for r in ROLE_SIZES if not quick or r <= QUICK_MAX_ROLES]
+
+    for r in role_sizes:
+        for m in members:
+            if m * r > MAX_SCORE_CELLS:
+                continue
+
+            def setup(m=m, r=r):
+                compiled = compile_roles(synthetic_roles(r))
+                scores = synthetic_scores(m)
+                return lambda: match_roles_batch(compiled, scores)
+
+            yield f"matcher.batch[m={m},r={r}]", {"members": m, "roles": r}, setup
+
+        def setup_single(r=r):
+            compiled = compile_roles(synthetic_roles(r))
+            row = synthetic_scores(1)[0].tolist()
+            return lambda: match_one(compiled, *row)
+
+        yield f"matcher.single[r={r}]", {"roles": r}, setup_single
+
+        def setup_single_facets(r=r):
+            compiled = compile_roles(synthetic_roles(r, facets=True))
+            row = synthetic_scores(1)[0].tolist()
+            facets = synthetic_facets(1)[0]
+            return lambda: match_one(compiled, *row, facets=facets)
+
+        yield f"matcher.single_facets[r={r}]", {"roles": r, "facets": True}, setup_single_facets
+
+        def setup_topk(r=r):
+            compiled = compile_roles(synthetic_roles(r))
+            scores = synthetic_scores(1_000)
+            return lambda: match_roles_batch(compiled, scores, top_k=5)
+
+        yield f"matcher.top5[m=1000,r={r}]", {"members": 1_000, "roles": r, "top_k": 5}, setup_topk
+
+    roles = synthetic_roles(10)
+    for m in members:
+        def setup_build(m=m):
+            entries = list(synthetic_registry(m, roles).values())
+            return lambda: GuildAggregates.from_entries(entries)
+
+        yield f"aggregates.recompute[m={m}]", {"members": m}, setup_build
+
+        def setup_table(m=m):
+            table = GuildTable.from_entries(synthetic_registry(m, roles))
+            return lambda: GuildAggregates.from_table(table)
+
+        yield f"aggregates.recompute_table[m={m}]", {"members": m}, setup_table
+
+        def setup_update(m=m):
+            registry = synthetic_registry(m, roles)
+            agg = GuildAggregates.from_entries(registry.values())
+            entry = registry[0]
+
+            def op():
+                agg.remove(entry)
+                agg.add(entry)
+                return agg.averages()
+
+            return op
+
+        yield f"aggregates.update[m={m}]", {"members": m}, setup_update
+
+    rng = random.Random(SEED)
+    payload = bigfive_payload(rng)
+    noisy = bigfive_payload(rng, junk=200)
+    many = [bigfive_payload(rng) for _ in range(1_000)]
+    yield "facets.normalize[payload=1]", {"payloads": 1}, lambda: (lambda: normalize_facets_payload(payload))
+    yield "facets.normalize[payload=1,junk=200]", {"payloads": 1, "junk": 200}, lambda: (lambda: normalize_facets_payload(noisy))
+    yield "facets.normalize[payload=1000]", {"payloads": 1_000}, lambda: (lambda: [normalize_facets_payload(p) for p in many])
+
+
+# --- Measurement ---
+def measure_speed(fn: Callable[[], object], min_time: float) -> float:
+    fn()  # warm-up
+    reps = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        fn()
+        reps += 1
+        elapsed = time.perf_counter() - start
+    return reps / elapsed
+
+
+def measure_peak(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(quick: bool, min_time: float, pattern: str | None) -> dict:
+    results: dict[str, dict] = {}
+    for name, params, setup in iter_cases(quick):
+        if pattern and pattern not in name:
+            continue
+        fn = setup()
+        ops = measure_speed(fn, min_time)
+        peak = measure_peak(fn)
+        results[name] = {"params": params, "ops_per_sec": round(ops, 3), "peak_bytes": peak}
+        print(f"{name:<48} {ops:>14,.1f} ops/s  {peak / 1024:>12,.1f} KiB peak", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+            "min_time": min_time,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return human-readable regression lines (slower or hungrier by more than threshold)."""
+    regressions = []
+    base = baseline.get("results", {})
+    for name, cur in current["results"].items():
+        old = base.get(name)
+        if not old:
+            continue
+        if old["ops_per_sec"] > 0:
+            change = cur["ops_per_sec"] / old["ops_per_sec"] - 1.0
+            if change < -threshold:
+                regressions.append(f"{name}: ops/sec {old['ops_per_sec']:,.1f} → {cur['ops_per_sec']:,.1f} ({change:+.1%})")
+        if old["peak_bytes"] > 0:
+            change = cur["peak_bytes"] / old["peak_bytes"] - 1.0
+            if change > threshold:
+                regressions.append(f"{name}: peak {old['peak_bytes']:,} B → {cur['peak_bytes']:,} B ({change:+.1%})")
+    return regressions
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="PersonaOCEAN benchmarks")
+    parser.add_argument("--quick", action="store_true", help=f"cap sizes at {QUICK_MAX_MEMBERS:,} members / {QUICK_MAX_ROLES:,} roles")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to run each case (default: 0.2)")
+    parser.add_argument("-k", "--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--out", default="bench_results.json", help="results JSON path (default: bench_results.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change that counts as a regression (default: 0.15)")
+    args = parser.parse_args(argv)
+
+    report = run(args.quick, args.min_time, args.filter)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        report["comparison"] = {"baseline": args.compare, "threshold": args.threshold, "regressions": regressions}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Wrote {len(report['results'])} result(s) to {args.out}", file=sys.stderr)
+
+    if args.compare:
+        if report["comparison"]["regressions"]:
+            for line in report["comparison"]["regressions"]:
+                print(f"❌ Regression: {line}", file=sys.stderr)
+            return 2
+        print("✅ No regressions against baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,112 @@
+"""
+PersonaOCEAN role ranking correctness check
+
+Compares match_one and the chunked top-k ranking in match_roles_batch against a
+stable sort of the full score matrix: same roles, same order, same scores, for
+k=1 and top-k, with and without facets, including tie-heavy role sets
+(duplicated and coarsely rounded patterns) where the first-listed role must
+still win.
+
+Exits non-zero and prints the first mismatches if the two ever disagree.
+
+Usage:
+  python benchmarks/check_ranking.py
+  python benchmarks/check_ranking.py --roles 20000 --queries 500 --seed 7
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from persona.matcher import (  # noqa: E402
+    TIE_DECIMALS,
+    CompiledRoles,
+    compile_roles,
+    match_one,
+    match_roles_batch,
+    score_matrix,
+)
+
+from bench import synthetic_facets, synthetic_roles, synthetic_scores  # noqa: E402
+
+
+def tie_heavy_roles(n: int, seed: int) -> dict:
+    """Roles with few distinct patterns (one decimal), so many exact ties."""
+    roles = synthetic_roles(n, seed, facets=True)
+    rng = np.random.default_rng(seed)
+    base = [dict(r["pattern"]) for r in list(roles.values())[:50]]
+    for role in roles.values():
+        role["pattern"] = {t: round(v, 1) for t, v in base[int(rng.integers(len(base)))].items()}
+    return roles
+
+
+def reference(compiled: CompiledRoles, scores: np.ndarray, facets, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k by scoring every role: rounded score descending, then role order."""
+    sims = score_matrix(compiled, scores, facets)
+    order = np.argsort(-np.round(sims, TIE_DECIMALS), axis=1, kind="stable")[:, :k]
+    return order, np.take_along_axis(sims, order, axis=1)
+
+
+def check(label: str, compiled: CompiledRoles, scores: np.ndarray, facets, k: int) -> int:
+    want_idx, want_scores = reference(compiled, scores, facets, k + 1)
+    failures = 0
+    for i, row in enumerate(scores.tolist()):
+        # match_one takes facets=None for members without facet data
+        fr = None if facets is None or np.isnan(facets[i]).any() else facets[i]
+        name, _, _, score = match_one(compiled, *row, facets=fr)
+        if name != compiled.names[want_idx[i, 0]] or not np.isclose(score, want_scores[i, 0], rtol=0, atol=1e-12):
+            failures += 1
+            if failures <= 5:
+                print(f"  {label} match_one row {i}: got {name} {score!r}, want "
+                      f"{compiled.names[want_idx[i, 0]]} {want_scores[i, 0]!r}")
+    # Ranked per row with k+1 candidates for the margins
+    for start in range(0, len(scores), 16):
+        block = slice(start, start + 16)
+        fb = None if facets is None else facets[block]
+        got = match_roles_batch(compiled, scores[block], top_k=k, facets=fb)
+        want = want_idx[block, :k]
+        bad = np.flatnonzero((got.index != want).any(axis=1))
+        for j in bad.tolist():
+            failures += 1
+            if failures <= 5:
+                print(f"  {label} top{k} row {start + j}: got {got.index[j].tolist()}, want {want[j].tolist()}")
+        margins = want_scores[block, :k] - want_scores[block, 1:k + 1]
+        if not np.allclose(got.margin, margins, rtol=0, atol=1e-12):
+            failures += 1
+            print(f"  {label} top{k} rows {start}..: margins differ")
+    return failures
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Check role ranking against a full sort of every score")
+    p.add_argument("--roles", type=int, default=10_000)
+    p.add_argument("--queries", type=int, default=300)
+    p.add_argument("--seed", type=int, default=1234)
+    args = p.parse_args(argv)
+
+    scores = synthetic_scores(args.queries, args.seed)
+    facets = synthetic_facets(args.queries, args.seed + 1)
+    facets[::3] = np.nan  # a third of the members have no facet data
+    suites = [
+        ("random", compile_roles(synthetic_roles(args.roles, args.seed, facets=True))),
+        ("ties", compile_roles(tie_heavy_roles(args.roles, args.seed))),
+    ]
+    failures = 0
+    for name, compiled in suites:
+        for k in (1, 5):
+            for with_facets in (False, True):
+                label = f"{name} k={k}{' facets' if with_facets else ''}"
+                n = check(label, compiled, scores, facets if with_facets else None, k)
+                print(f"{label}: {'ok' if not n else f'{n} mismatches'}")
+                failures += n
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,106 @@
+"""
+PersonaOCEAN /teams partition check
+
+Splits synthetic guilds into k = 2..10 teams with persona.teams.partition and
+checks what /teams promises:
+- team sizes and every department's count differ by at most one between teams
+- the search never ends below its greedy seed, nor above the ceiling (the index
+  of everyone together, which no split can beat)
+- the weakest team is at least as good as in a random equal-size split
+- each split finishes within --max-ms (default 1000, for the default 5,000 members)
+
+Traits are drawn per department around skewed means, so the index stays below
+1.0 and splits actually differ (uniform scores average out to a perfect index).
+
+Exits non-zero and prints the failing cases.
+
+Usage:
+  python benchmarks/check_teams.py
+  python benchmarks/check_teams.py --members 20000 --depts 40 --max-ms 3000 --seed 7
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from persona.teams import TOLERANCE, dept_spread, partition, teamwork_index  # noqa: E402
+
+
+def skewed_guild(n: int, depts: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """(n, 5) uint8 traits and department codes: uneven department sizes, each with
+    its own high-leaning means (and low A) so teams can't all reach 1.0."""
+    rng = np.random.default_rng(seed)
+    codes = rng.choice(depts, size=n, p=rng.dirichlet(np.ones(depts))).astype(np.int32)
+    means = rng.uniform(70, 118, size=(depts, 5))
+    means[:, 3] -= 60
+    traits = np.clip(rng.normal(means[codes], 18), 0, 120).astype(np.uint8)
+    return traits, codes
+
+
+def random_min(traits: np.ndarray, k: int, rng: np.random.Generator) -> float:
+    team_of = rng.permutation(len(traits)) % k
+    sums = np.zeros((k, 5))
+    np.add.at(sums, team_of, traits.astype(np.float64))
+    return float(teamwork_index(sums, np.bincount(team_of, minlength=k)).min())
+
+
+def check(label: str, traits: np.ndarray, depts: np.ndarray, k: int, max_ms: float, seed: int) -> int:
+    start = time.perf_counter()
+    team_of, stats = partition(traits, depts, k, seed=seed)
+    took = (time.perf_counter() - start) * 1000
+    baseline = random_min(traits, k, np.random.default_rng(seed))
+    sizes = np.bincount(team_of, minlength=k)
+    problems = []
+    if team_of.min() < 0 or team_of.max() >= k or len(sizes) != k:
+        problems.append(f"team ids outside 0..{k - 1}")
+    if sizes.max() - sizes.min() > 1:
+        problems.append(f"sizes {sizes.min()}..{sizes.max()}")
+    if dept_spread(depts, team_of, k) > 1:
+        problems.append(f"department spread {dept_spread(depts, team_of, k)}")
+    if stats["min"] < stats["seed_min"] - 1e-4:
+        problems.append(f"search ended below its seed ({stats['seed_min']} -> {stats['min']})")
+    if stats["min"] > stats["ceiling"] + 1e-4:
+        problems.append(f"weakest team {stats['min']} above the ceiling {stats['ceiling']}")
+    if stats["min"] < baseline - TOLERANCE:
+        problems.append(f"weakest team {stats['min']} below a random split's {baseline:.4f}")
+    if took > max_ms:
+        problems.append(f"took {took:.0f} ms")
+    print(
+        f"{label} k={k}: seed {stats['seed_min']:.4f} -> {stats['min']:.4f} "
+        f"(ceiling {stats['ceiling']:.4f}, random {baseline:.4f}), {stats['swaps']} swaps, "
+        f"{stats['stopped']}, {took:.0f} ms{'' if not problems else ' FAIL: ' + '; '.join(problems)}"
+    )
+    return len(problems)
+
+
+def main(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Check /teams splits for balance, quality and time")
+    p.add_argument("--members", type=int, default=5000)
+    p.add_argument("--depts", type=int, default=12)
+    p.add_argument("--max-ms", type=float, default=1000.0)
+    p.add_argument("--seed", type=int, default=1234)
+    args = p.parse_args(argv)
+
+    suites = [
+        (f"{args.members} members", *skewed_guild(args.members, args.depts, args.seed)),
+        ("one department", *skewed_guild(args.members, 1, args.seed + 1)),
+        # Small guilds: few members per team, where the swap search does most of the work
+        ("200 members", *skewed_guild(200, 6, args.seed + 2)),
+        ("40 members", *skewed_guild(40, 4, args.seed + 3)),
+    ]
+    failures = 0
+    for label, traits, depts in suites:
+        for k in range(2, 11):
+            failures += check(label, traits, depts, k, args.max_ms, args.seed)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
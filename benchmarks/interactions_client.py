@@ -0,0 +1,395 @@
+"""
+PersonaOCEAN offline HTTP interactions round trip
+
+Runs the bot in INTERACTIONS_MODE=http in-process and plays Discord's two roles
+around it, so the whole path works without network access:
+- the signer/client: a LocalSigner key pair whose public half is the bot's
+  DISCORD_PUBLIC_KEY; slash-command payloads are signed and POSTed to the
+  endpoint like Discord would
+- a stand-in REST API (discord.http.Route.BASE points at it) answering login, guild and member
+  lookups, and recording followups, edits of the original response and any
+  callback-endpoint responses (there should be none: initial responses go back
+  in the HTTP response body). Webhook requests can be failed on purpose: 503s
+  and ordinary 429s, which discord.py's webhook adapter retries itself, and
+  Cloudflare 429s (no Via header), which it raises to the bot
+
+Also checks that PING gets PONG and that a bad signature or a stale timestamp is
+rejected with 401. Reports HTTP round-trip latency, response types, whether
+every deferred interaction got its followup or edit, private replies (from
+commands not marked public_reply) that ended up in a public message, and the
+outbound scheduler's counters.
+
+Usage:
+  python benchmarks/interactions_client.py --interactions 500 --concurrency 50
+  python benchmarks/interactions_client.py --ack-timeout 0.5 --handler-delay-ms 800   # automatic defers
+  python benchmarks/interactions_client.py --ack-timeout 0.5 --handler-delay-ms 800 \
+      --webhook-error-rate 0.2 --webhook-429-rate 0.05 --cloudflare-429-rate 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from persona.httpinteractions import EPHEMERAL_FLAG, LocalSigner  # noqa: E402
+
+BOT_ID = 900_000_000_000_000_001
+APP_ID = BOT_ID
+TOKEN = "offline-bot-token"
+DEFAULT_MIX = "ocean=45,summary=20,company=15,profile=10,teams=5,help=5"
+JOINED_AT = "2024-01-01T00:00:00+00:00"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: list[float], q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))]
+
+
+def user_payload(uid: int, bot: bool = False) -> dict:
+    return {"id": str(uid), "username": f"user{uid}", "discriminator": "0", "global_name": None, "avatar": None, "bot": bot}
+
+
+def member_payload(uid: int) -> dict:
+    return {"user": user_payload(uid), "roles": [], "joined_at": JOINED_AT, "deaf": False, "mute": False, "flags": 0}
+
+
+class StandInDiscord:
+    """The REST endpoints the bot calls in HTTP mode, with a record of what it sent."""
+
+    def __init__(self, signer: LocalSigner, guild_names: dict[int, str], latency: float, rng: random.Random, faults: dict[str, float]):
+        self.signer = signer
+        self.guild_names = guild_names
+        self.latency = latency
+        self.rng = rng
+        # "503" / "429" / "cloudflare_429" -> share of webhook requests failed that way
+        self.faults = faults
+        self.injected = {kind: 0 for kind in faults}
+        self.ids = itertools.count(1)
+        # interaction token -> list of ("followup" | "edit", message data)
+        self.messages: dict[str, list[tuple[str, dict]]] = {}
+        self.calls: dict[str, int] = {}
+        self._runner = None
+
+    def _message(self, data: dict, channel_id: str = "1") -> dict:
+        return {
+            "id": str(next(self.ids)), "channel_id": channel_id, "type": 0,
+            "content": data.get("content") or "", "author": user_payload(BOT_ID, bot=True),
+            "attachments": [], "embeds": data.get("embeds") or [], "mentions": [], "mention_roles": [],
+            "pinned": False, "mention_everyone": False, "tts": False, "timestamp": JOINED_AT,
+            "edited_timestamp": None, "flags": data.get("flags", 0), "components": data.get("components") or [],
+        }
+
+    async def start(self, port: int) -> str:
+        from aiohttp import web
+
+        async def body_of(request) -> dict:
+            if request.content_type.startswith("multipart/"):
+                form = await request.post()
+                return json.loads(form.get("payload_json") or "{}")
+            return await request.json() if request.can_read_body else {}
+
+        def reply(data: dict, status: int = 200):
+            # Exactly "application/json": discord.py treats anything else as plain text. Without
+            # rate-limit headers discord.py sends one request per route at a time
+            return web.Response(body=json.dumps(data).encode(), status=status, headers={
+                "Content-Type": "application/json",
+                "X-RateLimit-Limit": "10000",
+                "X-RateLimit-Remaining": "9999",
+                "X-RateLimit-Reset-After": "1",
+                "X-RateLimit-Bucket": "stand-in",
+            })
+
+        async def handle(request):
+            await asyncio.sleep(self.latency)
+            path = request.match_info["tail"]
+            parts = path.split("/")
+            name = f"{request.method} {parts[0]}"
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if path == "users/@me":
+                return reply(user_payload(BOT_ID, bot=True))
+            if path == "oauth2/applications/@me":
+                return reply({
+                    "id": str(APP_ID), "name": "PersonaOCEAN", "description": "", "icon": None,
+                    "bot_public": True, "bot_require_code_grant": False, "owner": user_payload(1),
+                    "verify_key": self.signer.public_key_hex, "flags": 0,
+                })
+            if parts[0] == "guilds" and len(parts) == 2:
+                gid = int(parts[1])
+                return reply({"id": str(gid), "name": self.guild_names.get(gid, f"Guild {gid}"),
+                                          "features": [], "roles": [], "emojis": [], "stickers": []})
+            if parts[0] == "guilds" and len(parts) == 4 and parts[2] == "members":
+                return reply(member_payload(int(parts[3])))
+            if parts[0] == "webhooks" and len(parts) >= 3:
+                roll = self.rng.random()
+                for kind, share in self.faults.items():
+                    if roll < share:
+                        self.injected[kind] += 1
+                        if kind == "503":
+                            return reply({"message": "Service Unavailable", "code": 0}, status=503)
+                        # discord.py retries a 429 that came through Discord's proxy (Via header)
+                        # and raises one without it, as a Cloudflare ban
+                        response = reply({"message": "You are being rate limited.", "retry_after": 0.1, "global": False}, status=429)
+                        if kind == "429":
+                            response.headers["Via"] = "1.1 google"
+                        response.headers["Retry-After"] = "0.1"
+                        return response
+                    roll -= share
+                token = parts[2]
+                data = await body_of(request)
+                kind = "edit" if request.method == "PATCH" else "followup"
+                self.messages.setdefault(token, []).append((kind, data))
+                return reply(self._message(data))
+            if parts[0] == "interactions":
+                # Callback endpoint: the bot should have answered in the HTTP response instead
+                data = await body_of(request)
+                self.messages.setdefault(parts[2], []).append(("callback", data))
+                return reply({"interaction": {"id": parts[1], "type": 2}})
+            return reply({"message": "Unknown route", "code": 0}, status=404)
+
+        app = web.Application()
+        app.router.add_route("*", "/api/v10/{tail:.*}", handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", port).start()
+        return f"http://127.0.0.1:{port}/api/v10"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def interaction_payload(iid: int, name: str, options: list[dict], guild_id: int, user_id: int) -> dict:
+    return {
+        "id": str(iid),
+        "application_id": str(APP_ID),
+        "type": 2,
+        "token": f"token-{iid}",
+        "version": 1,
+        "guild_id": str(guild_id),
+        "guild": {"id": str(guild_id), "locale": "en-US", "features": []},
+        "channel_id": str(guild_id + 1),
+        "channel": {"id": str(guild_id + 1), "type": 0, "guild_id": str(guild_id), "name": "general",
+                    "position": 0, "permission_overwrites": [], "nsfw": False, "parent_id": None},
+        "member": {**member_payload(user_id), "permissions": "2147483647"},
+        "app_permissions": "2147483647",
+        "locale": "en-US",
+        "guild_locale": "en-US",
+        "attachment_size_limit": 10 * 1024 * 1024,
+        "entitlements": [],
+        "authorizing_integration_owners": {"0": str(guild_id)},
+        "context": 0,
+        "data": {"id": str(iid + 7), "name": name, "type": 1, "options": options},
+    }
+
+
+def parse_mix(spec: str) -> list[tuple[str, float]]:
+    out = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        out.append((name.strip(), float(weight or 1)))
+    return out
+
+
+async def run(args) -> dict:
+    signer = LocalSigner()
+    rng = random.Random(args.seed)
+    guild_ids = [(rng.randrange(1 << 40) << 22) for _ in range(args.guilds)]
+    guild_names = {gid: f"Company {i}" for i, gid in enumerate(guild_ids)}
+    faults = {"503": args.webhook_error_rate, "429": args.webhook_429_rate, "cloudflare_429": args.cloudflare_429_rate}
+    rest = StandInDiscord(signer, guild_names, args.rest_latency_ms / 1000.0, random.Random(args.seed + 1), faults)
+    port = free_port()
+    os.environ.update({
+        "INTERACTIONS_MODE": "http",
+        "INTERACTIONS_HOST": "127.0.0.1",
+        "INTERACTIONS_PORT": str(port),
+        "INTERACTIONS_ACK_TIMEOUT": str(args.ack_timeout),
+        "DISCORD_PUBLIC_KEY": signer.public_key_hex,
+    })
+    import discord.http
+
+    # Every REST call, webhooks included, is built from this base URL
+    discord.http.Route.BASE = await rest.start(free_port())
+    import main
+
+    # Bot log lines go to stderr so stdout carries only the report
+    main.event_log._stream = sys.stderr
+    for gid in guild_ids:
+        for uid in range(args.members):
+            o, c, e, a, n = (rng.randint(0, 120) for _ in range(5))
+            role, _, dept, _ = main.match_role(o, c, e, a, n)
+            main.registry_put(gid, uid, {"traits": {"O": o, "C": c, "E": e, "A": a, "N": n}, "role": role, "dept": dept})
+
+    if args.handler_delay_ms:
+        # Slow every handler down before it runs, so replies miss the ack timeout
+        check = main.bot.tree.interaction_check
+
+        async def delayed_check(interaction):
+            await asyncio.sleep(args.handler_delay_ms / 1000.0)
+            return await check(interaction)
+
+        main.bot.tree.interaction_check = delayed_check
+
+    bot_task = asyncio.create_task(main.run_http_interactions(TOKEN, signer.public_key_hex))
+    while main.interactions_server is None or main.interactions_server._runner is None:
+        if bot_task.done():
+            bot_task.result()
+        await asyncio.sleep(0.01)
+
+    import aiohttp
+
+    url = f"http://127.0.0.1:{port}/interactions"
+    names, weights = zip(*parse_mix(args.mix))
+    ids = itertools.count(int(time.time() * 1000 - 1420070400000) << 22)
+    latency: list[float] = []
+    statuses: dict[str, int] = {}
+    types: dict[str, int] = {}
+    deferred_tokens: list[str] = []
+    inline_tokens: list[str] = []
+    # interaction token -> (command, flags of the HTTP response)
+    responses: dict[str, tuple[str, int]] = {}
+
+    def options_for(name: str) -> list[dict]:
+        if name == "ocean":
+            return [{"name": k, "type": 4, "value": rng.randint(0, 119)} for k in "ocean"]
+        if name == "summary" and rng.random() < 0.5:
+            return [{"name": "mode", "type": 3, "value": "detailed"}]
+        if name == "teams":
+            # k=1 is refused with an ephemeral notice from a public command
+            return [{"name": "k", "type": 4, "value": rng.randint(1, 10)}]
+        return []
+
+    async def post(session, body: bytes, headers: dict):
+        started = time.perf_counter()
+        async with session.post(url, data=body, headers=headers) as resp:
+            data = await resp.json() if resp.content_type == "application/json" else None
+            return resp.status, data, time.perf_counter() - started
+
+    async with aiohttp.ClientSession() as session:
+        ping = json.dumps({"id": "1", "application_id": str(APP_ID), "type": 1, "token": "p", "version": 1}).encode()
+        checks = {
+            "ping": (await post(session, ping, signer.headers(ping)))[1],
+            "bad_signature": (await post(session, ping, {**signer.headers(ping), "X-Signature-Ed25519": "00" * 64}))[0],
+            "stale_timestamp": (await post(session, ping, signer.headers(ping, timestamp=int(time.time()) - 3600)))[0],
+        }
+        sem = asyncio.Semaphore(args.concurrency or args.interactions)
+
+        async def one():
+            name = rng.choices(names, weights)[0]
+            payload = interaction_payload(next(ids), name, options_for(name), rng.choice(guild_ids), rng.randrange(args.members * 2))
+            body = json.dumps(payload).encode()
+            async with sem:
+                status, data, took = await post(session, body, signer.headers(body))
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            latency.append(took)
+            if data is not None:
+                types[str(data["type"])] = types.get(str(data["type"]), 0) + 1
+                responses[payload["token"]] = (name, (data.get("data") or {}).get("flags", 0))
+                (deferred_tokens if data["type"] == 5 else inline_tokens).append(payload["token"])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.interactions)))
+        wall = time.perf_counter() - start
+
+    # Deferred interactions finish with a followup or an edit of the original response
+    # (discord.py retries a 503 for up to about 25 s)
+    deadline = time.perf_counter() + 40
+    while time.perf_counter() < deadline and any(t not in rest.messages for t in deferred_tokens):
+        await asyncio.sleep(0.05)
+    stats = dict(main.interactions_server.stats)
+    outbound = dict(main.outbound.stats)
+    public = set(main.interactions_server.public_commands)
+    notices = (main.LATE_PRIVATE_NOTICE, main.LATE_PUBLIC_NOTICE)
+    private_leaks = 0
+    for token, msgs in rest.messages.items():
+        name, flags = responses.get(token, ("", 0))
+        if name in public:
+            continue
+        for kind, data in msgs:
+            if kind == "edit" and data.get("content") not in notices and not flags & EPHEMERAL_FLAG:
+                private_leaks += 1
+            elif kind == "followup" and not data.get("flags", 0) & EPHEMERAL_FLAG:
+                private_leaks += 1
+    await main.bot.close()
+    await bot_task
+    await rest.stop()
+
+    sent = [kind for msgs in rest.messages.values() for kind, _ in msgs]
+    return {
+        "config": vars(args),
+        "checks": checks,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(args.interactions / wall, 1) if wall else None,
+        "http_status": statuses,
+        "response_types": types,
+        "http_latency": {
+            "p50_ms": round((percentile(latency, 0.50) or 0) * 1000, 2),
+            "p95_ms": round((percentile(latency, 0.95) or 0) * 1000, 2),
+            "max_ms": round((max(latency) if latency else 0) * 1000, 2),
+        },
+        "followups": sent.count("followup"),
+        "edits": sent.count("edit"),
+        "rest_callbacks": sent.count("callback"),
+        "deferred_without_reply": sum(1 for t in deferred_tokens if t not in rest.messages),
+        "private_leaks": private_leaks,
+        "rest_calls": rest.calls,
+        "webhook_faults": rest.injected,
+        "send_failures": sum(main.m_send_failures._values.values()),
+        "outbound": outbound,
+        "server": stats,
+    }
+
+
+def main_cli(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Drive the HTTP interactions endpoint offline with signed requests")
+    parser.add_argument("--interactions", type=int, default=300, help="signed command requests to send (default: 300)")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight at once; 0 = all (default: 50)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"command weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--guilds", type=int, default=3, help="number of guilds (default: 3)")
+    parser.add_argument("--members", type=int, default=500, help="pre-seeded members per guild (default: 500)")
+    parser.add_argument("--rest-latency-ms", type=float, default=20.0, help="stand-in REST API latency (default: 20)")
+    parser.add_argument("--ack-timeout", type=float, default=2.5, help="INTERACTIONS_ACK_TIMEOUT for the bot (default: 2.5)")
+    parser.add_argument("--handler-delay-ms", type=float, default=0.0, help="delay before each handler runs (default: 0)")
+    parser.add_argument("--webhook-error-rate", type=float, default=0.0, help="share of webhook requests answered 503 (default: 0)")
+    parser.add_argument("--webhook-429-rate", type=float, default=0.0, help="share answered with a 429 discord.py retries (default: 0)")
+    parser.add_argument("--cloudflare-429-rate", type=float, default=0.0, help="share answered with a Cloudflare 429 discord.py raises (default: 0)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["REGISTRY_BACKEND"] = "memory"
+    os.environ["COMMAND_SYNC"] = "off"
+    os.environ.setdefault("COMMAND_SYNC_STATE", os.path.join(tempfile.gettempdir(), "personaocean_http_sync.json"))
+    os.chdir(ROOT)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli(sys.argv[1:]))
@@ -0,0 +1,331 @@
+"""
+PersonaOCEAN offline load test
+
+Replays thousands of concurrent slash-command interactions against the real
+command coroutines in main.py without a Discord gateway. Stand-in Interaction,
+Guild, Member and Attachment objects simulate REST latency and inject 429 /
+HTTPException failures on responses and followups. The fakes raise directly, so
+injected failures stand for what discord.py surfaces after its own retries: 5xx
+it gave up on and global (Cloudflare) 429s. Use benchmarks/interactions_client.py
+to exercise the real webhook adapter.
+
+Reports throughput, handler and acknowledgement latency percentiles, and how many
+interactions missed Discord's 3-second acknowledgement deadline (an initial
+response or defer arriving after 3 s fails with "Unknown interaction").
+
+Usage:
+  python benchmarks/loadtest.py --interactions 5000 --rate 2000
+  python benchmarks/loadtest.py --latency-ms 120 --rate-limit-rate 0.005 --json loadtest.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Discord's window for the initial response or defer
+ACK_DEADLINE = 3.0
+DEFAULT_MIX = "ocean=50,summary=20,company=15,import_json=10,departments=5"
+
+
+class FakeHTTPResponse:
+    """Enough of aiohttp.ClientResponse for discord.HTTPException."""
+
+    def __init__(self, status: int, reason: str, retry_after: Optional[float] = None):
+        self.status = status
+        self.reason = reason
+        self.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+
+
+class Faults:
+    def __init__(self, rng: random.Random, latency_ms: float, jitter_ms: float, rate_limit_rate: float, error_rate: float):
+        self.rng = rng
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.injected = {"429": 0, "5xx": 0}
+
+    async def rest_call(self):
+        """Sleep for one simulated REST round trip, then maybe raise an injected failure."""
+        import discord
+
+        delay = max(0.0, self.rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        await asyncio.sleep(delay)
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.injected["429"] += 1
+            raise discord.HTTPException(FakeHTTPResponse(429, "Too Many Requests", retry_after=0.5), "You are being rate limited.")
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.injected["5xx"] += 1
+            raise discord.HTTPException(FakeHTTPResponse(503, "Service Unavailable"), "upstream error")
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _ack(self):
+        import discord
+
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        await self._interaction.faults.rest_call()
+        elapsed = time.perf_counter() - self._interaction.created
+        if elapsed > ACK_DEADLINE:
+            raise discord.NotFound(FakeHTTPResponse(404, "Not Found"), {"code": 10062, "message": "Unknown interaction"})
+        self._done = True
+        self._interaction.acked_at = elapsed
+
+    async def send_message(self, content=None, **kwargs):
+        await self._ack()
+        self._interaction.messages.append(content if content is not None else kwargs.get("embed"))
+
+    async def defer(self, **kwargs):
+        await self._ack()
+
+    async def edit_message(self, **kwargs):
+        await self._ack()
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self._interaction.faults.rest_call()
+        self._interaction.messages.append(content if content is not None else kwargs.get("embed"))
+
+
+class FakeMember:
+    def __init__(self, uid: int):
+        self.id = uid
+        self.display_name = f"member-{uid}"
+
+
+class FakeGuild:
+    def __init__(self, gid: int, faults: Faults, cache_ratio: float):
+        self.id = gid
+        self.name = f"Guild {gid}"
+        self._faults = faults
+        self._cache_ratio = cache_ratio
+
+    def get_member(self, uid: int):
+        return FakeMember(uid) if (uid * 2654435761 % 1000) < self._cache_ratio * 1000 else None
+
+    async def fetch_member(self, uid: int):
+        await self._faults.rest_call()
+        return FakeMember(uid)
+
+    async def query_members(self, *, user_ids, limit=5, cache=True):
+        await self._faults.rest_call()
+        return [FakeMember(uid) for uid in user_ids]
+
+
+class FakeAttachment:
+    def __init__(self, payload: bytes, faults: Faults):
+        self._payload = payload
+        self._faults = faults
+        self.filename = "bigfive.json"
+        self.size = len(payload)
+
+    async def read(self) -> bytes:
+        await self._faults.rest_call()
+        return self._payload
+
+
+class FakeInteraction:
+    _ids = itertools.count(1)
+
+    def __init__(self, guild: FakeGuild, user: FakeMember, command_name: str, faults: Faults):
+        self.id = next(self._ids)
+        self.guild = guild
+        self.user = user
+        self.channel = SimpleNamespace(id=guild.id)
+        self.command = SimpleNamespace(name=command_name)
+        self.extras: dict = {}
+        self.faults = faults
+        self.created = time.perf_counter()
+        self.acked_at: Optional[float] = None
+        self.messages: list = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+def parse_mix(spec: str) -> list[tuple[str, float]]:
+    out = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            out.append((name.strip(), float(weight or 1)))
+    return out
+
+
+def bigfive_payload(rng: random.Random) -> bytes:
+    from persona.facets import FACET_MAP
+
+    facets = {d: {n.lower(): round(rng.random(), 3) for n in names} for d, names in FACET_MAP.items()}
+    return json.dumps({"facets": facets}).encode("utf-8")
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[idx]
+
+
+async def run(args) -> dict:
+    import main
+
+    # Bot log lines go to stderr so stdout carries only the report
+    main.event_log._stream = sys.stderr
+    # The fake REST layer has no per-channel limit of its own; this only shapes queueing
+    if args.channel_rate:
+        main.outbound.channel_rate = args.channel_rate
+    rng = random.Random(args.seed)
+    faults = Faults(rng, args.latency_ms, args.jitter_ms, args.rate_limit_rate, args.error_rate)
+    guilds = [FakeGuild(10_000 + g, faults, args.member_cache_ratio) for g in range(args.guilds)]
+
+    # Pre-seed registries so listing/summary commands have real work to do
+    for g in guilds:
+        for uid in range(args.members):
+            o, c, e, a, n = (rng.randint(0, 120) for _ in range(5))
+            role, _, dept, _ = main.match_role(o, c, e, a, n)
+            main.registry_put(g.id, uid, {"traits": {"O": o, "C": c, "E": e, "A": a, "N": n}, "role": role, "dept": dept})
+
+    commands = {cmd.name: cmd for cmd in main.bot.tree.get_commands()}
+    mix = [(name, w) for name, w in parse_mix(args.mix) if name in commands]
+    if not mix:
+        raise SystemExit(f"No known commands in --mix; available: {', '.join(sorted(commands))}")
+    names, weights = zip(*mix)
+    payload = bigfive_payload(rng)
+
+    def kwargs_for(name: str) -> dict:
+        if name == "ocean":
+            return {k: rng.randint(0, 119) for k in ("o", "c", "e", "a", "n")}
+        if name == "summary":
+            return {"mode": rng.choice([None, "detailed"])}
+        if name == "import_json":
+            return {"attachment": FakeAttachment(payload, faults)}
+        if name == "teams":
+            return {"k": rng.randint(2, 10)}
+        return {}
+
+    sem = asyncio.Semaphore(args.concurrency or args.interactions)
+    handler_latency: list[float] = []
+    ack_latency: list[float] = []
+    outcome = {"ok": 0, "error": 0, "missed_ack": 0, "never_acked": 0}
+    per_command: dict[str, list[float]] = {n: [] for n in names}
+
+    async def one(i: int):
+        name = rng.choices(names, weights)[0]
+        guild = rng.choice(guilds)
+        user = FakeMember(rng.randrange(args.members * 2))
+        # Created on arrival: time spent waiting for a slot counts toward the ack deadline
+        interaction = FakeInteraction(guild, user, name, faults)
+        kwargs = kwargs_for(name)
+        async with sem:
+            try:
+                if await main.bot.tree.interaction_check(interaction):
+                    await commands[name].callback(interaction, **kwargs)
+                    main.record_command(interaction, "ok")
+                outcome["ok"] += 1
+            except Exception as e:
+                outcome["error"] += 1
+                await main.on_app_command_error(interaction, e)
+            took = time.perf_counter() - interaction.created
+            handler_latency.append(took)
+            per_command[name].append(took)
+            if interaction.acked_at is None:
+                outcome["never_acked"] += 1
+            else:
+                ack_latency.append(interaction.acked_at)
+                if interaction.acked_at > ACK_DEADLINE:
+                    outcome["missed_ack"] += 1
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(args.interactions):
+        tasks.append(asyncio.create_task(one(i)))
+        if args.rate:
+            await asyncio.sleep(1.0 / args.rate)
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    def summary(values: list[float]) -> dict:
+        return {
+            "p50_ms": round((percentile(values, 0.50) or 0) * 1000, 2),
+            "p95_ms": round((percentile(values, 0.95) or 0) * 1000, 2),
+            "p99_ms": round((percentile(values, 0.99) or 0) * 1000, 2),
+            "max_ms": round((max(values) if values else 0) * 1000, 2),
+        }
+
+    missed = outcome["never_acked"] + outcome["missed_ack"]
+    return {
+        "config": vars(args),
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(args.interactions / wall, 1) if wall else None,
+        "outcomes": outcome,
+        "missed_ack_deadline": missed,
+        "missed_ack_deadline_pct": round(100.0 * missed / args.interactions, 3),
+        "handler_latency": summary(handler_latency),
+        "ack_latency": summary(ack_latency),
+        "per_command": {n: {"count": len(v), **summary(v)} for n, v in per_command.items()},
+        "injected_failures": faults.injected,
+        "send_failures": sum(main.m_send_failures._values.values()),
+        "outbound": dict(main.outbound.stats),
+    }
+
+
+def main_cli(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Replay concurrent fake interactions against PersonaOCEAN command handlers")
+    parser.add_argument("--interactions", type=int, default=2000, help="total interactions to replay (default: 2000)")
+    parser.add_argument("--concurrency", type=int, default=0, help="max handlers running at once; 0 = unlimited (default: 0)")
+    parser.add_argument("--rate", type=float, default=0.0, help="arrivals per second; 0 = all at once (default: 0)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"command weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--guilds", type=int, default=5, help="number of guilds (default: 5)")
+    parser.add_argument("--members", type=int, default=2000, help="pre-seeded members per guild (default: 2000)")
+    parser.add_argument("--member-cache-ratio", type=float, default=0.5, help="share of members found in the gateway cache (default: 0.5)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mean simulated REST latency (default: 50)")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="REST latency std deviation (default: 20)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.001, help="share of REST calls failing with a global 429 (default: 0.001)")
+    parser.add_argument("--error-rate", type=float, default=0.005, help="share of REST calls failing with 503 after discord.py's retries (default: 0.005)")
+    parser.add_argument("--channel-rate", type=float, default=0.0, help="followups per second per channel; 0 = the bot's SEND_CHANNEL_RATE, unpaced when unset (default: 0)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    # Keep the bot's own logs quiet and in-memory; the report goes to stdout
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ["REGISTRY_BACKEND"] = "memory"
+    os.chdir(ROOT)
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli(sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""
+PersonaOCEAN startup-time benchmark
+
+Times fresh interpreter runs of the two entry paths:
+- cli.cold: `python main.py O C E A N` with no compiled-roles cache (parses roles.yaml)
+- cli.warm: the same with the cache in place (no YAML parsing, no discord import)
+- bot.import: `import main` as the bot does before connecting (discord.py, command
+  tree, registry and logging setup)
+
+Each run happens in a scratch directory holding a copy of roles.yaml, so the
+repository's own cache file is left alone. Reports min/median wall time in ms.
+
+Usage:
+  python benchmarks/startup.py --runs 10 --out startup_results.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from persona.core import roles_cache_path  # noqa: E402
+
+SCORES = ["105", "90", "95", "83", "60"]
+
+
+def time_run(cmd: list[str], cwd: str, env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def run(runs: int) -> dict:
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("REGISTRY_", "METRICS_", "LOG_"))}
+    env.update(PYTHONPATH=str(ROOT), REGISTRY_BACKEND="memory", ROLES_RELOAD_INTERVAL="0", LOG_LEVEL="ERROR")
+    cli = [sys.executable, str(ROOT / "main.py"), *SCORES]
+    bot = [sys.executable, "-c", "import main"]
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        shutil.copy(ROOT / "roles.yaml", Path(scratch) / "roles.yaml")
+        cache = roles_cache_path(str(Path(scratch) / "roles.yaml"))
+        cases = {"cli.cold": [], "cli.warm": [], "bot.import": []}
+        time_run(cli, scratch, env)  # warm the OS file cache and the .pyc files
+        for _ in range(runs):
+            if os.path.exists(cache):
+                os.unlink(cache)
+            cases["cli.cold"].append(time_run(cli, scratch, env))
+            cases["cli.warm"].append(time_run(cli, scratch, env))
+            cases["bot.import"].append(time_run(bot, scratch, env))
+        for name, samples in cases.items():
+            results[name] = {"runs": runs, "min_ms": round(min(samples), 1), "median_ms": round(statistics.median(samples), 1)}
+            print(f"{name:<12} min {min(samples):>8.1f} ms  median {statistics.median(samples):>8.1f} ms", file=sys.stderr)
+    return {"meta": {"python": sys.version.split()[0], "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}, "results": results}
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="PersonaOCEAN startup-time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="runs per case (default: 5)")
+    parser.add_argument("--out", help="also write results JSON here")
+    args = parser.parse_args(argv)
+    report = run(max(1, args.runs))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,125 +1,507 @@
 import os
 import sys
+
+# Scoring-only runs (python main.py O C E A N / --batch) skip discord.py and the bot entirely
+if __name__ == "__main__":
+    from persona.cli import is_cli_args, main as _cli_main
+
+    if is_cli_args(sys.argv[1:]):
+        sys.exit(_cli_main(sys.argv[1:]))
+
 import time
+import signal
+import atexit
+import asyncio
+import io
 import json
 import traceback
-import yaml
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
 import discord
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
 from dotenv import load_dotenv
-from collections import Counter
 from typing import Optional
 
-# Optional facet support scaffolding (non-breaking)
-try:
-    from persona.facets import normalize_facets_payload  # type: ignore
-except Exception:
-    normalize_facets_payload = None  # gracefully absent if module not present
+from persona.core import load_roles
+from persona.guildroles import GuildRoleSets
+from persona.facets import FACET_NAMES, parse_import_payload
+from persona.matcher import TRAITS, compile_roles, match_one, match_roles_batch as _match_roles_batch
+from persona.storage import open_store
+from persona.aggregates import GuildAggregates
+from persona.columnar import GuildTable, ordered_rows
+from persona.shards import shard_plan
+from persona.teams import partition as partition_teams, team_summaries, teamwork_index as group_teamwork_index
+from persona.snapshot import SnapshotError, capture, read_snapshot, write_snapshot
+from persona.members import MemberNameResolver
+from persona.pages import COMPANY, DEPARTMENTS, ListingCache
+from persona.rendercache import RenderCache
+from persona.rolewatch import FileWatcher
+from persona.treesync import SyncState, sync_key, tree_fingerprint
+from persona.eventlog import EventLogger, parse_sample_rates
+from persona.metrics import MetricsRegistry, start_metrics_server
+from persona.loopwatch import LoopWatchdog
+from persona.offload import Offloader
+from persona.outbound import EXPIRED, REJECTED, SERVER_ERROR, OutboundScheduler
+from persona.httpinteractions import DEFERRED, DEFERRED_EPHEMERAL, EPHEMERAL_FLAG, INLINE, InteractionServer, make_verifier
+from validate_roles import validate_roles, validate_roles_data
+
+# Load environment from .env if present (before any setting below is read)
+load_dotenv()
 
-# Preview limits / knobs
-MAX_PREVIEW_FACETS = 8
+# --- Sharding ---
+# SHARD_COUNT: "" (one gateway connection), "auto" (AutoShardedClient, Discord's recommended
+# count) or N. SHARD_IDS ("0-3") runs only those of N shards in this process; it then keeps
+# only their guilds' registry, role files and snapshot, and other processes run the rest
+shards = shard_plan(os.getenv("SHARD_COUNT", ""), os.getenv("SHARD_IDS", ""))
+
+# --- Interactions transport ---
+# INTERACTIONS_MODE: "gateway" (default: interactions arrive over the websocket) or "http":
+# serve the application's Interactions Endpoint URL (signed POSTs) and open no websocket,
+# so identical workers can run behind a load balancer
+INTERACTIONS_MODE = os.getenv("INTERACTIONS_MODE", "gateway").strip().lower()
+if INTERACTIONS_MODE not in ("gateway", "http"):
+    raise ValueError(f"INTERACTIONS_MODE must be gateway or http, got {INTERACTIONS_MODE!r}")
+HTTP_INTERACTIONS = INTERACTIONS_MODE == "http"
 
 # --- Load roles ---
-def load_roles(path: str = "roles.yaml"):
-    with open(path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-        if not data or "roles" not in data:
-            raise ValueError("roles.yaml missing 'roles' key")
-        return data["roles"]
+ROLES_PATH = "roles.yaml"
+# Seconds between roles.yaml change checks; 0 disables hot reload
+ROLES_RELOAD_INTERVAL = float(os.getenv("ROLES_RELOAD_INTERVAL", "10"))
+# Members re-scored per vectorized batch before yielding to the event loop
+ROLES_REMATCH_CHUNK = 5000
+
 
-roles = load_roles()
+roles = load_roles(ROLES_PATH)
 
 # --- Normalize and match ---
-# convert 0–120 to -1..+1
+# convert 0–120 to -1..+1; roles are compiled once into a role-by-trait matrix
+role_matrix = compile_roles(roles)
+
 
 def normalize(val: float) -> float:
     return (val - 60.0) / 60.0
 
 
-def match_role(O: float, C: float, E: float, A: float, N: float):
-    traits = {
-        "O": normalize(O),
-        "C": normalize(C),
-        "E": normalize(E),
-        "A": normalize(A),
-        "N": normalize(N),
-    }
-    best_role, best_score = None, float("-inf")
-    for name, data in roles.items():
-        pattern = data["pattern"]
-        # dot product similarity
-        score = sum(traits[t] * float(pattern[t]) for t in pattern)
-        if score > best_score:
-            best_role = name
-            best_score = score
-    if best_role is None:
-        raise ValueError("No roles found or roles.yaml pattern is invalid")
-    r = roles[best_role]
-    return best_role, r["desc"], r["dept"], best_score
+# --- Per-guild role sets (/roles_upload) ---
+# Uploaded roles files live in GUILD_ROLES_DIR; compiled matchers for recently used
+# guilds are kept in an LRU bounded by entry count and by memory
+GUILD_ROLES_DIR = os.getenv("GUILD_ROLES_DIR", "guild_roles")
+GUILD_ROLES_MAX_ROLES = int(os.getenv("GUILD_ROLES_MAX_ROLES", "500"))
+GUILD_ROLES_MAX_BYTES = 256 * 1024
+guild_roles = GuildRoleSets(
+    GUILD_ROLES_DIR,
+    max_entries=int(os.getenv("GUILD_ROLES_CACHE_SIZE", "256")),
+    max_bytes=int(float(os.getenv("GUILD_ROLES_CACHE_MB", "64")) * 1024 * 1024),
+    owns=shards.owns,
+)
 
 
-# --- Discord setup ---
-# Load environment from .env if present
-load_dotenv()
+def matcher_for(guild_id: Optional[int]):
+    """Compiled roles for a guild: its uploaded set if it has one, else the global roles.
+    Loads an evicted set synchronously; command handlers use load_matcher()."""
+    if guild_id is not None and guild_id in guild_roles:
+        try:
+            return guild_roles.get(guild_id)
+        except (OSError, ValueError) as e:
+            log_event("guild_roles_load_error", level="ERROR", guild_id=guild_id, error=str(e))
+    return role_matrix
 
+
+async def load_matcher(guild_id: Optional[int]):
+    """matcher_for() without blocking the event loop: an evicted uploaded set is
+    loaded in a worker thread."""
+    if guild_id is not None and guild_id in guild_roles:
+        try:
+            return await guild_roles.load(guild_id)
+        except (OSError, ValueError) as e:
+            log_event("guild_roles_load_error", level="ERROR", guild_id=guild_id, error=str(e))
+    return role_matrix
+
+
+def match_role(O: float, C: float, E: float, A: float, N: float, facets=None, *, guild_id: Optional[int] = None):
+    """Best role for one member (against the guild's roles when guild_id has a custom set);
+    pass a 30-value signed facet vector to blend in facets."""
+    return match_one(matcher_for(guild_id), O, C, E, A, N, facets=facets)
+
+
+def match_roles_batch(scores, *, top_k: Optional[int] = None, facets=None, guild_id: Optional[int] = None):
+    """Score an (N, 5) array of O,C,E,A,N scores (and optional (N, 30) facets, NaN rows
+    for members without them) against all roles (the guild's, if it has a custom set)
+    in one call. Returns a BatchMatch with best role (or top_k roles) index, score and margin.
+    """
+    return _match_roles_batch(matcher_for(guild_id), scores, top_k=top_k, facets=facets)
+
+
+# --- Discord setup ---
 # Intents: message content not required for slash commands
 intents = discord.Intents.default()
 # Explicit for clarity (defaults already include guilds)
 intents.guilds = True
 # intents.members = True  # optional if you later need full member cache
 
-# --- In-memory per-guild registry ---
-# {guild_id: {user_id: {traits: {O,C,E,A,N}, role: str, dept: str}}}
-companies: dict[int, dict[int, dict]] = {}
+# --- Per-guild registry (in-memory hot cache over a pluggable store) ---
+# {guild_id: GuildTable}: columnar uid/trait/role/dept arrays per guild. table.get(uid)
+# returns the entry shape {traits: {O,C,E,A,N}, role: str, dept: str[, facets: [30 floats]]};
+# `facets` is present only for profiles imported with /import_json.
+# Reads always hit `companies`; writes go through registry_put/registry_delete,
+# which update the cache and enqueue the change for the store's background writer.
+REGISTRY_BACKEND = os.getenv("REGISTRY_BACKEND", "memory")
+REGISTRY_PATH = os.getenv("REGISTRY_PATH", "personaocean.db")
+# Binary snapshot for warm restarts of the memory backend; empty disables snapshots
+REGISTRY_SNAPSHOT = os.getenv("REGISTRY_SNAPSHOT", "")
+REGISTRY_SNAPSHOT_INTERVAL = float(os.getenv("REGISTRY_SNAPSHOT_INTERVAL", "300"))
 
 
-class OceanBot(discord.Client):
+def _on_store_error(error: Exception, pending: int):
+    # The changes stay queued and the commit is retried with backoff
+    log_event("registry_flush_error", level="ERROR", backend=REGISTRY_BACKEND, error=str(error), pending=pending)
+
+
+def _on_store_drop(dropped: int):
+    log_event("registry_write_dropped", level="ERROR", backend=REGISTRY_BACKEND, dropped_total=dropped)
+
+
+store = open_store(
+    REGISTRY_BACKEND,
+    REGISTRY_PATH,
+    max_queue=int(os.getenv("REGISTRY_QUEUE_SIZE", "100000")),
+    on_error=_on_store_error,
+    on_drop=_on_store_drop,
+)
+atexit.register(store.close)
+
+
+# This process's snapshot file (named after its shard range when other processes run the rest)
+SNAPSHOT_PATH = shards.state_path(REGISTRY_SNAPSHOT)
+
+
+def _set_aside(path: str) -> Optional[str]:
+    """Rename an unreadable snapshot to <path>.corrupt (never replacing an earlier one).
+    Returns the new path, or None if it couldn't be moved."""
+    target = path + ".corrupt"
+    if os.path.exists(target):
+        target = f"{target}.{int(time.time())}"
+    try:
+        os.rename(path, target)
+    except OSError:
+        return None
+    return target
+
+
+def _load_companies() -> tuple[dict[int, GuildTable], dict]:
+    """Load this process's guilds from the snapshot (memory backend) or the store.
+    Returns (companies, snapshot status fields for the registry_loaded log)."""
+    if REGISTRY_SNAPSHOT and store.name == "memory":
+        start = time.perf_counter()
+        try:
+            tables, info = read_snapshot(SNAPSHOT_PATH, len(FACET_NAMES), shards.owns)
+            return tables, {"snapshot": "loaded", "snapshot_age_s": int(time.time() - info["created_at"]),
+                            "snapshot_ms": int((time.perf_counter() - start) * 1000)}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, SnapshotError) as e:
+            # Start empty rather than crash, but move the file aside first: the next
+            # snapshot would otherwise replace every stored profile with nothing
+            return {}, {"snapshot": "invalid", "snapshot_error": str(e), "snapshot_moved_to": _set_aside(SNAPSHOT_PATH)}
+        # First start with this shard layout: adopt our guilds from the files of any
+        # previous layout, newest first. A guild comes from the newest file whose layout
+        # owned it; if that file doesn't have it, it was forgotten there and stays gone
+        tables, adopted, owners = {}, [], []
+        for path, layout in shards.sibling_state_paths(REGISTRY_SNAPSHOT):
+            try:
+                found, _ = read_snapshot(path, len(FACET_NAMES), shards.owns)
+            except (OSError, ValueError, SnapshotError):
+                continue
+            for gid, table in found.items():
+                if not any(owner.owns(gid) for owner in owners):
+                    tables[gid] = table
+            owners.append(layout)
+            adopted.append(path)
+        if not adopted:
+            return {}, {"snapshot": "missing"}
+        return tables, {"snapshot": "adopted", "snapshot_sources": adopted,
+                        "snapshot_ms": int((time.perf_counter() - start) * 1000)}
+    if shards.partial:
+        registry = store.load(shard_count=shards.count, shard_ids=shards.ids)
+    else:
+        registry = store.load()
+    tables = {gid: GuildTable.from_entries(reg) for gid, reg in registry.items()}
+    return tables, ({"snapshot": "ignored"} if REGISTRY_SNAPSHOT else {})
+
+
+companies, _snapshot_status = _load_companies()
+# Running per-guild counts/sums kept in step with `companies` for O(1) /summary
+aggregates: dict[int, GuildAggregates] = {gid: GuildAggregates.from_table(t) for gid, t in companies.items()}
+# Bumped on every write/delete; caches derived from a guild's registry key on it
+registry_versions: dict[int, int] = {}
+
+
+def registry_put(guild_id: int, user_id: int, entry: dict):
+    registry = companies.get(guild_id)
+    if registry is None:
+        registry = companies[guild_id] = GuildTable()
+    agg = aggregates.get(guild_id)
+    if agg is None:
+        agg = aggregates[guild_id] = GuildAggregates()
+    previous = registry.get(user_id)
+    registry.put_entry(user_id, entry)
+    if previous is not None:
+        agg.remove(previous)
+    agg.add(entry)
+    registry_versions[guild_id] = registry_versions.get(guild_id, 0) + 1
+    store.put(guild_id, user_id, entry)
+
+
+def registry_delete(guild_id: int, user_id: int) -> Optional[dict]:
+    registry = companies.get(guild_id)
+    removed = registry.get(user_id) if registry is not None else None
+    if removed is not None:
+        registry.delete(user_id)
+        aggregates[guild_id].remove(removed)
+        registry_versions[guild_id] = registry_versions.get(guild_id, 0) + 1
+        store.delete(guild_id, user_id)
+    return removed
+
+
+# Slash command sync: "auto" uploads the tree only when its fingerprint changed since the
+# last sync recorded in COMMAND_SYNC_STATE; "always" syncs on every start; "off" never does
+COMMAND_SYNC = os.getenv("COMMAND_SYNC", "auto").lower()
+command_sync_state = SyncState(os.getenv("COMMAND_SYNC_STATE", ".command_sync.json"))
+
+
+class OceanTree(discord.app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs before every slash command; start the latency clock for metrics
+        interaction.extras["started"] = time.perf_counter()
+        # loop_lag reports name the command whose task (or its subtasks) held the loop
+        loop_watchdog.tag(_cmd_name(interaction))
+        return True
+
+
+class OceanBot(discord.AutoShardedClient if shards.sharded else discord.Client):
     def __init__(self, *, intents: discord.Intents):
-        super().__init__(intents=intents)
-        self.tree = discord.app_commands.CommandTree(self)
+        super().__init__(intents=intents, **shards.client_kwargs())
+        self.tree = OceanTree(self)
+        self.metrics_runner = None
+        # Set once close() finished (HTTP mode waits on it instead of the websocket)
+        self.stopped = asyncio.Event()
 
     async def setup_hook(self):
+        metrics_port = os.getenv("METRICS_PORT")
+        if metrics_port:
+            host = os.getenv("METRICS_HOST", "127.0.0.1")
+            try:
+                self.metrics_runner = await start_metrics_server(metrics, host, int(metrics_port))
+                log_event("metrics_listening", host=host, port=int(metrics_port))
+            except (OSError, ValueError) as e:
+                log_event("metrics_listen_failed", level="ERROR", host=host, port=metrics_port, error=str(e))
+        if ROLES_RELOAD_INTERVAL > 0:
+            self.roles_watch_task = asyncio.create_task(watch_roles(ROLES_RELOAD_INTERVAL))
+        if LOOP_WATCH_INTERVAL > 0:
+            self.loop_watch_task = asyncio.create_task(loop_watchdog.run())
+        # Graceful shutdown on SIGTERM (docker stop / platform restarts) so queued writes are flushed
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except (NotImplementedError, RuntimeError):
+            pass  # not supported on Windows event loops
+        log_event(
+            "registry_loaded",
+            level="ERROR" if _snapshot_status.get("snapshot") == "invalid" else "INFO",
+            backend=store.name,
+            guilds=len(companies),
+            members=sum(len(r) for r in companies.values()),
+            **_snapshot_status,
+        )
+        if REGISTRY_SNAPSHOT and store.name == "memory" and REGISTRY_SNAPSHOT_INTERVAL > 0:
+            self.snapshot_task = asyncio.create_task(snapshot_loop(REGISTRY_SNAPSHOT_INTERVAL))
+
         # Fast dev sync: set DEV_GUILD_ID in env to register commands to one guild
         dev_guild_id = os.getenv("DEV_GUILD_ID")
-        if dev_guild_id:
-            guild = discord.Object(id=int(dev_guild_id))
+        await self.sync_commands(discord.Object(id=int(dev_guild_id)) if dev_guild_id else None)
+
+    async def sync_commands(self, guild: Optional[discord.Object] = None):
+        """Upload the command tree only if its fingerprint differs from the last
+        successful sync for this application and scope (COMMAND_SYNC=always forces it,
+        off skips it). Global syncs are rate limited and may take up to 1 hour to propagate."""
+        start = time.perf_counter()
+        scope = f"guild {guild.id}" if guild else "global"
+        payloads = [cmd.to_dict(self.tree) for cmd in self.tree.get_commands(guild=guild)]
+        fingerprint = tree_fingerprint(payloads)
+        key = sync_key(self.application_id, guild.id if guild else None)
+        previous = command_sync_state.synced(key)
+        # The tree belongs to the application, so only one process syncs it: the one
+        # running shard 0 (or, for a guild scope, that guild's shard)
+        ours = shards.owns(guild.id) if guild else shards.owns_shard(0)
+        if not ours or COMMAND_SYNC == "off" or (COMMAND_SYNC != "always" and previous == fingerprint):
+            decision = "other_shard" if not ours else ("off" if COMMAND_SYNC == "off" else "unchanged")
+            log_event(
+                "commands_sync",
+                scope=scope,
+                decision=decision,
+                commands=len(payloads),
+                fingerprint=fingerprint[:12],
+                duration_ms=int((time.perf_counter() - start) * 1000),
+            )
+            print(f"✅ Slash command sync skipped ({scope}, {decision})")
+            return
+        try:
             await self.tree.sync(guild=guild)
-            print(f"✅ Slash commands synced to guild {dev_guild_id}")
-        else:
-            # Global sync (may take up to 1 hour to propagate)
-            await self.tree.sync()
-            print("✅ Slash commands synced globally")
+        except discord.HTTPException as e:
+            # Commands from the previous sync stay live; the next start tries again
+            log_event(
+                "commands_sync_error",
+                level="ERROR",
+                scope=scope,
+                status=getattr(e, "status", None),
+                error=str(e),
+                duration_ms=int((time.perf_counter() - start) * 1000),
+            )
+            return
+        saved = command_sync_state.record(key, fingerprint)
+        log_event(
+            "commands_sync",
+            scope=scope,
+            decision="forced" if COMMAND_SYNC == "always" else ("changed" if previous else "first"),
+            commands=len(payloads),
+            fingerprint=fingerprint[:12],
+            previous=previous[:12] if previous else None,
+            state_saved=saved,
+            duration_ms=int((time.perf_counter() - start) * 1000),
+        )
+        print(f"✅ Slash commands synced ({scope})")
 
     async def on_ready(self):
+        if shards.sharded and shards.count is None:
+            # SHARD_COUNT=auto: Discord's recommended count is known once connected
+            shards.count = self.shard_count
+        log_event("gateway_ready", shard_count=shards.count, shards=shards.label, guilds=len(self.guilds))
         print(f"✅ Logged in as {self.user}")
 
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        record_command(interaction, "ok")
+
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        # Only delivered with the members intent; otherwise a departed member's
+        # cached name lasts until MEMBER_NAME_TTL
+        member_names.invalidate(payload.guild_id, payload.user.id)
+
+    async def close(self):
+        if interactions_server is not None:
+            await interactions_server.stop()
+        # Final snapshot and write-behind drain run off the event loop before disconnecting
+        if REGISTRY_SNAPSHOT and store.name == "memory":
+            await save_snapshot(reason="shutdown")
+        unwritten = await asyncio.to_thread(store.close)
+        if unwritten:
+            log_event("registry_unwritten", level="ERROR", backend=store.name, changes=unwritten)
+        await asyncio.to_thread(offload.shutdown)
+        loop_watchdog.stop()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        await super().close()
+        self.stopped.set()
+
 
 bot = OceanBot(intents=intents)
 
+# Shared display-name cache for /company and /departments (TTL + LRU, bounded REST concurrency).
+# MEMBER_GATEWAY_CHUNKS=1 resolves cache misses via gateway member requests (100 ids each) before REST.
+member_names = MemberNameResolver(
+    ttl=float(os.getenv("MEMBER_NAME_TTL", "600")),
+    max_size=int(os.getenv("MEMBER_NAME_CACHE_SIZE", "50000")),
+    concurrency=int(os.getenv("MEMBER_FETCH_CONCURRENCY", "8")),
+    # Gateway member requests need the websocket, which HTTP mode doesn't open
+    gateway_chunks=os.getenv("MEMBER_GATEWAY_CHUNKS", "0").lower() in ("1", "true", "yes") and not HTTP_INTERACTIONS,
+)
 
-# --- Helper: safe send with basic rate-limit handling ---
-async def send_safe(interaction: discord.Interaction, content: str = None, *, embed: discord.Embed = None, ephemeral: bool = False):
-    try:
+
+# --- CPU-heavy command work: pure functions on plain data, run off the event loop ---
+# Sizes below the per-kind threshold stay inline, where dispatch costs more than the work
+offload = Offloader(
+    mode=os.getenv("OFFLOAD_MODE", "thread").lower(),
+    workers=int(os.getenv("OFFLOAD_WORKERS", "4")),
+    thresholds={
+        "listing_index": int(os.getenv("OFFLOAD_MIN_MEMBERS", "20000")),
+        "import_json": int(os.getenv("OFFLOAD_MIN_BYTES", str(64 * 1024))),
+        "teams": int(os.getenv("OFFLOAD_MIN_TEAM_MEMBERS", "200")),
+    },
+)
+
+
+# --- Outbound replies: sent once within the interaction's deadline (optionally paced per channel) ---
+# Discord accepts the initial response for 3 s after an interaction arrives, followups for 15 min
+INITIAL_RESPONSE_WINDOW = 3.0
+INTERACTION_TOKEN_TTL = 15 * 60.0
+SEND_FAILED_NOTICE = "⚠️ Couldn't deliver the reply, please try again."
+# SEND_CHANNEL_RATE unset: no pacing (discord.py tracks the per-interaction webhook limits)
+_send_channel_rate = os.getenv("SEND_CHANNEL_RATE", "").strip()
+outbound = OutboundScheduler(
+    channel_rate=float(_send_channel_rate) if _send_channel_rate else None,
+    channel_burst=int(os.getenv("SEND_CHANNEL_BURST", "10")),
+)
+
+
+def _reply_deadline(interaction: discord.Interaction) -> float:
+    """perf_counter time after which Discord won't take the next reply to `interaction`.
+    Measured from local receipt (set in OceanTree.interaction_check), so clock skew
+    against Discord's timestamps can't cut it short."""
+    received = interaction.extras.get("started", time.perf_counter())
+    window = INTERACTION_TOKEN_TTL if interaction.response.is_done() else INITIAL_RESPONSE_WINDOW
+    return received + window
+
+
+async def send_safe(interaction: discord.Interaction, content: str = None, *, embed: discord.Embed = None, ephemeral: bool = False, view: discord.ui.View = None):
+    """Reply through the outbound scheduler: the initial response if there is none yet,
+    else a followup (paced per channel if SEND_CHANNEL_RATE is set). Sent once: discord.py already retried 5xx
+    and per-route 429s, and a 429 it surfaces holds back every send for Retry-After.
+    If the initial response fails, an error notice is always attempted while its 3 s
+    window is open, so the interaction still gets acknowledged. A failed followup gets
+    one notice per channel and window (none once the token expired or while rate limited)."""
+    view = view or discord.utils.MISSING
+    channel_key = getattr(getattr(interaction, "channel", None), "id", None) or ("dm", interaction.user.id)
+
+    async def send_once(text, embed, ephemeral, view):
         if interaction.response.is_done():
-            await interaction.followup.send(content=content, embed=embed, ephemeral=ephemeral)
+            await interaction.followup.send(content=text, embed=embed, ephemeral=ephemeral, view=view)
         else:
-            await interaction.response.send_message(content=content, embed=embed, ephemeral=ephemeral)
-    except (discord.HTTPException, discord.NotFound) as e:
-        try:
-            msg = "⚠️ Rate limited, please try again."
-            if interaction.response.is_done():
-                await interaction.followup.send(msg, ephemeral=True)
-            else:
-                await interaction.response.send_message(msg, ephemeral=True)
-        except Exception:
-            pass
-        log_event(
-            "send_error",
-            level="WARN",
-            error=str(e),
-            guild_id=getattr(interaction.guild, "id", None),
-            user_id=getattr(interaction.user, "id", None),
-            channel_id=getattr(getattr(interaction, "channel", None), "id", None),
+            await interaction.response.send_message(content=text, embed=embed, ephemeral=ephemeral, view=view)
+
+    result = await outbound.deliver(
+        lambda: send_once(content, embed, ephemeral, view),
+        channel=channel_key,
+        interaction=interaction.id,
+        deadline=_reply_deadline(interaction),
+        paced=interaction.response.is_done(),
+    )
+    if result.ok:
+        return
+    m_send_failures.inc(command=_cmd_name(interaction), reason=result.reason)
+    if not interaction.response.is_done():
+        # Unacknowledged: without this the interaction fails, whatever other users saw
+        notice = result.reason != EXPIRED
+    else:
+        notice = result.reason in (SERVER_ERROR, REJECTED) and outbound.claim_notice(channel_key, SEND_FAILED_NOTICE)
+    if notice:
+        await outbound.deliver(
+            lambda: send_once(SEND_FAILED_NOTICE, None, True, discord.utils.MISSING),
+            channel=channel_key,
+            interaction=interaction.id,
+            deadline=_reply_deadline(interaction),
+            paced=interaction.response.is_done(),
         )
+    log_event(
+        "send_error",
+        level="WARN",
+        error=str(result.error) if result.error else None,
+        reason=result.reason,
+        attempts=result.attempts,
+        waited_ms=int(result.waited * 1000),
+        notice=notice,
+        guild_id=getattr(interaction.guild, "id", None),
+        user_id=getattr(interaction.user, "id", None),
+        channel_id=getattr(getattr(interaction, "channel", None), "id", None),
+    )
 
 
 # --- Logging utilities ---
@@ -133,20 +515,97 @@ def _norm_level(level: str) -> str:
 def _level_ok(level: str) -> bool:
     return LEVEL_ORDER.get(_norm_level(level), 20) >= LEVEL_ORDER.get(_norm_level(LOG_LEVEL), 20)
 
+# Records are queued and serialized/written in batches by a background thread so a
+# slow stdout pipe never blocks the event loop. LOG_SAMPLE="event=rate,..." samples noisy events.
+event_log = EventLogger(
+    max_queue=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    sample_rates=parse_sample_rates(os.getenv("LOG_SAMPLE")),
+)
+atexit.register(event_log.close)
+
 def log_event(event: str, *, level: str = "INFO", **kwargs):
     # Honor LOG_LEVEL and include a level field in the record
     if not _level_ok(level):
         return
-    record = {
-        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    if shards.sharded:
+        # Tag records with the guild's shard, and the process's shard range
+        if kwargs.get("guild_id") is not None and "shard_id" not in kwargs:
+            kwargs["shard_id"] = shards.shard_of(int(kwargs["guild_id"]))
+        kwargs.setdefault("shards", shards.label)
+    event_log.emit({
+        "ts": time.time(),
         "event": event,
         "level": _norm_level(level),
         **kwargs,
-    }
-    try:
-        print(json.dumps(record, ensure_ascii=False))
-    except Exception:
-        print(f"{record}")
+    })
+
+
+# --- Metrics (Prometheus text at http://METRICS_HOST:METRICS_PORT/metrics when METRICS_PORT is set) ---
+metrics = MetricsRegistry()
+m_commands = metrics.counter("personaocean_commands_total", "Slash command invocations by outcome", ("command", "status", "shard"))
+m_command_seconds = metrics.histogram("personaocean_command_duration_seconds", "Slash command handler latency", ("command", "shard"))
+m_send_failures = metrics.counter("personaocean_send_failures_total", "send_safe deliveries that failed, by reason", ("command", "reason"))
+m_defers = metrics.counter("personaocean_defers_total", "maybe_defer calls by result", ("command", "result"))
+m_cooldowns = metrics.counter("personaocean_cooldown_hits_total", "Commands rejected by cooldown", ("command",))
+metrics.gauge("personaocean_registry_guilds", "Guilds with at least one stored member",
+              fn=lambda: [((), sum(1 for r in companies.values() if r))])
+metrics.gauge("personaocean_registry_members", "Stored members per guild", ("guild_id", "shard"),
+              fn=lambda: [((gid, _shard_label(gid)), len(r)) for gid, r in companies.items() if r])
+metrics.gauge("personaocean_gateway_latency_seconds", "Discord gateway heartbeat latency per shard", ("shard",),
+              fn=lambda: _gateway_latencies())
+metrics.gauge("personaocean_offload_jobs", "Offloadable jobs by kind, run inline or on the worker pool", ("kind", "where"),
+              fn=lambda: [((kind, where), n) for kind, counts in offload.stats.items() for where, n in counts.items()])
+metrics.gauge("personaocean_log_dropped_records", "Log records dropped because the log queue was full",
+              fn=lambda: [((), event_log.dropped)])
+
+
+def _cmd_name(interaction: discord.Interaction) -> str:
+    return getattr(interaction.command, "name", None) or "unknown"
+
+
+def _shard_label(guild_id: Optional[int]) -> str:
+    # DMs arrive on shard 0; "" until SHARD_COUNT=auto learns the count
+    shard = shards.shard_of(guild_id or 0)
+    return "" if shard is None else str(shard)
+
+
+def _gateway_latencies() -> list:
+    if shards.sharded:
+        return [((str(shard_id),), latency) for shard_id, latency in bot.latencies]
+    return [(("0",), bot.latency)]
+
+
+def record_command(interaction: discord.Interaction, status: str):
+    name = _cmd_name(interaction)
+    shard = _shard_label(getattr(interaction, "guild_id", None))
+    m_commands.inc(command=name, status=status, shard=shard)
+    started = interaction.extras.get("started") if isinstance(getattr(interaction, "extras", None), dict) else None
+    if started is not None:
+        m_command_seconds.observe(time.perf_counter() - started, command=name, shard=shard)
+
+
+# --- Event-loop lag watchdog: our own blocking vs Discord latency vs slow REST ---
+# Tick interval in seconds (0 disables); lag past the threshold is logged as loop_lag
+LOOP_WATCH_INTERVAL = float(os.getenv("LOOP_WATCH_INTERVAL", "0.1"))
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250")) / 1000.0
+m_loop_lag = metrics.histogram("personaocean_loop_lag_seconds", "Event-loop scheduling lag per watchdog tick")
+
+
+def _report_loop_lag(fields: dict):
+    log_event("loop_lag", level="WARN", **fields)
+
+
+loop_watchdog = LoopWatchdog(
+    _report_loop_lag,
+    interval=LOOP_WATCH_INTERVAL,
+    threshold=LOOP_LAG_THRESHOLD,
+    min_gap=float(os.getenv("LOOP_LAG_REPORT_GAP", "5")),
+    latency=lambda: bot.latency,
+    observe=lambda lag: m_loop_lag.observe(lag),
+    # asyncio debug mode names the slowest callbacks, at a noticeable CPU cost
+    debug_callbacks=os.getenv("LOOP_DEBUG", "0").lower() in ("1", "true", "yes"),
+    root=os.path.dirname(os.path.abspath(__file__)),
+)
 
 
 async def maybe_defer(interaction: discord.Interaction, *, ephemeral: bool = False):
@@ -156,6 +615,7 @@ async def maybe_defer(interaction: discord.Interaction, *, ephemeral: bool = Fal
     try:
         if not interaction.response.is_done():
             await interaction.response.defer(thinking=True, ephemeral=ephemeral)
+            m_defers.inc(command=_cmd_name(interaction), result="ok")
             log_event(
                 "interaction_deferred",
                 level="INFO",
@@ -165,6 +625,7 @@ async def maybe_defer(interaction: discord.Interaction, *, ephemeral: bool = Fal
                 cmd=getattr(interaction.command, "name", None),
             )
     except discord.HTTPException as e:
+        m_defers.inc(command=_cmd_name(interaction), result="failed")
         log_event(
             "defer_failed",
             level="WARN",
@@ -176,7 +637,184 @@ async def maybe_defer(interaction: discord.Interaction, *, ephemeral: bool = Fal
         )
 
 
-@bot.tree.command(name="ocean", description="Get your archetype from OCEAN scores (0–120 each)")
+# --- Hot reload of roles.yaml ---
+roles_watcher = FileWatcher(ROLES_PATH)
+_rematch_task: Optional[asyncio.Task] = None
+
+
+def _prepare_roles(path: str):
+    """Validate and compile a roles file (runs in a worker thread). Returns (roles, compiled, report)."""
+    report = io.StringIO()
+    code = validate_roles(Path(path), out=report)
+    if code != 0:
+        return None, None, report.getvalue()
+    new_roles = load_roles(path)
+    return new_roles, compile_roles(new_roles), report.getvalue()
+
+
+async def rematch_guild(guild_id: int, compiled, current) -> Optional[int]:
+    """Re-score one guild's stored members against `compiled` in vectorized chunks,
+    yielding between chunks. Each chunk reads the live table rows of a uid snapshot,
+    so members removed meanwhile are skipped and ones written meanwhile are matched
+    as they are now. `current()` is checked before every chunk; returns None once it
+    is False (superseded), else the number of members whose role changed.
+    """
+    changed = 0
+    registry = companies.get(guild_id)
+    if not registry:
+        return changed
+    uids = registry.uid_array().copy()
+    for i in range(0, len(uids), ROLES_REMATCH_CHUNK):
+        if not current():
+            return None
+        rows = registry.rows_of(uids[i:i + ROLES_REMATCH_CHUNK].tolist())
+        rows = rows[rows >= 0]
+        if not len(rows):
+            continue
+        # No awaits until the chunk is applied, so `rows` stay valid
+        scores = registry.traits[rows].astype(np.float64)
+        facets = registry.facet_matrix(rows, len(FACET_NAMES))
+        result = _match_roles_batch(compiled, scores, facets=facets)
+        current_roles = zip(registry.uids[rows].tolist(), registry.role_names(rows), registry.dept_names(rows))
+        for (uid, old_role, old_dept), role, dept in zip(current_roles, result.names(), result.depts()):
+            if role != old_role or dept != old_dept:
+                registry_put(guild_id, uid, {**registry.get(uid), "role": role, "dept": dept})
+                changed += 1
+        await asyncio.sleep(0)
+    if changed:
+        # The old set's role names are left without members: drop them from the name tables
+        registry.compact_names()
+    return changed
+
+
+async def rematch_members(compiled) -> int:
+    """Re-score the members of every guild on the global roles against `compiled`
+    (guilds with an uploaded role set are skipped). Returns the number of members
+    whose role changed.
+    """
+    changed = 0
+    for guild_id in list(companies):
+        if compiled is not role_matrix:
+            return changed  # superseded by a newer reload
+        n = await rematch_guild(
+            guild_id, compiled, lambda gid=guild_id: compiled is role_matrix and gid not in guild_roles
+        )
+        changed += n or 0
+    return changed
+
+
+async def reload_roles(digest: str) -> bool:
+    """Validate, compile and atomically swap in roles.yaml, then re-match stored members."""
+    global roles, role_matrix, _rematch_task
+    start = time.perf_counter()
+    try:
+        new_roles, compiled, report = await asyncio.to_thread(_prepare_roles, ROLES_PATH)
+    except Exception as e:
+        log_event("roles_reload_failed", level="ERROR", path=ROLES_PATH, error=str(e))
+        return False
+    if compiled is None:
+        log_event("roles_reload_rejected", level="WARN", path=ROLES_PATH, report=report.strip().splitlines())
+        return False
+    # Single reference swaps: commands read role_matrix once per match
+    roles, role_matrix = new_roles, compiled
+    roles_watcher.accept(digest)
+    log_event(
+        "roles_reloaded",
+        path=ROLES_PATH,
+        roles=len(compiled),
+        sha256=digest[:12],
+        duration_ms=int((time.perf_counter() - start) * 1000),
+    )
+    if _rematch_task is not None and not _rematch_task.done():
+        _rematch_task.cancel()
+    _rematch_task = asyncio.create_task(_rematch_and_log(compiled))
+    return True
+
+
+async def _rematch_and_log(compiled):
+    start = time.perf_counter()
+    changed = await rematch_members(compiled)
+    log_event(
+        "roles_rematched",
+        changed=changed,
+        superseded=compiled is not role_matrix,
+        members=sum(len(r) for r in companies.values()),
+        duration_ms=int((time.perf_counter() - start) * 1000),
+    )
+
+
+async def watch_roles(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            digest = roles_watcher.poll()
+            if digest is not None:
+                await reload_roles(digest)
+        except Exception as e:
+            log_event("roles_watch_error", level="ERROR", error=str(e))
+
+
+# --- Registry snapshots (warm restarts for the memory backend) ---
+_snapshot_lock = asyncio.Lock()
+# Earlier shard layouts' snapshot files are renamed with this suffix once superseded
+SUPERSEDED_SUFFIX = ".superseded"
+# Sum of registry_versions when the on-disk snapshot was taken (None: nothing on disk yet)
+_snapshot_epoch: Optional[int] = 0 if _snapshot_status.get("snapshot") == "loaded" else None
+
+
+async def save_snapshot(*, reason: str) -> bool:
+    """Snapshot the registry if it changed since the last one. The column copies are
+    taken on the loop (consistent per guild); encoding and the atomic write run in a thread."""
+    global _snapshot_epoch
+    async with _snapshot_lock:
+        epoch = sum(registry_versions.values())
+        if epoch == _snapshot_epoch:
+            return False
+        if _snapshot_status.get("snapshot") == "invalid" and _snapshot_status.get("snapshot_moved_to") is None and os.path.exists(SNAPSHOT_PATH):
+            # The file that failed to load couldn't be moved aside: keep it until someone does
+            log_event("registry_snapshot_error", level="ERROR", path=SNAPSHOT_PATH, reason=reason,
+                      error="not overwriting a snapshot that failed to load; move it aside to resume snapshots")
+            return False
+        start = time.perf_counter()
+        guilds = capture(companies)
+        try:
+            size = await asyncio.to_thread(write_snapshot, SNAPSHOT_PATH, guilds, len(FACET_NAMES))
+        except Exception as e:
+            log_event("registry_snapshot_error", level="ERROR", path=SNAPSHOT_PATH, reason=reason, error=str(e))
+            return False
+        _snapshot_epoch = epoch
+        log_event(
+            "registry_snapshot",
+            path=SNAPSHOT_PATH,
+            reason=reason,
+            guilds=len(guilds),
+            members=sum(len(g.uids) for g in guilds),
+            bytes=size,
+            duration_ms=int((time.perf_counter() - start) * 1000),
+        )
+        _retire_old_snapshots()
+        return True
+
+
+def _retire_old_snapshots():
+    """Rename earlier layouts' snapshot files once newer files cover all of their guilds
+    (after the last process of a new layout wrote its own), so they can't be adopted again."""
+    for path in shards.superseded_state_paths(REGISTRY_SNAPSHOT):
+        try:
+            os.replace(path, path + SUPERSEDED_SUFFIX)
+        except OSError as e:
+            log_event("registry_snapshot_error", level="ERROR", path=path, reason="retire", error=str(e))
+            continue
+        log_event("registry_snapshot_retired", path=path, renamed_to=path + SUPERSEDED_SUFFIX)
+
+
+async def snapshot_loop(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await save_snapshot(reason="interval")
+
+
+@bot.tree.command(name="ocean", description="Get your archetype from OCEAN scores (0–120 each)", extras={"public_reply": True})
 @discord.app_commands.describe(
     o="Openness (0–120)",
     c="Conscientiousness (0–120)",
@@ -225,17 +863,16 @@ async def ocean_command(
         )
         return
 
-    role, desc, dept, _ = match_role(float(o), float(c), float(e), float(a), float(n))
     guild = interaction.guild
     guild_id = guild.id if guild else None
+    role, desc, dept, _ = match_one(await load_matcher(guild_id), float(o), float(c), float(e), float(a), float(n))
     if guild_id is not None:
-        if guild_id not in companies:
-            companies[guild_id] = {}
-        companies[guild_id][interaction.user.id] = {
+        registry_put(guild_id, interaction.user.id, {
             "traits": {"O": o, "C": c, "E": e, "A": a, "N": n},
             "role": role,
             "dept": dept,
-        }
+        })
+        member_names.remember(guild_id, interaction.user.id, interaction.user.display_name)
     stored_line = f"\n🗂️ Stored in company: `{guild.name}`" if guild_id is not None else ""
     await send_safe(
         interaction,
@@ -244,7 +881,76 @@ async def ocean_command(
     )
 
 
-@bot.tree.command(name="company", description="List members registered in this server (company)")
+# --- Paginated roster listings (/company, /departments) ---
+def _listing_index(kind: str, registry: GuildTable):
+    # Columns are copied now, so writes while the sort waits for a worker can't reach it
+    columns = registry.listing_columns()
+    return offload.run("listing_index", ordered_rows, *columns, size=len(registry), by_dept=kind == DEPARTMENTS)
+
+
+listings = ListingCache(page_size=int(os.getenv("LISTING_PAGE_SIZE", "20")), build=_listing_index, page_ttl=member_names.ttl)
+LISTING_VIEW_TIMEOUT = 300.0
+
+
+async def render_listing_page(guild: discord.Guild, kind: str, page: int):
+    """Render one page from the cached per-guild index; names are resolved only for that page."""
+    name_stats = {"hits": 0, "misses": 0, "fetched": 0, "gateway": 0}
+
+    async def resolve(uids: list[int]):
+        names, stats = await member_names.resolve(guild, uids)
+        for k in name_stats:
+            name_stats[k] += stats[k]
+        return names
+
+    text, page, pages, cached = await listings.page(
+        guild.id,
+        kind,
+        registry_versions.get(guild.id, 0),
+        companies.get(guild.id) or GuildTable(),
+        page,
+        guild.name,
+        resolve,
+    )
+    return text, page, pages, cached, name_stats
+
+
+class ListingView(discord.ui.View):
+    """Prev/next buttons for a roster listing; only the invoking user can page."""
+
+    def __init__(self, guild: discord.Guild, kind: str, owner_id: int, page: int, pages: int):
+        super().__init__(timeout=LISTING_VIEW_TIMEOUT)
+        self.guild = guild
+        self.kind = kind
+        self.owner_id = owner_id
+        self.page = page
+        self.pages = pages
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.prev_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await send_safe(interaction, "Run the command yourself to page through the list.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        text, self.page, self.pages, _, _ = await render_listing_page(self.guild, self.kind, page)
+        self._sync_buttons()
+        await interaction.response.edit_message(content=text, view=self)
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+
+@bot.tree.command(name="company", description="List members registered in this server (company)", extras={"public_reply": True})
 async def company_command(interaction: discord.Interaction):
     start = time.perf_counter()
     guild = interaction.guild
@@ -252,33 +958,30 @@ async def company_command(interaction: discord.Interaction):
     if guild_id is None:
         await send_safe(interaction, "🏢 This command can only be used in a server.", ephemeral=True)
         return
-    # This may iterate many members; defer to avoid 3s timeout under load
+    # Name lookups for a cold page may hit REST; defer to avoid 3s timeout under load
     await maybe_defer(interaction, ephemeral=False)
-    registry = companies.get(guild_id, {})
+    registry = companies.get(guild_id)
     if not registry:
         await send_safe(interaction, "🏢 No members registered yet in this company.", ephemeral=True)
         return
-    lines = []
-    for uid, data in registry.items():
-        member = guild.get_member(uid)
-        if member is None:
-            try:
-                member = await guild.fetch_member(uid)
-            except Exception:
-                member = None
-        display = member.display_name if member else f"Unknown User ({uid})"
-        lines.append(f"- {display}: {data['role']} ({data['dept']})")
-    await send_safe(interaction, f"🏢 **{guild.name} Company Members:**\n" + "\n".join(lines), ephemeral=False)
+    text, page, pages, cached, name_stats = await render_listing_page(guild, COMPANY, 0)
+    view = ListingView(guild, COMPANY, interaction.user.id, page, pages) if pages > 1 else None
+    await send_safe(interaction, text, ephemeral=False, view=view)
     log_event(
         "cmd_company",
         guild_id=guild_id,
         user_id=getattr(interaction.user, "id", None),
         members=len(registry),
+        pages=pages,
+        cached=cached,
+        name_hits=name_stats["hits"],
+        name_misses=name_stats["misses"],
+        name_fetches=name_stats["fetched"] + name_stats["gateway"],
         duration_ms=int((time.perf_counter() - start) * 1000),
     )
 
 
-@bot.tree.command(name="departments", description="List company members by department")
+@bot.tree.command(name="departments", description="List company members by department", extras={"public_reply": True})
 async def departments_command(interaction: discord.Interaction):
     start = time.perf_counter()
     guild = interaction.guild
@@ -287,40 +990,27 @@ async def departments_command(interaction: discord.Interaction):
         await send_safe(interaction, "🏢 This command can only be used in a server.", ephemeral=True)
         return
 
-    registry = companies.get(guild_id, {})
+    registry = companies.get(guild_id)
     if not registry:
         await send_safe(interaction, "🏢 No members registered yet in this company.", ephemeral=True)
         return
 
-    # Defer early for potentially heavy grouping/formatting
+    # Defer early; a cold page may need member lookups
     await maybe_defer(interaction, ephemeral=False)
 
-    # Group members by department
-    depts: dict[str, list[str]] = {}
-    for uid, data in registry.items():
-        dept = data["dept"]
-        member = guild.get_member(uid)
-        if member is None:
-            try:
-                member = await guild.fetch_member(uid)
-            except Exception:
-                member = None
-        name = member.display_name if member else f"Unknown User ({uid})"
-        depts.setdefault(dept, []).append(f"{name} — {data['role']}")
-
-    # Format
-    lines = [f"🏢 **{guild.name} — Departments:**"]
-    for dept, members in depts.items():
-        lines.append(f"\n**{dept}:**")
-        for m in members:
-            lines.append(f"- {m}")
-
-    await send_safe(interaction, "\n".join(lines), ephemeral=False)
+    text, page, pages, cached, name_stats = await render_listing_page(guild, DEPARTMENTS, 0)
+    view = ListingView(guild, DEPARTMENTS, interaction.user.id, page, pages) if pages > 1 else None
+    await send_safe(interaction, text, ephemeral=False, view=view)
     log_event(
         "cmd_departments",
         guild_id=guild_id,
         user_id=getattr(interaction.user, "id", None),
-        dept_count=len(depts),
+        dept_count=len(aggregates[guild_id].dept_counts),
+        pages=pages,
+        cached=cached,
+        name_hits=name_stats["hits"],
+        name_misses=name_stats["misses"],
+        name_fetches=name_stats["fetched"] + name_stats["gateway"],
         duration_ms=int((time.perf_counter() - start) * 1000),
     )
 
@@ -333,8 +1023,8 @@ async def profile_command(interaction: discord.Interaction):
         await send_safe(interaction, "🏢 This command can only be used in a server.", ephemeral=True)
         return
 
-    registry = companies.get(guild_id, {})
-    user_data = registry.get(interaction.user.id)
+    registry = companies.get(guild_id)
+    user_data = registry.get(interaction.user.id) if registry else None
     if not user_data:
         await send_safe(interaction, "You don't have a profile yet. Run `/ocean` first to get your archetype!", ephemeral=True)
         return
@@ -348,46 +1038,30 @@ async def profile_command(interaction: discord.Interaction):
     await send_safe(interaction, msg, ephemeral=True)
 
 
-@bot.tree.command(name="summary", description="See a quick company-wide archetype summary")
-@discord.app_commands.describe(mode="Choose 'concise' or 'detailed' output")
-@discord.app_commands.choices(
-    mode=[
-        discord.app_commands.Choice(name="Concise", value="concise"),
-        discord.app_commands.Choice(name="Detailed", value="detailed"),
-    ]
-)
-async def summary_command(interaction: discord.Interaction, mode: Optional[str] = None):
-    start = time.perf_counter()
-    is_detailed = (mode == "detailed")
-    guild = interaction.guild
-    guild_id = guild.id if guild else None
-    if guild_id is None:
-        await send_safe(interaction, "🏢 This command can only be used in a server.", ephemeral=True)
-        return
-
-    registry = companies.get(guild_id, {})
-    if not registry:
-        await send_safe(interaction, "🏢 No members registered yet in this company.", ephemeral=True)
-        return
+def describe_teamwork(index: float) -> str:
+    if index >= 0.80:
+        return "Highly Synergistic 🤝"
+    if index >= 0.60:
+        return "Collaborative Potential 🌱"
+    if index >= 0.40:
+        return "Imbalanced ⚖️"
+    return "Team Disruptor ⚡"
 
-    # Defer for heavier aggregation & embed construction
-    await maybe_defer(interaction, ephemeral=False)
 
+def render_summary(title: str, agg: GuildAggregates, is_detailed: bool) -> tuple[Optional[str], Optional[discord.Embed], int, float]:
+    """Render /summary from a guild's running aggregates: (text, embed, members,
+    teamwork_index), with exactly one of text and embed set."""
     # Count totals
-    total = len(registry)
-    dept_counts = Counter(data["dept"] for data in registry.values())
-    role_counts = Counter(data["role"] for data in registry.values())
+    total = agg.count
+    dept_counts = agg.dept_counts
+    role_counts = agg.role_counts
     top_roles = ", ".join(r for r, _ in role_counts.most_common(3))
 
     # Format department counts
     depts_text = "\n".join([f"- {dept}: {count}" for dept, count in dept_counts.items()])
 
     # --- Compute average OCEAN for fun insight ---
-    trait_sums = {"O": 0, "C": 0, "E": 0, "A": 0, "N": 0}
-    for data in registry.values():
-        for t in trait_sums:
-            trait_sums[t] += data["traits"][t]
-    avg_traits = {t: trait_sums[t] / total for t in trait_sums}
+    avg_traits = agg.averages()
     norm = {t: (avg_traits[t] - 60) / 60 for t in avg_traits}
 
     # Rank traits
@@ -405,41 +1079,9 @@ async def summary_command(interaction: discord.Interaction, mode: Optional[str]
         }[t]
 
     # --- Teamwork Index (Curșeu et al. 2018) ---
-    def teamwork_value(trait_score):
-        """Inverted U-curve: moderate levels optimal for teamwork"""
-        x = trait_score / 120
-        # Peak at 0.5, drop symmetrically toward 0 and 1
-        return 1 - 4 * (x - 0.5)**2
-
-    # Compute teamwork index for E, A, C (inverted U) + stability/openness bonuses
-    e_avg = sum(data["traits"]["E"] for data in registry.values()) / total
-    a_avg = sum(data["traits"]["A"] for data in registry.values()) / total
-    c_avg = sum(data["traits"]["C"] for data in registry.values()) / total
-    o_avg = sum(data["traits"]["O"] for data in registry.values()) / total
-    n_avg = sum(data["traits"]["N"] for data in registry.values()) / total
-
-    teamwork_index = (
-        teamwork_value(e_avg) +
-        teamwork_value(a_avg) + 
-        teamwork_value(c_avg)
-    ) / 3
-
-    # Add emotional stability bonus (low N) and moderate O bonus
-    teamwork_index += 0.1 * ((120 - n_avg) / 120)  # Emotional stability boost
-    teamwork_index += 0.05 * (1 - abs((o_avg / 120) - 0.5) * 2)  # Mid-range O bonus
-    
-    # Clamp to [0, 1]
-    teamwork_index = max(0, min(1, teamwork_index))
-
-    # Teamwork interpretation
-    if teamwork_index >= 0.80:
-        teamwork_label = "Highly Synergistic 🤝"
-    elif teamwork_index >= 0.60:
-        teamwork_label = "Collaborative Potential 🌱"
-    elif teamwork_index >= 0.40:
-        teamwork_label = "Imbalanced ⚖️"
-    else:
-        teamwork_label = "Team Disruptor ⚡"
+    # Inverted U on E, A, C plus stability (low N) and mid-range O bonuses, clamped to [0, 1]
+    teamwork_index = float(group_teamwork_index(np.array([avg_traits[t] for t in TRAITS], dtype=np.float64), 1))
+    teamwork_label = describe_teamwork(teamwork_index)
 
     # --- Fun vibe tiers ---
     avg_spread = top_val - bottom_val
@@ -463,7 +1105,7 @@ async def summary_command(interaction: discord.Interaction, mode: Optional[str]
     if is_detailed:
         # Professional embed for detailed view
         embed = discord.Embed(
-            title=f"🏢 {guild.name} — Company Summary",
+            title=f"🏢 {title} — Company Summary",
             description=f"👥 **Members:** {total}\n✨ *{vibe_line}*",
             color=discord.Color.blurple()
         )
@@ -506,16 +1148,74 @@ async def summary_command(interaction: discord.Interaction, mode: Optional[str]
         # Research note footer for transparency
         embed.set_footer(text="Teamwork Fit uses moderate-trait weighting (Curșeu et al., 2018). See docs/SCIENTIFIC_FRAMEWORK.txt")
 
-        await send_safe(interaction, embed=embed, ephemeral=False)
+        return None, embed, total, teamwork_index
     else:
         # Simple text output for basic view
         msg = (
-            f"🏢 **{guild.name} — Company Summary**\n"
+            f"🏢 **{title} — Company Summary**\n"
             f"👥 Members: {total}\n\n"
             f"**Departments:**\n{depts_text}\n\n"
             f"**Top Roles:** {top_roles or '—'}\n\n"
             f"✨ *{vibe_line}*"
         )
+        return msg, None, total, teamwork_index
+
+
+# Rendered /summary per (guild, mode). The render never awaits, so this is a plain
+# result cache: single flight ("joined") only comes into play for /teams
+summaries = RenderCache()
+
+
+def _render_version(guild: discord.Guild):
+    """Version key for renders of a guild's registry (/summary, /teams): the guild
+    name is part of their titles."""
+    return registry_versions.get(guild.id, 0), guild.name
+
+
+@bot.tree.command(name="summary", description="See a quick company-wide archetype summary", extras={"public_reply": True})
+@discord.app_commands.describe(mode="Choose 'concise' or 'detailed' output")
+@discord.app_commands.choices(
+    mode=[
+        discord.app_commands.Choice(name="Concise", value="concise"),
+        discord.app_commands.Choice(name="Detailed", value="detailed"),
+    ]
+)
+async def summary_command(interaction: discord.Interaction, mode: Optional[str] = None):
+    start = time.perf_counter()
+    is_detailed = (mode == "detailed")
+    guild = interaction.guild
+    guild_id = guild.id if guild else None
+    if guild_id is None:
+        await send_safe(interaction, "🏢 This command can only be used in a server.", ephemeral=True)
+        return
+
+    registry = companies.get(guild_id)
+    if not registry:
+        await send_safe(interaction, "🏢 No members registered yet in this company.", ephemeral=True)
+        return
+
+    if _level_ok("DEBUG"):
+        # Debug-only full recompute to catch drift between aggregates and registry
+        diffs = (aggregates.get(guild_id) or GuildAggregates()).mismatches(registry)
+        if diffs:
+            log_event("aggregate_mismatch", level="ERROR", guild_id=guild_id, fields=diffs, members=len(registry))
+            aggregates[guild_id] = GuildAggregates.from_table(registry)
+            # Summaries rendered from the drifted aggregates are stale too
+            registry_versions[guild_id] = registry_versions.get(guild_id, 0) + 1
+
+    key = (guild_id, "detailed" if is_detailed else "concise")
+    if summaries.peek(key, _render_version(guild)) is None:
+        # Defer for aggregation & embed construction; a cached render goes out directly
+        await maybe_defer(interaction, ephemeral=False)
+
+    async def build():
+        # Running aggregates: O(1) regardless of member count
+        return render_summary(guild.name, aggregates.get(guild_id) or GuildAggregates(), is_detailed)
+
+    (msg, embed, total, teamwork_index), source = await summaries.get(key, _render_version(guild), build)
+    if embed is not None:
+        await send_safe(interaction, embed=embed, ephemeral=False)
+    else:
         await send_safe(interaction, msg, ephemeral=False)
 
     log_event(
@@ -525,6 +1225,122 @@ async def summary_command(interaction: discord.Interaction, mode: Optional[str]
         detailed=is_detailed,
         members=total,
         teamwork_index=round(teamwork_index, 3),
+        render=source,
+        duration_ms=int((time.perf_counter() - start) * 1000),
+    )
+
+
+# --- /teams: balanced splits by teamwork index ---
+TEAMS_MIN, TEAMS_MAX = 2, 10
+TEAMS_TIME_BUDGET = int(os.getenv("TEAMS_TIME_BUDGET_MS", "800")) / 1000
+# Embeds are capped at 6000 characters in total, so member lists share this much
+TEAMS_MENTION_CHARS = 5000
+
+# Rendered /teams per (guild, k); concurrent misses share one split
+team_splits = RenderCache(max_entries=256)
+
+
+def _member_list(uids: list[int], limit: int) -> str:
+    """Mentions (which don't ping inside embeds) up to `limit` characters, then "… and N more"."""
+    shown, used = [], 0
+    for i, uid in enumerate(uids):
+        mention = f"<@{uid}>"
+        left = len(uids) - i - 1
+        # Room for this mention plus the "… and N more" that may have to follow it
+        if used + len(mention) + (len(f" … and {left} more") if left else 0) > limit:
+            shown.append(f"… and {left + 1} more")
+            break
+        shown.append(mention)
+        used += len(mention) + 1
+    return " ".join(shown) or "—"
+
+
+def render_teams(title: str, uids: np.ndarray, traits: np.ndarray, dept_codes: np.ndarray, dept_names: list[str], team_of: np.ndarray, k: int, stats: dict):
+    """Embed listing each team's teamwork index, department mix and members, plus
+    {user_id: team number} for the "you're on" line."""
+    teams = team_summaries(traits, dept_codes, team_of, k)
+    embed = discord.Embed(
+        title=f"🧩 {title} — {k} Teams",
+        description=(
+            f"👥 **Members:** {len(uids)}\n"
+            f"⚖️ Weakest team: 🤝 {stats['min']:.2f} — {describe_teamwork(stats['min'])}"
+        ),
+        color=discord.Color.blurple(),
+    )
+    per_team = min(1024, TEAMS_MENTION_CHARS // k)
+    for number, team in enumerate(teams, start=1):
+        mix = sorted(team["depts"].items(), key=lambda kv: (-kv[1], dept_names[kv[0]]))
+        mix_text = " · ".join(f"{dept_names[code]} {count}" for code, count in mix[:4])
+        if len(mix) > 4:
+            mix_text += f" · +{len(mix) - 4}"
+        header = f"🤝 {team['index']:.2f} · {team['size']} members\n🏢 {mix_text}\n"
+        embed.add_field(
+            name=f"Team {number} — {describe_teamwork(team['index'])}",
+            value=header + _member_list(uids[team["rows"]].tolist(), per_team - len(header)),
+            inline=False,
+        )
+    embed.set_footer(text="Teams balance the weakest team's Teamwork Fit (Curșeu et al., 2018); department counts differ by at most one between teams.")
+    team_by_uid = dict(zip(uids.tolist(), (team_of + 1).tolist()))
+    return embed, team_by_uid
+
+
+@bot.tree.command(name="teams", description="Split registered members into balanced teams", extras={"public_reply": True})
+@discord.app_commands.describe(k="Number of teams (2–10)")
+async def teams_command(interaction: discord.Interaction, k: int):
+    start = time.perf_counter()
+    guild = interaction.guild
+    guild_id = guild.id if guild else None
+    if guild_id is None:
+        await send_safe(interaction, "🏢 This command can only be used in a server.", ephemeral=True)
+        return
+    if not TEAMS_MIN <= k <= TEAMS_MAX:
+        await send_safe(interaction, f"⚠️ Choose between {TEAMS_MIN} and {TEAMS_MAX} teams.", ephemeral=True)
+        return
+
+    registry = companies.get(guild_id)
+    if not registry or len(registry) < k:
+        await send_safe(interaction, f"🏢 Need at least {k} registered members for {k} teams.", ephemeral=True)
+        return
+
+    key = (guild_id, k)
+    if team_splits.peek(key, _render_version(guild)) is None:
+        await maybe_defer(interaction, ephemeral=False)
+
+    async def build():
+        # Copied now, so writes while the split waits for a worker can't reach it
+        uids = registry.uid_array().copy()
+        traits = registry.trait_array().copy()
+        dept_codes = registry.dept_codes[: len(registry)].copy()
+        dept_names = list(registry.depts.names)
+        if len(uids) < k:
+            # Members left (/forget) while this command deferred
+            return None
+        team_of, stats = await offload.run(
+            "teams", partition_teams, traits, dept_codes, k, size=len(uids), budget=TEAMS_TIME_BUDGET, seed=guild_id,
+        )
+        embed, team_by_uid = render_teams(guild.name, uids, traits, dept_codes, dept_names, team_of, k, stats)
+        return embed, team_by_uid, stats
+
+    split, source = await team_splits.get(key, _render_version(guild), build)
+    if split is None:
+        await send_safe(interaction, f"🏢 Need at least {k} registered members for {k} teams.", ephemeral=True)
+        return
+    embed, team_by_uid, stats = split
+    mine = team_by_uid.get(interaction.user.id)
+    await send_safe(interaction, f"🧩 You're on **Team {mine}**." if mine else None, embed=embed, ephemeral=False)
+
+    log_event(
+        "cmd_teams",
+        guild_id=guild_id,
+        user_id=getattr(interaction.user, "id", None),
+        k=k,
+        members=len(team_by_uid),
+        min_index=stats["min"],
+        seed_min_index=stats["seed_min"],
+        swaps=stats["swaps"],
+        stopped=stats["stopped"],
+        split_ms=stats["elapsed_ms"],
+        render=source,
         duration_ms=int((time.perf_counter() - start) * 1000),
     )
 
@@ -538,7 +1354,9 @@ async def help_command(interaction: discord.Interaction):
         "/company — list members registered in this server (company).",
         "/departments — list members grouped by department.",
         "/summary — view company-wide summary (add 'mode: Detailed' for charts).",
+        "/teams k — split members into k balanced teams (2–10) by teamwork index.",
         "/forget — delete your stored data from this server.",
+        "/roles_upload file — (Manage Server) use your own roles YAML in this server; /roles_reset goes back to the default roles.",
         "/about — learn about the project and references.",
     ]
     await send_safe(interaction, "\n".join(lines), ephemeral=True)
@@ -569,8 +1387,8 @@ async def forget_command(interaction: discord.Interaction):
     if guild_id is None:
         await send_safe(interaction, "This command can only be used in a server.", ephemeral=True)
         return
-    registry = companies.get(guild_id, {})
-    removed = registry.pop(interaction.user.id, None)
+    removed = registry_delete(guild_id, interaction.user.id)
+    member_names.invalidate(guild_id, interaction.user.id)
     if removed is None:
         await send_safe(interaction, "No stored data found for you in this server.", ephemeral=True)
     else:
@@ -578,59 +1396,229 @@ async def forget_command(interaction: discord.Interaction):
     log_event("cmd_forget", guild_id=guild_id, user_id=getattr(interaction.user, "id", None), removed=bool(removed))
 
 
-@bot.tree.command(name="import_json", description="Import Big Five test results (JSON from bigfive-web). [Preview only]")
+@bot.tree.command(name="import_json", description="Import Big Five test results (JSON from bigfive-web).")
 async def import_json_command(interaction: discord.Interaction, attachment: discord.Attachment):
-    """Skeleton importer. Reads attached JSON and previews normalized facets.
-    Non-breaking: does not mutate state yet. Uses existing safe-send and logging.
+    """Import a bigfive-web result: domains and facets are normalized, matched with the
+    facet-blended scorer, and stored like /ocean. Missing domains are derived from facets.
     """
     start = time.perf_counter()
     await maybe_defer(interaction, ephemeral=True)
-    if normalize_facets_payload is None:
-        await send_safe(
-            interaction,
-            "Facet import not enabled in this build. Please ensure persona/facets.py is available.",
-            ephemeral=True,
+    try:
+        raw_bytes = await attachment.read()
+        profile = await offload.run("import_json", parse_import_payload, raw_bytes, size=len(raw_bytes))
+    except Exception as e:
+        await send_safe(interaction, "Failed to parse the attached JSON.", ephemeral=True)
+        log_event(
+            "cmd_import_json_error",
+            level="ERROR",
+            guild_id=getattr(interaction.guild, "id", None),
+            user_id=getattr(interaction.user, "id", None),
+            error=str(e),
+            duration_ms=int((time.perf_counter() - start) * 1000),
         )
+        return
+    if profile is None:
+        await send_safe(interaction, "⚠️ No Big Five domain or facet scores found in the attached JSON.", ephemeral=True)
         log_event(
-            "cmd_import_json_disabled",
+            "cmd_import_json_empty",
             level="WARN",
             guild_id=getattr(interaction.guild, "id", None),
             user_id=getattr(interaction.user, "id", None),
         )
         return
+
+    signed, facets, known = profile
+    # Stored traits use the /ocean 0–120 scale so listings, /summary and re-matching agree
+    traits = {t: int(round((signed[t] + 1.0) * 60.0)) for t in TRAITS}
+    # Rounded before matching so a later re-match of the stored profile agrees
+    use_facets = [round(v, 4) for v in facets] if known else None
+    guild = interaction.guild
+    guild_id = guild.id if guild else None
+    role, desc, dept, _ = match_one(await load_matcher(guild_id), *(float(traits[t]) for t in TRAITS), facets=use_facets)
+    if guild_id is not None:
+        entry = {"traits": traits, "role": role, "dept": dept}
+        if use_facets is not None:
+            entry["facets"] = use_facets
+        registry_put(guild_id, interaction.user.id, entry)
+        member_names.remember(guild_id, interaction.user.id, interaction.user.display_name)
+    stored_line = f"\n🗂️ Stored in company: `{guild.name}`" if guild_id is not None else ""
+    basis = f"{known}/{len(FACET_NAMES)} facets + domains" if known else "domains only"
+    await send_safe(
+        interaction,
+        f"🎭 **{role}** — {desc}\n🏢 Department: *{dept}*\n📊 Matched on {basis}{stored_line}",
+        ephemeral=True,
+    )
+    log_event(
+        "cmd_import_json",
+        guild_id=guild_id,
+        user_id=getattr(interaction.user, "id", None),
+        facet_count=known,
+        role=role,
+        duration_ms=int((time.perf_counter() - start) * 1000),
+    )
+
+
+def _prepare_guild_roles(guild_id: int, raw: bytes):
+    """Validate, compile and store an uploaded roles file (runs in a worker thread).
+    Returns (compiled, digest, report); compiled and digest are None if it was rejected."""
+    import yaml
+
+    report = io.StringIO()
+    try:
+        data = yaml.safe_load(raw.decode("utf-8"))
+    except (UnicodeDecodeError, yaml.YAMLError) as e:
+        return None, None, f"❌ Not a readable YAML file: {e}"
+    if validate_roles_data(data, out=report) != 0:
+        return None, None, report.getvalue()
+    if len(data["roles"]) > GUILD_ROLES_MAX_ROLES:
+        return None, None, f"❌ Too many roles: {len(data['roles'])} (limit {GUILD_ROLES_MAX_ROLES})"
+    compiled = compile_roles(data["roles"])
+    digest = guild_roles.write(guild_id, raw, compiled)
+    return compiled, digest, report.getvalue()
+
+
+_guild_roles_lock = asyncio.Lock()
+_guild_rematch_tasks: dict[int, asyncio.Task] = {}
+
+
+async def _rematch_guild_and_log(guild_id: int, compiled, current, *, source: str):
+    start = time.perf_counter()
+    try:
+        changed = await rematch_guild(guild_id, compiled, current)
+    finally:
+        if _guild_rematch_tasks.get(guild_id) is asyncio.current_task():
+            del _guild_rematch_tasks[guild_id]
+    log_event(
+        "guild_roles_rematched",
+        guild_id=guild_id,
+        source=source,
+        changed=changed or 0,
+        superseded=changed is None,
+        members=len(companies.get(guild_id) or ()),
+        duration_ms=int((time.perf_counter() - start) * 1000),
+    )
+
+
+def _start_guild_rematch(guild_id: int, compiled, current, *, source: str) -> None:
+    """Re-match one guild in the background, cancelling its previous re-match."""
+    previous = _guild_rematch_tasks.get(guild_id)
+    if previous is not None and not previous.done():
+        previous.cancel()
+    _guild_rematch_tasks[guild_id] = asyncio.create_task(_rematch_guild_and_log(guild_id, compiled, current, source=source))
+
+
+def _report_excerpt(report: str, limit: int = 1500) -> str:
+    lines = [line for line in report.strip().splitlines() if line.startswith(("❌", "⚠️"))] or report.strip().splitlines()
+    text = "\n".join(lines)
+    return text if len(text) <= limit else text[:limit].rsplit("\n", 1)[0] + "\n…"
+
+
+@bot.tree.command(name="roles_upload", description="Use your own roles file (YAML like roles.yaml) in this server")
+@discord.app_commands.guild_only()
+@discord.app_commands.default_permissions(manage_guild=True)
+async def roles_upload_command(interaction: discord.Interaction, attachment: discord.Attachment):
+    """Validate an uploaded roles file with the roles.yaml checks, store it for this
+    guild, and re-match the guild's stored members against it in the background."""
+    start = time.perf_counter()
+    guild_id = interaction.guild.id
+    user_id = getattr(interaction.user, "id", None)
+    if not interaction.permissions.manage_guild:
+        await send_safe(interaction, "🔒 You need the Manage Server permission to change this server's roles.", ephemeral=True)
+        log_event("cmd_roles_upload", level="WARN", guild_id=guild_id, user_id=user_id, status="forbidden")
+        return
+    if attachment.size > GUILD_ROLES_MAX_BYTES:
+        await send_safe(
+            interaction, f"⚠️ Roles file is too large (limit {GUILD_ROLES_MAX_BYTES // 1024} KiB).", ephemeral=True
+        )
+        log_event("cmd_roles_upload", level="WARN", guild_id=guild_id, user_id=user_id, status="too_large", bytes=attachment.size)
+        return
+    await maybe_defer(interaction, ephemeral=True)
     try:
-        raw_bytes = await attachment.read()
-        data = json.loads(raw_bytes.decode("utf-8"))
-        facets = normalize_facets_payload(data)
-        shown = ", ".join(list(facets.keys())[:MAX_PREVIEW_FACETS]) or "(none)"
+        raw = await attachment.read()
+        async with _guild_roles_lock:
+            compiled, digest, report = await asyncio.to_thread(_prepare_guild_roles, guild_id, raw)
+            if compiled is not None:
+                guild_roles.activate(guild_id, digest, compiled)
+    except Exception as e:
+        await send_safe(interaction, "⚠️ Couldn't store the roles file. Please try again.", ephemeral=True)
+        log_event(
+            "cmd_roles_upload",
+            level="ERROR",
+            guild_id=guild_id,
+            user_id=user_id,
+            status="error",
+            error=str(e),
+            duration_ms=int((time.perf_counter() - start) * 1000),
+        )
+        return
+    if compiled is None:
         await send_safe(
             interaction,
-            f"Imported JSON parsed. Example facets: {shown}\nNote: This is a preview; no data stored.",
+            f"❌ Roles file rejected; this server keeps its current roles.\n```\n{_report_excerpt(report)}\n```",
             ephemeral=True,
         )
         log_event(
-            "cmd_import_json",
-            guild_id=getattr(interaction.guild, "id", None),
-            user_id=getattr(interaction.user, "id", None),
-            facet_count=len(facets),
+            "cmd_roles_upload",
+            level="WARN",
+            guild_id=guild_id,
+            user_id=user_id,
+            status="rejected",
+            report=report.strip().splitlines(),
             duration_ms=int((time.perf_counter() - start) * 1000),
         )
-    except Exception as e:
-        await send_safe(interaction, "Failed to parse the attached JSON.", ephemeral=True)
-        log_event(
-            "cmd_import_json_error",
-            level="ERROR",
-            guild_id=getattr(interaction.guild, "id", None),
-            user_id=getattr(interaction.user, "id", None),
-            error=str(e),
-            duration_ms=int((time.perf_counter() - start) * 1000),
+        return
+    _start_guild_rematch(
+        guild_id, compiled, lambda: guild_roles.digest(guild_id) == digest, source="upload"
+    )
+    warnings = sum(1 for line in report.splitlines() if line.startswith("⚠️"))
+    warning_line = f"\n{_report_excerpt(report)}" if warnings else ""
+    await send_safe(
+        interaction,
+        f"✅ This server now uses **{len(compiled)}** custom roles. Stored members are being re-matched.{warning_line}",
+        ephemeral=True,
+    )
+    log_event(
+        "cmd_roles_upload",
+        guild_id=guild_id,
+        user_id=user_id,
+        status="ok",
+        roles=len(compiled),
+        warnings=warnings,
+        sha256=digest[:12],
+        cache=guild_roles.cache.stats(),
+        duration_ms=int((time.perf_counter() - start) * 1000),
+    )
+
+
+@bot.tree.command(name="roles_reset", description="Go back to the default roles in this server")
+@discord.app_commands.guild_only()
+@discord.app_commands.default_permissions(manage_guild=True)
+async def roles_reset_command(interaction: discord.Interaction):
+    guild_id = interaction.guild.id
+    user_id = getattr(interaction.user, "id", None)
+    if not interaction.permissions.manage_guild:
+        await send_safe(interaction, "🔒 You need the Manage Server permission to change this server's roles.", ephemeral=True)
+        log_event("cmd_roles_reset", level="WARN", guild_id=guild_id, user_id=user_id, status="forbidden")
+        return
+    async with _guild_roles_lock:
+        removed = guild_roles.remove(guild_id)
+    if removed:
+        compiled = role_matrix
+        _start_guild_rematch(
+            guild_id, compiled, lambda: compiled is role_matrix and guild_id not in guild_roles, source="reset"
         )
+        await send_safe(interaction, "✅ This server is back on the default roles. Stored members are being re-matched.", ephemeral=True)
+    else:
+        await send_safe(interaction, "This server already uses the default roles.", ephemeral=True)
+    log_event("cmd_roles_reset", guild_id=guild_id, user_id=user_id, status="ok", removed=removed)
 
 
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: Exception):
     # Friendly cooldown feedback takes precedence
     if isinstance(error, discord.app_commands.CommandOnCooldown):
+        m_cooldowns.inc(command=_cmd_name(interaction))
+        record_command(interaction, "cooldown")
         try:
             await send_safe(
                 interaction,
@@ -649,6 +1637,7 @@ async def on_app_command_error(interaction: discord.Interaction, error: Exceptio
             retry_after=round(getattr(error, "retry_after", 0.0), 3),
         )
         return
+    record_command(interaction, "error")
     try:
         msg = "⚠️ Something went wrong. Please try again."
         if interaction.response.is_done():
@@ -669,6 +1658,166 @@ async def on_app_command_error(interaction: discord.Interaction, error: Exceptio
     )
 
 
+# --- HTTP interactions endpoint (INTERACTIONS_MODE=http) ---
+INTERACTIONS_HOST = os.getenv("INTERACTIONS_HOST", "127.0.0.1")
+INTERACTIONS_PORT = int(os.getenv("INTERACTIONS_PORT", "8080"))
+INTERACTIONS_PATH = os.getenv("INTERACTIONS_PATH", "/interactions")
+# Seconds a handler has to answer before the endpoint defers for it (Discord allows 3)
+INTERACTIONS_ACK_TIMEOUT = float(os.getenv("INTERACTIONS_ACK_TIMEOUT", "2.5"))
+# Interaction payloads carry only the guild id; names are fetched once and cached
+GUILD_NAME_TTL = 600.0
+GUILD_NAME_CACHE_SIZE = 10000
+guild_names: "OrderedDict[int, tuple[str, float]]" = OrderedDict()
+# guild id -> in-flight fetch_guild, shared by concurrent interactions for that guild
+guild_name_fetches: dict[int, asyncio.Future] = {}
+interactions_server: Optional[InteractionServer] = None
+
+
+# Left in the original response when a late reply's visibility differs from the automatic
+# defer's, so the reply goes out as a followup with its own flags instead
+LATE_PRIVATE_NOTICE = "🔒 Replied privately."
+LATE_PUBLIC_NOTICE = "📣 Replied in the channel."
+
+
+class InlineResponseAdapter(AsyncWebhookAdapter):
+    """Webhook adapter for HTTP mode: a handler's initial response (send_message,
+    defer, edit_message) becomes the body of the pending HTTP response instead of a
+    callback REST call. After an automatic defer, a late reply edits the original
+    response if both have the same visibility. Otherwise the original gets a short
+    notice and the reply becomes a followup, so private content never lands in a
+    public message. Everything else (followups, edits) is plain REST."""
+
+    async def create_interaction_response(self, interaction_id, token, *, session, proxy=None, proxy_auth=None, params):
+        if interactions_server is None:
+            return await super().create_interaction_response(
+                interaction_id, token, session=session, proxy=proxy, proxy_auth=proxy_auth, params=params)
+        files = params.files
+        if files:
+            body = json.loads(next(f["value"] for f in params.multipart if f["name"] == "payload_json"))
+        else:
+            body = params.payload
+        data = body.get("data") or {}
+        ephemeral = bool(data.get("flags", 0) & EPHEMERAL_FLAG)
+        if files:
+            # Attachments can't ride in the HTTP response: defer there, then edit them in
+            deferral = {"type": 5 if body["type"] == 4 else 6}
+            if data.get("flags"):
+                deferral["data"] = {"flags": data["flags"]}
+            outcome = interactions_server.respond(interaction_id, deferral)
+            if outcome == INLINE:
+                # Our own defer, with the reply's visibility
+                outcome = DEFERRED_EPHEMERAL if ephemeral else DEFERRED
+        else:
+            outcome = interactions_server.respond(interaction_id, body)
+        if outcome is None:
+            return await super().create_interaction_response(
+                interaction_id, token, session=session, proxy=proxy, proxy_auth=proxy_auth, params=params)
+        auth = dict(session=session, proxy=proxy, proxy_auth=proxy_auth)
+        # Component updates edit the clicked message, which keeps its visibility
+        mismatch = body["type"] in (4, 5) and outcome != INLINE and (outcome == DEFERRED_EPHEMERAL) != ephemeral
+        if mismatch:
+            # Settle the original first: once it stops loading, followups are new
+            # messages that keep their own flags instead of filling it in
+            notice = LATE_PRIVATE_NOTICE if ephemeral else LATE_PUBLIC_NOTICE
+            await self.edit_webhook_message(bot.application_id, token, "@original", payload={"content": notice}, **auth)
+            if body["type"] == 4:
+                multipart = None
+                if files:
+                    multipart = [dict(f, value=json.dumps(data)) if f["name"] == "payload_json" else f for f in params.multipart]
+                await self.execute_webhook(
+                    bot.application_id, token, payload=None if files else data, multipart=multipart, files=files, **auth)
+        elif outcome != INLINE and body["type"] in (4, 7):
+            edit = {k: v for k, v in data.items() if k != "flags"}
+            multipart = None
+            if files:
+                multipart = [dict(f, value=json.dumps(edit)) if f["name"] == "payload_json" else f for f in params.multipart]
+            await self.edit_webhook_message(
+                bot.application_id, token, "@original", payload=None if files else edit, multipart=multipart, files=files, **auth)
+        return {"interaction": {
+            "id": str(interaction_id),
+            "type": 2,
+            "response_message_loading": body["type"] == 5,
+            "response_message_ephemeral": ephemeral,
+        }}
+
+
+inline_adapter = InlineResponseAdapter()
+
+
+async def _guild_name(guild_id: int) -> Optional[str]:
+    now = time.monotonic()
+    cached = guild_names.get(guild_id)
+    if cached is not None and now - cached[1] < GUILD_NAME_TTL:
+        guild_names.move_to_end(guild_id)
+        return cached[0]
+    future = guild_name_fetches.get(guild_id)
+    if future is None:
+        future = guild_name_fetches[guild_id] = asyncio.ensure_future(_fetch_guild_name(guild_id))
+        future.add_done_callback(lambda _: guild_name_fetches.pop(guild_id, None))
+    # Shielded: one interaction being cancelled must not cancel the shared fetch
+    name = await asyncio.shield(future)
+    # Fall back to a stale name if there is one; the next interaction retries
+    return name if name is not None else (cached[0] if cached else None)
+
+
+async def _fetch_guild_name(guild_id: int) -> Optional[str]:
+    try:
+        guild = await asyncio.wait_for(bot.fetch_guild(guild_id, with_counts=False), 1.0)
+    except (asyncio.TimeoutError, discord.HTTPException):
+        return None
+    guild_names[guild_id] = (guild.name, time.monotonic())
+    guild_names.move_to_end(guild_id)
+    while len(guild_names) > GUILD_NAME_CACHE_SIZE:
+        guild_names.popitem(last=False)
+    return guild.name
+
+
+def _on_dispatch_error(payload: dict, error: Exception):
+    log_event(
+        "interaction_dispatch_error",
+        level="ERROR",
+        interaction_id=payload.get("id"),
+        type=payload.get("type"),
+        cmd=(payload.get("data") or {}).get("name"),
+        guild_id=payload.get("guild_id"),
+        error=repr(error),
+    )
+
+
+async def dispatch_http_interaction(payload: dict) -> None:
+    """Hand a verified payload to the command tree, exactly as a gateway
+    INTERACTION_CREATE would be; the command runs in its own task."""
+    # The command task copies this context, so its initial response reaches the endpoint
+    async_context.set(inline_adapter)
+    guild_id = payload.get("guild_id")
+    if guild_id is not None:
+        guild = payload.setdefault("guild", {})
+        if not guild.get("name"):
+            name = await _guild_name(int(guild_id))
+            if name:
+                guild["name"] = name
+    bot._connection.parse_interaction_create(payload)
+
+
+async def run_http_interactions(token: str, public_key: str):
+    """Log in over REST (runs setup_hook: registry, metrics, command sync) and serve
+    the interactions endpoint until the bot is closed. No gateway connection."""
+    global interactions_server
+    verify = make_verifier(public_key)
+    async with bot:
+        await bot.login(token)
+        # Commands that reply in the channel say so up front (extras), for the automatic defer
+        public = [c.name for c in bot.tree.get_commands() if c.extras.get("public_reply")]
+        interactions_server = InteractionServer(
+            dispatch_http_interaction, verify, ack_timeout=INTERACTIONS_ACK_TIMEOUT, public_commands=public,
+            on_error=_on_dispatch_error)
+        await interactions_server.start(INTERACTIONS_HOST, INTERACTIONS_PORT, INTERACTIONS_PATH)
+        log_event("interactions_listening", host=INTERACTIONS_HOST, port=INTERACTIONS_PORT,
+                  path=INTERACTIONS_PATH)
+        print(f"✅ Logged in as {bot.user}; interactions endpoint on {INTERACTIONS_HOST}:{INTERACTIONS_PORT}{INTERACTIONS_PATH}")
+        await bot.stopped.wait()
+
+
 def run_discord():
     # Prefer env var, then file path (for Docker secrets), then legacy var
     token = os.getenv("DISCORD_BOT_TOKEN") or os.getenv("YOUR_DISCORD_BOT_TOKEN")
@@ -691,9 +1840,26 @@ def run_discord():
             "Tip: For a quick local test without Discord, run: python main.py 105 90 95 83 60"
         )
         sys.exit(1)
+    public_key = os.getenv("DISCORD_PUBLIC_KEY")
+    if HTTP_INTERACTIONS and not public_key:
+        print("❌ INTERACTIONS_MODE=http needs DISCORD_PUBLIC_KEY (the application's public key from the developer portal).")
+        sys.exit(1)
+    if HTTP_INTERACTIONS:
+        # No PyNaCl or a malformed key: refuse to serve rather than accept unverified requests
+        try:
+            make_verifier(public_key)
+        except (RuntimeError, ValueError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
     # Use the globally decorated bot instance with guarded login to avoid silent hangs
     try:
-        bot.run(token)
+        if HTTP_INTERACTIONS:
+            try:
+                asyncio.run(run_http_interactions(token, public_key))
+            except KeyboardInterrupt:
+                pass
+        else:
+            bot.run(token)
     except discord.errors.LoginFailure as e:
         log_event("login_failed", level="ERROR", error=str(e))
         print(f"❌ Login failed: {e}. Check DISCORD_BOT_TOKEN or regenerate the token.")
@@ -706,15 +1872,5 @@ def run_discord():
 
 # --- CLI fallback for quick testing ---
 if __name__ == "__main__":
-    if len(sys.argv) == 6:
-        try:
-            O, C, E, A, N = map(float, sys.argv[1:])
-            role, desc, dept, score = match_role(O, C, E, A, N)
-            print(f"Role: {role}\nDept: {dept}\nDesc: {desc}\nScore: {score:.3f}")
-        except Exception as e:
-            print("Error:", e)
-            print("Usage: python main.py O C E A N")
-            sys.exit(1)
-    else:
-        # Run discord bot if no CLI args
-        run_discord()
\ No newline at end of file
+    # Scoring CLI arguments were dispatched at the top of the file; anything else runs the bot
+    run_discord()
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+PersonaOCEAN per-guild running aggregates
+
+Purpose
+- Keep member count, O,C,E,A,N sums and dept/role counts for each guild
+- Update them in O(1) on every registry write/delete so /summary never rescans
+- Offer a full recompute for debug verification, vectorized over a GuildTable
+
+Entries use the registry shape: {traits: {O,C,E,A,N}, role: str, dept: str}.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable, Union
+
+import numpy as np
+
+from .columnar import GuildTable
+
+TRAIT_KEYS = ("O", "C", "E", "A", "N")
+
+
+class GuildAggregates:
+    __slots__ = ("count", "trait_sums", "dept_counts", "role_counts")
+
+    def __init__(self):
+        self.count = 0
+        self.trait_sums: dict[str, int] = {t: 0 for t in TRAIT_KEYS}
+        self.dept_counts: Counter = Counter()
+        self.role_counts: Counter = Counter()
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[dict]) -> "GuildAggregates":
+        agg = cls()
+        for entry in entries:
+            agg.add(entry)
+        return agg
+
+    @classmethod
+    def from_table(cls, table: GuildTable) -> "GuildAggregates":
+        """Full recompute with array operations: column sums and code bincounts."""
+        agg = cls()
+        agg.count = len(table)
+        sums = table.trait_array().sum(axis=0, dtype=np.int64).tolist()
+        agg.trait_sums = dict(zip(TRAIT_KEYS, sums))
+        agg.role_counts = _code_counts(table.role_codes[: len(table)], table.roles.names)
+        agg.dept_counts = _code_counts(table.dept_codes[: len(table)], table.depts.names)
+        return agg
+
+    def add(self, entry: dict) -> None:
+        traits = entry["traits"]
+        sums = self.trait_sums
+        for t in TRAIT_KEYS:
+            sums[t] += traits[t]
+        self.dept_counts[entry["dept"]] += 1
+        self.role_counts[entry["role"]] += 1
+        self.count += 1
+
+    def remove(self, entry: dict) -> None:
+        traits = entry["traits"]
+        sums = self.trait_sums
+        for t in TRAIT_KEYS:
+            sums[t] -= traits[t]
+        _decrement(self.dept_counts, entry["dept"])
+        _decrement(self.role_counts, entry["role"])
+        self.count -= 1
+
+    def averages(self) -> dict[str, float]:
+        if not self.count:
+            return {t: 0.0 for t in TRAIT_KEYS}
+        return {t: self.trait_sums[t] / self.count for t in TRAIT_KEYS}
+
+    def mismatches(self, entries: Union[GuildTable, Iterable[dict]]) -> list[str]:
+        """Compare against a full recompute; returns the names of fields that differ."""
+        if isinstance(entries, GuildTable):
+            fresh = GuildAggregates.from_table(entries)
+        else:
+            fresh = GuildAggregates.from_entries(entries)
+        diffs = []
+        if fresh.count != self.count:
+            diffs.append("count")
+        if fresh.trait_sums != self.trait_sums:
+            diffs.append("trait_sums")
+        if fresh.dept_counts != self.dept_counts:
+            diffs.append("dept_counts")
+        if fresh.role_counts != self.role_counts:
+            diffs.append("role_counts")
+        return diffs
+
+
+def _code_counts(codes: np.ndarray, names: list[str]) -> Counter:
+    counts = np.bincount(codes, minlength=len(names)).tolist()
+    return Counter({names[c]: k for c, k in enumerate(counts) if k})
+
+
+def _decrement(counter: Counter, key: str) -> None:
+    # Drop keys that reach zero so iteration and most_common() match a recompute
+    left = counter[key] - 1
+    if left > 0:
+        counter[key] = left
+    else:
+        del counter[key]
+
+
+__all__ = [
+    "GuildAggregates",
+]
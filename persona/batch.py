@@ -0,0 +1,246 @@
+"""
+PersonaOCEAN bulk scoring
+
+Purpose
+- Stream O,C,E,A,N score rows from a CSV or JSONL file (or stdin)
+- Score fixed-size chunks through the compiled matcher in one matrix product each
+- Write id,role,dept,score rows to stdout as each chunk finishes
+
+Memory stays bounded by chunk_size × in-flight chunks regardless of input size.
+With --workers N, chunks are parsed, scored and formatted in a process pool while
+the parent only splits rows and writes results in input order.
+
+Usage:
+  python main.py --batch scores.csv
+  cat scores.jsonl | python main.py --batch - --format jsonl --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from .matcher import TRAITS, CompiledRoles, match_roles_batch
+
+DEFAULT_CHUNK_SIZE = 4096
+# Accepted column/key spellings per trait (matched case-insensitively)
+TRAIT_ALIASES: dict[str, tuple[str, ...]] = {
+    "O": ("o", "openness"),
+    "C": ("c", "conscientiousness"),
+    "E": ("e", "extraversion"),
+    "A": ("a", "agreeableness"),
+    "N": ("n", "neuroticism"),
+}
+ID_KEYS = ("id", "user_id", "name")
+OUTPUT_FIELDS = ("id", "role", "dept", "score")
+
+_worker_roles: Optional[CompiledRoles] = None
+
+
+def _trait_index(fields: list[str]) -> tuple[list[int], Optional[int]]:
+    """Resolve trait columns (in TRAITS order) and the optional id column from a header."""
+    lowered = [f.strip().lower() for f in fields]
+    cols: list[int] = []
+    for t in TRAITS:
+        for alias in TRAIT_ALIASES[t]:
+            if alias in lowered:
+                cols.append(lowered.index(alias))
+                break
+        else:
+            raise ValueError(f"missing column for trait {t} (expected one of {', '.join(TRAIT_ALIASES[t])})")
+    id_col = next((lowered.index(k) for k in ID_KEYS if k in lowered), None)
+    return cols, id_col
+
+
+def _check_score(v) -> float:
+    f = float(v)
+    if not (0.0 <= f <= 120.0):
+        raise ValueError(f"score {v!r} out of range 0–120")
+    return f
+
+
+def _parse_csv_rows(rows: list[list[str]], cols: list[int], id_col: Optional[int], first_line: int):
+    ids, scores, errors = [], [], []
+    for offset, row in enumerate(rows):
+        line = first_line + offset
+        try:
+            scores.append([_check_score(row[c]) for c in cols])
+        except (ValueError, IndexError) as e:
+            errors.append(f"line {line}: {e}")
+            continue
+        ids.append(row[id_col] if id_col is not None and id_col < len(row) else str(line))
+    return ids, scores, errors
+
+
+def _parse_jsonl_rows(rows: list[str], first_line: int):
+    ids, scores, errors = [], [], []
+    for offset, raw in enumerate(rows):
+        line = first_line + offset
+        try:
+            obj = json.loads(raw)
+            if not isinstance(obj, dict):
+                raise ValueError("expected a JSON object")
+            lowered = {str(k).lower(): v for k, v in obj.items()}
+            vals = []
+            for t in TRAITS:
+                key = next((a for a in TRAIT_ALIASES[t] if a in lowered), None)
+                if key is None:
+                    raise ValueError(f"missing trait {t}")
+                vals.append(_check_score(lowered[key]))
+        except (ValueError, TypeError) as e:
+            errors.append(f"line {line}: {e}")
+            continue
+        scores.append(vals)
+        ident = next((lowered[k] for k in ID_KEYS if k in lowered), None)
+        ids.append(str(ident) if ident is not None else str(line))
+    return ids, scores, errors
+
+
+def score_chunk(compiled: CompiledRoles, fmt: str, out_fmt: str, rows: list, first_line: int,
+                cols: Optional[list[int]] = None, id_col: Optional[int] = None) -> tuple[str, int, list[str]]:
+    """Parse, score and format one chunk. Returns (output text, rows scored, error lines)."""
+    if fmt == "csv":
+        ids, scores, errors = _parse_csv_rows(rows, cols or [], id_col, first_line)
+    else:
+        ids, scores, errors = _parse_jsonl_rows(rows, first_line)
+    if not scores:
+        return "", 0, errors
+    result = match_roles_batch(compiled, np.asarray(scores, dtype=np.float64))
+    names, depts = result.names(), result.depts()
+    rounded = np.round(result.score, 3).tolist()
+    buf = io.StringIO()
+    if out_fmt == "csv":
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerows(zip(ids, names, depts, rounded))
+    else:
+        for row in zip(ids, names, depts, rounded):
+            buf.write(json.dumps(dict(zip(OUTPUT_FIELDS, row)), ensure_ascii=False))
+            buf.write("\n")
+    return buf.getvalue(), len(scores), errors
+
+
+def _init_worker(compiled: CompiledRoles) -> None:
+    global _worker_roles
+    _worker_roles = compiled
+
+
+def _score_chunk_worker(fmt, out_fmt, rows, first_line, cols, id_col):
+    return score_chunk(_worker_roles, fmt, out_fmt, rows, first_line, cols, id_col)
+
+
+def _chunks(rows: Iterable, size: int, first_line: int) -> Iterator[tuple[int, list]]:
+    chunk: list = []
+    line = first_line
+    start = line
+    for row in rows:
+        if not chunk:
+            start = line
+        chunk.append(row)
+        line += 1
+        if len(chunk) >= size:
+            yield start, chunk
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def run_batch(compiled: CompiledRoles, src, out, *, fmt: str = "csv", out_fmt: Optional[str] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 0, err=None) -> tuple[int, int]:
+    """Stream rows from `src` (a text file object) to `out`. Returns (scored, skipped)."""
+    err = err or sys.stderr
+    out_fmt = out_fmt or fmt
+    cols: Optional[list[int]] = None
+    id_col: Optional[int] = None
+    if fmt == "csv":
+        reader = csv.reader(src)
+        header = next(reader, None)
+        if header is None:
+            return 0, 0
+        cols, id_col = _trait_index(header)
+        rows: Iterable = reader
+        first_line = 2
+    else:
+        rows = (ln for ln in src if ln.strip())
+        first_line = 1
+    if out_fmt == "csv":
+        out.write(",".join(OUTPUT_FIELDS) + "\n")
+
+    scored = skipped = 0
+
+    def emit(result: tuple[str, int, list[str]]) -> None:
+        nonlocal scored, skipped
+        text, n, errors = result
+        if text:
+            out.write(text)
+            out.flush()
+        for e in errors:
+            print(e, file=err)
+        scored += n
+        skipped += len(errors)
+
+    if workers and workers > 1:
+        # Bounded in-flight window keeps memory constant and output in input order
+        window = workers * 2
+        pending: deque = deque()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(compiled,)) as pool:
+            for start, chunk in _chunks(rows, chunk_size, first_line):
+                pending.append(pool.submit(_score_chunk_worker, fmt, out_fmt, chunk, start, cols, id_col))
+                if len(pending) >= window:
+                    emit(pending.popleft().result())
+            while pending:
+                emit(pending.popleft().result())
+    else:
+        for start, chunk in _chunks(rows, chunk_size, first_line):
+            emit(score_chunk(compiled, fmt, out_fmt, chunk, start, cols, id_col))
+    return scored, skipped
+
+
+def main(argv: list[str], compiled: CompiledRoles) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python main.py --batch",
+        description="Score O,C,E,A,N rows from a CSV/JSONL file (or '-' for stdin) and write id,role,dept,score.",
+    )
+    parser.add_argument("path", help="input file, or '-' for stdin")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="input format (default: from extension, else csv)")
+    parser.add_argument("--output", choices=("csv", "jsonl"), help="output format (default: same as input)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help=f"rows per chunk (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--workers", type=int, default=0, help="score chunks in a pool of N processes")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be >= 1")
+
+    fmt = _detect_format(args.path, args.format)
+    try:
+        if args.path == "-":
+            scored, skipped = run_batch(compiled, sys.stdin, sys.stdout, fmt=fmt, out_fmt=args.output,
+                                        chunk_size=args.chunk_size, workers=args.workers)
+        else:
+            with open(args.path, "r", encoding="utf-8", newline="") as f:
+                scored, skipped = run_batch(compiled, f, sys.stdout, fmt=fmt, out_fmt=args.output,
+                                            chunk_size=args.chunk_size, workers=args.workers)
+    except (OSError, ValueError) as e:
+        print(f"❌ Batch scoring failed: {e}", file=sys.stderr)
+        return 1
+    print(f"✅ Scored {scored} row(s), skipped {skipped}", file=sys.stderr)
+    return 0
+
+
+__all__ = [
+    "DEFAULT_CHUNK_SIZE",
+    "main",
+    "run_batch",
+    "score_chunk",
+]
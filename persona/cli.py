@@ -0,0 +1,44 @@
+"""
+PersonaOCEAN scoring CLI (no Discord)
+
+  python main.py O C E A N
+  python main.py --batch FILE|- [--format csv|jsonl] [--workers N]
+
+main.py hands these argument shapes to `main()` before importing discord.py or
+building the bot, and roles come from the hash-keyed compiled cache
+(persona/core.py), so a one-off score only pays for numpy and the matcher.
+"""
+from __future__ import annotations
+
+from .core import DEFAULT_ROLES_PATH, load_compiled_roles
+from .matcher import match_one
+
+USAGE = "Usage: python main.py O C E A N  (or: python main.py --batch FILE)"
+
+
+def is_cli_args(argv: list[str]) -> bool:
+    """True for the scoring-only argument shapes (five scores, or --batch ...)."""
+    return (len(argv) >= 1 and argv[0] == "--batch") or len(argv) == 5
+
+
+def main(argv: list[str], roles_path: str = DEFAULT_ROLES_PATH) -> int:
+    if argv and argv[0] == "--batch":
+        from .batch import main as batch_main
+
+        return batch_main(argv[1:], load_compiled_roles(roles_path))
+    try:
+        O, C, E, A, N = map(float, argv)
+        role, desc, dept, score = match_one(load_compiled_roles(roles_path), O, C, E, A, N)
+    except Exception as e:
+        print("Error:", e)
+        print(USAGE)
+        return 1
+    print(f"Role: {role}\nDept: {dept}\nDesc: {desc}\nScore: {score:.3f}")
+    return 0
+
+
+__all__ = [
+    "USAGE",
+    "is_cli_args",
+    "main",
+]
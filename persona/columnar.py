@@ -0,0 +1,337 @@
+"""
+PersonaOCEAN columnar per-guild member table
+
+Purpose
+- Store a guild's registry as parallel arrays instead of one nested dict per member:
+  user ids in int64, O,C,E,A,N in a uint8 N×5 array (scores are 0–120), and
+  role/dept as uint16 codes into small per-table interned name lists
+- Upsert in O(1) through a uid→row index; delete in O(1) by swap-removing the last row
+- Drop names no member holds any more (compact_names) after a re-match, or when a
+  name table would outgrow the uint16 codes
+- Expose the arrays so aggregates, listings and re-matching run as array operations
+
+Reads that need the historical entry shape ({traits: {O,C,E,A,N}, role, dept[, facets]})
+use `get`/`items`, which build that dict on demand. Facet vectors are rare (only
+/import_json profiles carry them) and live in a sparse uid→list side table.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+TRAIT_KEYS = ("O", "C", "E", "A", "N")
+MAX_SCORE = 120
+# Arrays grow geometrically from this many rows
+INITIAL_CAPACITY = 16
+# Distinct names a role or dept column can code (uint16)
+CODE_LIMIT = 1 << 16
+
+
+class Interner:
+    """Append-only name table: name ↔ small integer code.
+
+    Codes are never reused, so a name no member holds any more (e.g. after a roles
+    reload) keeps its slot until GuildTable.compact_names() rebuilds the table.
+    """
+
+    __slots__ = ("names", "_codes")
+
+    def __init__(self):
+        self.names: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            if len(self.names) >= CODE_LIMIT:
+                raise ValueError(f"more than {CODE_LIMIT} distinct names")
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._codes
+
+
+class GuildTable:
+    """Columnar registry for one guild. Rows [0, size) are live; order is arbitrary."""
+
+    __slots__ = ("uids", "traits", "role_codes", "dept_codes", "size", "roles", "depts", "facets", "_rows")
+
+    def __init__(self, capacity: int = 0):
+        self.uids = np.zeros(capacity, dtype=np.int64)
+        self.traits = np.zeros((capacity, len(TRAIT_KEYS)), dtype=np.uint8)
+        self.role_codes = np.zeros(capacity, dtype=np.uint16)
+        self.dept_codes = np.zeros(capacity, dtype=np.uint16)
+        self.size = 0
+        self.roles = Interner()
+        self.depts = Interner()
+        self.facets: dict[int, list[float]] = {}
+        self._rows: dict[int, int] = {}
+
+    @classmethod
+    def from_arrays(
+        cls,
+        uids: np.ndarray,
+        traits: np.ndarray,
+        role_codes: np.ndarray,
+        dept_codes: np.ndarray,
+        role_names: list[str],
+        dept_names: list[str],
+        facets: Optional[dict[int, list[float]]] = None,
+    ) -> "GuildTable":
+        """Build from column arrays (copied, so read-only or mmap-backed inputs are fine)."""
+        n = len(uids)
+        table = cls(capacity=0)
+        table.uids = np.array(uids, dtype=np.int64)
+        table.traits = np.array(traits, dtype=np.uint8).reshape(n, len(TRAIT_KEYS))
+        table.role_codes = np.array(role_codes, dtype=np.uint16)
+        table.dept_codes = np.array(dept_codes, dtype=np.uint16)
+        table.size = n
+        for name in role_names:
+            table.roles.code(name)
+        for name in dept_names:
+            table.depts.code(name)
+        table.facets = dict(facets or {})
+        table._rows = dict(zip(table.uids.tolist(), range(n)))
+        if len(table._rows) != n:
+            raise ValueError("duplicate user ids in column arrays")
+        return table
+
+    @classmethod
+    def from_entries(cls, entries: dict[int, dict]) -> "GuildTable":
+        """Build from a {user_id: entry} mapping in the registry entry shape."""
+        table = cls(capacity=len(entries))
+        for uid, entry in entries.items():
+            table.put_entry(uid, entry)
+        return table
+
+    # --- Mapping-style reads ---
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, uid: int) -> bool:
+        return uid in self._rows
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.uids[: self.size].tolist())
+
+    def row_of(self, uid: int) -> int:
+        """Row index for uid, or -1 if absent."""
+        return self._rows.get(uid, -1)
+
+    def rows_of(self, uids: Iterable[int]) -> np.ndarray:
+        return np.fromiter((self._rows.get(u, -1) for u in uids), dtype=np.int64)
+
+    def entry(self, row: int) -> dict:
+        uid = int(self.uids[row])
+        entry = {
+            "traits": dict(zip(TRAIT_KEYS, self.traits[row].tolist())),
+            "role": self.roles.names[self.role_codes[row]],
+            "dept": self.depts.names[self.dept_codes[row]],
+        }
+        facets = self.facets.get(uid)
+        if facets is not None:
+            entry["facets"] = facets
+        return entry
+
+    def get(self, uid: int, default=None) -> Optional[dict]:
+        row = self._rows.get(uid)
+        return default if row is None else self.entry(row)
+
+    def items(self) -> Iterator[tuple[int, dict]]:
+        for row in range(self.size):
+            yield int(self.uids[row]), self.entry(row)
+
+    def values(self) -> Iterator[dict]:
+        for row in range(self.size):
+            yield self.entry(row)
+
+    # --- Writes ---
+    def put(self, uid: int, traits: Sequence[int], role: str, dept: str, facets: Optional[list[float]] = None) -> None:
+        """Insert or overwrite a member; traits are O,C,E,A,N in 0–120."""
+        if any(not 0 <= int(v) <= MAX_SCORE for v in traits):
+            raise ValueError(f"trait scores must be within 0–{MAX_SCORE}, got {list(traits)}")
+        if (role not in self.roles and len(self.roles) >= CODE_LIMIT) or (dept not in self.depts and len(self.depts) >= CODE_LIMIT):
+            self.compact_names()
+            if (role not in self.roles and len(self.roles) >= CODE_LIMIT) or (dept not in self.depts and len(self.depts) >= CODE_LIMIT):
+                raise ValueError(f"a guild can hold at most {CODE_LIMIT} distinct role and department names")
+        row = self._rows.get(uid)
+        if row is None:
+            if self.size == len(self.uids):
+                self._grow()
+            row = self._rows[uid] = self.size
+            self.uids[row] = uid
+            self.size += 1
+        self.traits[row] = traits
+        self.role_codes[row] = self.roles.code(role)
+        self.dept_codes[row] = self.depts.code(dept)
+        if facets is not None:
+            self.facets[uid] = facets
+        else:
+            self.facets.pop(uid, None)
+
+    def put_entry(self, uid: int, entry: dict) -> None:
+        t = entry["traits"]
+        self.put(uid, [t[k] for k in TRAIT_KEYS], entry["role"], entry["dept"], entry.get("facets"))
+
+    def delete(self, uid: int) -> bool:
+        """Remove a member by moving the last row into its slot. Returns False if absent."""
+        row = self._rows.pop(uid, None)
+        if row is None:
+            return False
+        last = self.size - 1
+        if row != last:
+            moved = int(self.uids[last])
+            self.uids[row] = moved
+            self.traits[row] = self.traits[last]
+            self.role_codes[row] = self.role_codes[last]
+            self.dept_codes[row] = self.dept_codes[last]
+            self._rows[moved] = row
+        self.size = last
+        self.facets.pop(uid, None)
+        return True
+
+    def compact_names(self) -> bool:
+        """Drop role/dept names no live row holds and renumber the codes. Builds new
+        arrays and name lists, so columns handed out earlier keep matching their
+        names. Returns whether anything was dropped."""
+        dropped = False
+        for attr, column in (("roles", "role_codes"), ("depts", "dept_codes")):
+            old, codes = getattr(self, attr), getattr(self, column)
+            used = np.unique(codes[: self.size])
+            if len(used) == len(old):
+                continue
+            fresh = Interner()
+            for code in used.tolist():
+                fresh.code(old.names[code])
+            remap = np.zeros(len(old), dtype=np.uint16)
+            remap[used] = np.arange(len(used), dtype=np.uint16)
+            new = np.zeros_like(codes)
+            new[: self.size] = remap[codes[: self.size]]
+            setattr(self, attr, fresh)
+            setattr(self, column, new)
+            dropped = True
+        return dropped
+
+    def _grow(self) -> None:
+        capacity = max(INITIAL_CAPACITY, len(self.uids) * 2)
+        for name in ("uids", "traits", "role_codes", "dept_codes"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    # --- Array views over live rows ---
+    def trait_array(self) -> np.ndarray:
+        return self.traits[: self.size]
+
+    def uid_array(self) -> np.ndarray:
+        return self.uids[: self.size]
+
+    def facet_matrix(self, rows: np.ndarray, width: int) -> Optional[np.ndarray]:
+        """(len(rows), width) facet vectors with NaN rows for members without facets,
+        or None when none of the rows has facets."""
+        if not self.facets:
+            return None
+        uids = self.uids[rows].tolist()
+        if not any(u in self.facets for u in uids):
+            return None
+        out = np.full((len(uids), width), np.nan)
+        for i, u in enumerate(uids):
+            f = self.facets.get(u)
+            if f is not None:
+                out[i] = f
+        return out
+
+    def role_names(self, rows: np.ndarray) -> list[str]:
+        names = self.roles.names
+        return [names[c] for c in self.role_codes[rows].tolist()]
+
+    def dept_names(self, rows: np.ndarray) -> list[str]:
+        names = self.depts.names
+        return [names[c] for c in self.dept_codes[rows].tolist()]
+
+    def ordered_rows(self, *, by_dept: bool = False) -> "OrderedRows":
+        """All members as (user_id, role, dept), sorted by (role, dept, uid), or by
+        (dept, role, uid) with by_dept. Sorting runs on codes ranked by name."""
+        return ordered_rows(*self.listing_columns(copy=False), by_dept=by_dept)
+
+    def listing_columns(self, *, copy: bool = True) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str], list[str]]:
+        """(uids, role_codes, dept_codes, role names, dept names) for ordered_rows().
+        With copy, a snapshot that later writes to the table can't change (for
+        sorting off the event loop)."""
+        n = self.size
+        cols = (self.uids[:n], self.role_codes[:n], self.dept_codes[:n])
+        if copy:
+            return (*(c.copy() for c in cols), list(self.roles.names), list(self.depts.names))
+        return (*cols, self.roles.names, self.depts.names)
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the arrays (index and name tables excluded)."""
+        return self.uids.nbytes + self.traits.nbytes + self.role_codes.nbytes + self.dept_codes.nbytes
+
+
+class OrderedRows:
+    """Members in listing order as parallel arrays. Indexing or slicing builds the
+    (user_id, role, dept) tuples for just those rows, so a sorted index of a big
+    guild holds no per-member Python objects."""
+
+    __slots__ = ("uids", "role_codes", "dept_codes", "role_names", "dept_names")
+
+    def __init__(self, uids: np.ndarray, role_codes: np.ndarray, dept_codes: np.ndarray, role_names: list[str], dept_names: list[str]):
+        self.uids = uids
+        self.role_codes = role_codes
+        self.dept_codes = dept_codes
+        self.role_names = role_names
+        self.dept_names = dept_names
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1 or None][0]
+        roles = [self.role_names[c] for c in self.role_codes[index].tolist()]
+        depts = [self.dept_names[c] for c in self.dept_codes[index].tolist()]
+        return list(zip(self.uids[index].tolist(), roles, depts))
+
+    def __iter__(self) -> Iterator[tuple[int, str, str]]:
+        return iter(self[:])
+
+
+def ordered_rows(
+    uids: np.ndarray,
+    role_codes: np.ndarray,
+    dept_codes: np.ndarray,
+    role_names: list[str],
+    dept_names: list[str],
+    *,
+    by_dept: bool = False,
+) -> OrderedRows:
+    """GuildTable.ordered_rows on plain columns (see GuildTable.listing_columns)."""
+    role_rank = _name_ranks(role_names)[role_codes]
+    dept_rank = _name_ranks(dept_names)[dept_codes]
+    keys = (uids, role_rank, dept_rank) if by_dept else (uids, dept_rank, role_rank)
+    order = np.lexsort(keys)
+    return OrderedRows(uids[order], role_codes[order], dept_codes[order], list(role_names), list(dept_names))
+
+
+def _name_ranks(names: list[str]) -> np.ndarray:
+    # code -> position of its name in sorted order
+    ranks = np.empty(len(names), dtype=np.int64)
+    ranks[sorted(range(len(names)), key=names.__getitem__)] = np.arange(len(names))
+    return ranks
+
+
+__all__ = [
+    "CODE_LIMIT",
+    "GuildTable",
+    "Interner",
+    "OrderedRows",
+    "ordered_rows",
+]
@@ -0,0 +1,114 @@
+"""
+PersonaOCEAN core: roles loading without Discord
+
+Purpose
+- Load roles.yaml and compile it for the matcher, importable without discord.py
+- Cache the compiled roles next to the YAML file, keyed by the file's SHA-256, so
+  scripts and batch jobs skip YAML parsing when roles.yaml hasn't changed
+
+The cache is a plain .npz (no pickle) written atomically; any read or write
+problem falls back to parsing the YAML, so a read-only checkout still works.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from .matcher import CompiledRoles, compile_roles
+
+DEFAULT_ROLES_PATH = "roles.yaml"
+# Bump when the cache layout or compile_roles semantics change
+ROLES_CACHE_VERSION = 1
+
+
+def load_roles(path: str = DEFAULT_ROLES_PATH) -> dict:
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+        if not data or "roles" not in data:
+            raise ValueError("roles.yaml missing 'roles' key")
+        return data["roles"]
+
+
+def roles_cache_path(path: str) -> str:
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, f".{name}.compiled.npz")
+
+
+def _read_cache(cache_path: str, digest: str):
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if int(data["version"]) != ROLES_CACHE_VERSION or str(data["sha256"]) != digest:
+                return None
+            arrays = [np.array(data[k], dtype=np.float64) for k in ("weights", "facet_weights", "blended")]
+            names, descs, depts = (tuple(data[k].tolist()) for k in ("names", "descs", "depts"))
+            blend = float(data["facet_blend"])
+    except (OSError, KeyError, ValueError):
+        return None
+    for arr in arrays:
+        arr.setflags(write=False)
+    return CompiledRoles(names, descs, depts, *arrays, blend)
+
+
+def write_roles_cache(path: str, digest: str, compiled: CompiledRoles) -> None:
+    """Store `compiled` as the compiled cache of the roles file at `path` whose SHA-256
+    is `digest`. Best effort: a folder that can't be written is skipped silently."""
+    cache_path = roles_cache_path(path)
+    folder = os.path.dirname(cache_path)
+    try:
+        fd, tmp = tempfile.mkstemp(prefix=".roles-cache-", suffix=".npz", dir=folder)
+    except OSError:
+        return  # read-only checkout: just don't cache
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                version=ROLES_CACHE_VERSION,
+                sha256=digest,
+                names=np.array(compiled.names, dtype=str),
+                descs=np.array(compiled.descs, dtype=str),
+                depts=np.array(compiled.depts, dtype=str),
+                weights=compiled.weights,
+                facet_weights=compiled.facet_weights,
+                blended=compiled.blended,
+                facet_blend=compiled.facet_blend,
+            )
+        os.replace(tmp, cache_path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def load_compiled_roles(path: str = DEFAULT_ROLES_PATH, *, cache: bool = True) -> CompiledRoles:
+    """Compiled roles for `path`, from the hash-keyed cache when roles.yaml is unchanged."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    if cache:
+        compiled = _read_cache(roles_cache_path(path), digest)
+        if compiled is not None:
+            return compiled
+    import yaml
+
+    data = yaml.safe_load(raw.decode("utf-8"))
+    if not data or "roles" not in data:
+        raise ValueError("roles.yaml missing 'roles' key")
+    compiled = compile_roles(data["roles"])
+    if cache:
+        write_roles_cache(path, digest, compiled)
+    return compiled
+
+
+__all__ = [
+    "DEFAULT_ROLES_PATH",
+    "load_compiled_roles",
+    "load_roles",
+    "roles_cache_path",
+    "write_roles_cache",
+]
@@ -0,0 +1,147 @@
+"""
+PersonaOCEAN non-blocking structured event log
+
+Purpose
+- Take JSON log records off the event loop: `emit` only appends to a bounded queue
+- Serialize and write records in batches from a background thread
+- Count records dropped when the queue is full and report them as `log_dropped`
+- Optionally sample noisy events per event name
+
+The line schema is unchanged: one JSON object per line starting with ts, event and
+level (see docs/ops.md). Sampled records carry a `sample_rate` field.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Optional
+
+TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def parse_sample_rates(spec: Optional[str]) -> dict[str, float]:
+    """Parse "event=rate,event=rate" (rates in 0..1) into a dict; bad entries are skipped."""
+    rates: dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            rate = float(value)
+        except ValueError:
+            continue
+        rates[name.strip()] = min(1.0, max(0.0, rate))
+    return rates
+
+
+def format_record(record: dict) -> str:
+    record["ts"] = time.strftime(TS_FORMAT, time.gmtime(record["ts"]))
+    try:
+        return json.dumps(record, ensure_ascii=False)
+    except Exception:
+        return f"{record}"
+
+
+class EventLogger:
+    def __init__(
+        self,
+        *,
+        max_queue: int = 10_000,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+        sample_rates: Optional[dict[str, float]] = None,
+        stream=None,
+    ):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.sample_rates = dict(sample_rates or {})
+        self._stream = stream
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.sampled_out = 0
+        self._unreported_drops = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    @property
+    def stream(self):
+        # Resolve stdout lazily so redirection (tests, harnesses) is honored
+        return self._stream or sys.stdout
+
+    def emit(self, record: dict) -> bool:
+        """Queue a record whose "ts" is an epoch float. Returns False if sampled out or dropped."""
+        rate = self.sample_rates.get(record.get("event"))
+        if rate is not None and rate < 1.0 and record.get("level") != "ERROR":
+            if random.random() >= rate:
+                self.sampled_out += 1
+                return False
+            record["sample_rate"] = rate
+        if self._closed:
+            # Late records (e.g. from atexit hooks) are written inline
+            self._write([record])
+            return True
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported_drops += 1
+            return False
+        return True
+
+    def close(self, timeout: float = 2.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [] if item is None else [item]
+            stop = item is None
+            if not stop and self.flush_interval:
+                time.sleep(self.flush_interval)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            with self._lock:
+                drops, self._unreported_drops = self._unreported_drops, 0
+            if drops:
+                batch.append({"ts": time.time(), "event": "log_dropped", "level": "WARN", "dropped": drops, "dropped_total": self.dropped})
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: list[dict]) -> None:
+        text = "\n".join(format_record(r) for r in batch) + "\n"
+        try:
+            stream = self.stream
+            stream.write(text)
+            stream.flush()
+        except Exception:
+            pass
+
+
+__all__ = [
+    "EventLogger",
+    "format_record",
+    "parse_sample_rates",
+]
@@ -6,10 +6,14 @@ Purpose
 - Provide normalization helpers for 0–1 → −1..+1
 - Keep this module import-safe; no side effects
 
-This is a non-breaking stub to support future facet-level features.
+Facet vectors used for matching are ordered like FACET_NAMES: the six facets of
+O, then C, E, A and N, in FACET_MAP order.
 """
 from __future__ import annotations
 
+import json
+from typing import Optional
+
 # Canonical facet map (names mirror rubynor/bigfive-web)
 FACET_MAP: dict[str, list[str]] = {
     "O": [
@@ -54,6 +58,18 @@ FACET_MAP: dict[str, list[str]] = {
     ],
 }
 
+TRAIT_ORDER: tuple[str, ...] = ("O", "C", "E", "A", "N")
+FACET_NAMES: tuple[str, ...] = tuple(name for t in TRAIT_ORDER for name in FACET_MAP[t])
+FACET_TRAITS: tuple[str, ...] = tuple(t for t in TRAIT_ORDER for _ in FACET_MAP[t])
+# casefolded name -> position in FACET_NAMES; payload names arrive title-cased
+# ("Artistic Interests") while FACET_MAP uses sentence case ("Artistic interests")
+_FACET_INDEX: dict[str, int] = {name.casefold(): i for i, name in enumerate(FACET_NAMES)}
+
+
+def facet_index(name: str) -> Optional[int]:
+    """Position of a facet in FACET_NAMES (case-insensitive), or None if unknown."""
+    return _FACET_INDEX.get(str(name).strip().casefold())
+
 
 def normalize_01_to_signed(value: float | None) -> float:
     """Map 0..1 → −1..+1; clamps outside inputs.
@@ -95,8 +111,71 @@ def normalize_facets_payload(data: dict) -> dict:
     return out
 
 
+def normalize_domains_payload(data: dict) -> dict[str, float]:
+    """Best-effort domain extraction from a "domains" (or "traits") mapping whose keys
+    are trait letters or names (Openness, conscientiousness, ...) and values 0..1.
+    Returns {O,C,E,A,N subset: score[-1..+1]}; unknown keys are skipped.
+    """
+    out: dict[str, float] = {}
+    domains = (data or {}).get("domains", (data or {}).get("traits"))
+    if not isinstance(domains, dict):
+        return out
+    for raw_name, raw_val in domains.items():
+        # Every Big Five domain name starts with its own letter
+        key = str(raw_name).strip()[:1].upper()
+        if key not in TRAIT_ORDER:
+            continue
+        try:
+            out[key] = normalize_01_to_signed(float(raw_val))
+        except Exception:
+            continue
+    return out
+
+
+def facet_profile(facets: dict[str, float], domains: Optional[dict[str, float]] = None):
+    """Combine normalized facets and domains into a full profile.
+
+    Returns (traits, vector, known): signed O,C,E,A,N scores, a 30-value facet vector
+    in FACET_NAMES order, and how many payload facets were recognized. A missing
+    domain is the mean of its known facets (0.0 if none); a missing facet takes its
+    domain's score. Returns None when the payload has no usable scores at all.
+    """
+    vector: list[Optional[float]] = [None] * len(FACET_NAMES)
+    for name, value in (facets or {}).items():
+        i = facet_index(name)
+        if i is not None:
+            vector[i] = float(value)
+    known = sum(v is not None for v in vector)
+    domains = dict(domains or {})
+    if not known and not domains:
+        return None
+    traits: dict[str, float] = {}
+    for t in TRAIT_ORDER:
+        if t in domains:
+            traits[t] = domains[t]
+            continue
+        values = [v for v, ft in zip(vector, FACET_TRAITS) if ft == t and v is not None]
+        traits[t] = sum(values) / len(values) if values else 0.0
+    filled = [traits[ft] if v is None else v for v, ft in zip(vector, FACET_TRAITS)]
+    return traits, filled, known
+
+
+def parse_import_payload(raw: bytes):
+    """facet_profile() of a raw bigfive-web JSON export (UTF-8 bytes). Pure, so it can
+    run in a worker. Raises ValueError (incl. UnicodeDecodeError and JSONDecodeError)
+    on unreadable input."""
+    data = json.loads(raw.decode("utf-8"))
+    return facet_profile(normalize_facets_payload(data), normalize_domains_payload(data))
+
+
 __all__ = [
     "FACET_MAP",
+    "FACET_NAMES",
+    "FACET_TRAITS",
+    "facet_index",
+    "facet_profile",
     "normalize_01_to_signed",
+    "normalize_domains_payload",
     "normalize_facets_payload",
+    "parse_import_payload",
 ]
@@ -0,0 +1,218 @@
+"""
+PersonaOCEAN per-guild role sets
+
+Purpose
+- Let a guild replace the global roles.yaml with its own roles file
+- Keep compiled matchers for recently used guilds in an LRU bounded by both entry
+  count and bytes, so thousands of customized guilds don't all stay resident
+- Bring an evicted matcher back from the hash-keyed compiled cache next to its
+  file (persona/core.py), so a cache miss loads arrays instead of parsing YAML.
+  Async callers use load(), which does that in a worker thread and shares one
+  load between concurrent misses for a guild
+
+Each custom set is stored as `{folder}/{guild_id}.yaml` (the uploaded bytes, as
+validated) with its `.{guild_id}.yaml.compiled.npz` cache beside it. Validation
+stays with the caller; this module only stores, loads and caches.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .core import load_compiled_roles, roles_cache_path, write_roles_cache
+from .matcher import CompiledRoles
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class MatcherLRU:
+    """CompiledRoles by key, least recently used first out once either the entry
+    count or the summed CompiledRoles.nbytes goes over its limit. The most recent
+    entry is always kept, even if it alone is over max_bytes."""
+
+    def __init__(self, *, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: OrderedDict[int, tuple[CompiledRoles, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._items
+
+    def get(self, key: int) -> Optional[CompiledRoles]:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def put(self, key: int, compiled: CompiledRoles) -> None:
+        self.pop(key)
+        size = compiled.nbytes
+        self._items[key] = (compiled, size)
+        self.bytes += size
+        while len(self._items) > 1 and (len(self._items) > self.max_entries or self.bytes > self.max_bytes):
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def pop(self, key: int) -> Optional[CompiledRoles]:
+        item = self._items.pop(key, None)
+        if item is None:
+            return None
+        self.bytes -= item[1]
+        return item[0]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._items),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class GuildRoleSets:
+    """Custom role files by guild id, with their compiled matchers in a MatcherLRU."""
+
+    def __init__(
+        self,
+        folder: str,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        owns: Optional[Callable[[int], bool]] = None,
+    ):
+        """`owns` limits the scan to guilds this process serves (folder shared by shards)."""
+        self.folder = folder
+        self.cache = MatcherLRU(max_entries=max_entries, max_bytes=max_bytes)
+        # guild_id -> SHA-256 of its roles file; membership means "has a custom set"
+        self._digests: dict[int, str] = {}
+        # guild_id -> cache-miss load in progress (load())
+        self._loading: dict[int, asyncio.Future] = {}
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            names = []
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext == ".yaml" and stem.isdigit() and (owns is None or owns(int(stem))):
+                try:
+                    with open(os.path.join(folder, name), "rb") as f:
+                        self._digests[int(stem)] = hashlib.sha256(f.read()).hexdigest()
+                except OSError:
+                    continue
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._digests
+
+    def path(self, guild_id: int) -> str:
+        return os.path.join(self.folder, f"{int(guild_id)}.yaml")
+
+    def digest(self, guild_id: int) -> Optional[str]:
+        """SHA-256 of the guild's current roles file, or None if it uses the global roles."""
+        return self._digests.get(guild_id)
+
+    def get(self, guild_id: int) -> Optional[CompiledRoles]:
+        """The guild's compiled roles, or None if it has no custom set. A cache miss
+        loads from the compiled cache beside the file (YAML only if that is stale).
+        Raises OSError/ValueError if the stored file can't be loaded."""
+        if guild_id not in self._digests:
+            return None
+        compiled = self.cache.get(guild_id)
+        if compiled is None:
+            compiled = load_compiled_roles(self.path(guild_id))
+            self.cache.put(guild_id, compiled)
+        return compiled
+
+    async def load(self, guild_id: int) -> Optional[CompiledRoles]:
+        """get() for the event loop: a cache miss is loaded in a worker thread, and
+        concurrent misses for the same guild wait for one load."""
+        digest = self._digests.get(guild_id)
+        if digest is None:
+            return None
+        compiled = self.cache.get(guild_id)
+        if compiled is not None:
+            return compiled
+        future = self._loading.get(guild_id)
+        if future is None:
+            future = self._loading[guild_id] = asyncio.ensure_future(
+                asyncio.to_thread(load_compiled_roles, self.path(guild_id))
+            )
+            future.add_done_callback(lambda f: self._loading.pop(guild_id, None) if self._loading.get(guild_id) is f else None)
+        # Shielded: one request being cancelled must not cancel the shared load
+        try:
+            compiled = await asyncio.shield(future)
+        except (OSError, ValueError):
+            if self._digests.get(guild_id) == digest:
+                raise
+        if self._digests.get(guild_id) != digest:
+            # Replaced or removed while loading: answer with the current set instead
+            return await self.load(guild_id)
+        if guild_id not in self.cache:
+            self.cache.put(guild_id, compiled)
+        return compiled
+
+    def write(self, guild_id: int, raw: bytes, compiled: CompiledRoles) -> str:
+        """Store an already validated and compiled roles file for a guild and prime
+        its compiled cache. Blocking file I/O only (run it in a thread); call
+        activate() afterwards to make it current. Returns the file's digest."""
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path(guild_id)
+        fd, tmp = tempfile.mkstemp(prefix=".roles-upload-", suffix=".yaml", dir=self.folder)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        digest = hashlib.sha256(raw).hexdigest()
+        write_roles_cache(path, digest, compiled)
+        return digest
+
+    def activate(self, guild_id: int, digest: str, compiled: CompiledRoles) -> None:
+        """Make a written roles file the guild's current set."""
+        self._digests[guild_id] = digest
+        self.cache.put(guild_id, compiled)
+
+    def remove(self, guild_id: int) -> bool:
+        """Drop a guild's custom set (back to the global roles). Returns whether it had one."""
+        if self._digests.pop(guild_id, None) is None:
+            return False
+        self.cache.pop(guild_id)
+        path = self.path(guild_id)
+        for p in (path, roles_cache_path(path)):
+            try:
+                os.unlink(p)
+            except FileNotFoundError:
+                pass
+        return True
+
+
+__all__ = [
+    "GuildRoleSets",
+    "MatcherLRU",
+]
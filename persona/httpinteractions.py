@@ -0,0 +1,258 @@
+"""
+PersonaOCEAN HTTP interactions endpoint
+
+Purpose
+- Receive interactions as signed HTTP POSTs (the application's Interactions
+  Endpoint URL) instead of over the gateway websocket, so any number of identical
+  workers can sit behind a load balancer
+- Verify Discord's Ed25519 signature over timestamp + body with PyNaCl (required
+  in HTTP mode) and reject stale timestamps
+- Answer in the HTTP response itself: whatever the handler sends first (message
+  or defer) becomes the response body. A handler that hasn't answered within
+  `ack_timeout` gets an automatic defer, and its late reply is turned into an
+  edit of the original response by the caller (see `respond`). The defer is
+  ephemeral unless the command is listed in `public_commands`, since the
+  endpoint can't know whether the late reply will be private
+- LocalSigner plays Discord's side for offline tests: it owns a key pair and
+  signs request bodies the way Discord does
+
+No discord import: dispatch is a caller-supplied coroutine that hands the payload
+to the command tree, and the caller's webhook adapter reports initial responses
+through `respond`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Collection, Optional
+
+# Interaction types (payload "type") and callback types (response "type")
+PING = 1
+APPLICATION_COMMAND = 2
+MESSAGE_COMPONENT = 3
+AUTOCOMPLETE = 4
+MODAL_SUBMIT = 5
+PONG = 1
+DEFERRED_CHANNEL_MESSAGE = 5
+DEFERRED_UPDATE_MESSAGE = 6
+AUTOCOMPLETE_RESULT = 8
+
+# Discord drops an interaction that isn't answered within 3 s; leave room for the network
+DEFAULT_ACK_TIMEOUT = 2.5
+# Requests signed further than this from our clock are rejected (replay protection)
+DEFAULT_MAX_SKEW = 300.0
+# Followups and edits work for 15 minutes after the interaction
+TOKEN_LIFETIME = 15 * 60.0
+MAX_BODY_BYTES = 1 << 20
+
+# respond() outcomes
+INLINE = "inline"  # sent as the HTTP response body
+DEFERRED = "deferred"  # the HTTP response was a public automatic defer: edit the original instead
+DEFERRED_EPHEMERAL = "deferred_ephemeral"  # same, but the defer (and so the original) is ephemeral
+EPHEMERAL_FLAG = 1 << 6
+
+
+def _nacl():
+    # Imported on first use, so gateway mode runs without PyNaCl
+    try:
+        import nacl.exceptions
+        import nacl.signing
+    except ImportError:
+        raise RuntimeError("INTERACTIONS_MODE=http needs PyNaCl to verify request signatures: pip install PyNaCl") from None
+    return nacl
+
+
+def make_verifier(public_key_hex: str) -> Callable[[bytes, bytes], bool]:
+    """verify(message, signature) -> bool for the application's public key (PyNaCl).
+    Raises RuntimeError without PyNaCl and ValueError for a malformed key."""
+    nacl = _nacl()
+    try:
+        public = bytes.fromhex(public_key_hex.strip())
+    except ValueError:
+        raise ValueError("DISCORD_PUBLIC_KEY must be hex") from None
+    if len(public) != 32:
+        raise ValueError("DISCORD_PUBLIC_KEY must be 32 bytes (64 hex characters)")
+    key = nacl.signing.VerifyKey(public)
+
+    def verify(message: bytes, signature: bytes) -> bool:
+        try:
+            key.verify(message, signature)
+            return True
+        except (nacl.exceptions.BadSignatureError, ValueError):
+            return False
+
+    return verify
+
+
+class LocalSigner:
+    """Discord's half of the handshake, for offline tests: signs bodies with a private
+    key whose public half the endpoint is configured with."""
+
+    def __init__(self, seed: Optional[bytes] = None):
+        nacl = _nacl()
+        self._key = nacl.signing.SigningKey(seed) if seed is not None else nacl.signing.SigningKey.generate()
+        self.public_key_hex = bytes(self._key.verify_key).hex()
+
+    def sign(self, message: bytes) -> bytes:
+        return self._key.sign(message).signature
+
+    def headers(self, body: bytes, timestamp: Optional[int] = None) -> dict[str, str]:
+        ts = str(int(time.time()) if timestamp is None else timestamp)
+        return {
+            "X-Signature-Ed25519": self.sign(ts.encode() + body).hex(),
+            "X-Signature-Timestamp": ts,
+            "Content-Type": "application/json",
+        }
+
+
+def _auto_ack(kind: int, ephemeral: bool) -> dict:
+    """What to answer when the handler hasn't responded within the ack timeout."""
+    if kind == AUTOCOMPLETE:
+        return {"type": AUTOCOMPLETE_RESULT, "data": {"choices": []}}
+    if kind in (MESSAGE_COMPONENT, MODAL_SUBMIT):
+        return {"type": DEFERRED_UPDATE_MESSAGE}
+    if ephemeral:
+        return {"type": DEFERRED_CHANNEL_MESSAGE, "data": {"flags": EPHEMERAL_FLAG}}
+    return {"type": DEFERRED_CHANNEL_MESSAGE}
+
+
+class InteractionServer:
+    def __init__(
+        self,
+        dispatch: Callable[[dict], Awaitable[None]],
+        verify: Callable[[bytes, bytes], bool],
+        *,
+        ack_timeout: float = DEFAULT_ACK_TIMEOUT,
+        max_skew: float = DEFAULT_MAX_SKEW,
+        public_commands: Collection[str] = (),
+        on_error: Optional[Callable[[dict, Exception], None]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.dispatch = dispatch
+        self.verify = verify
+        # Called with the payload and exception when dispatch raises
+        self.on_error = on_error
+        # Commands whose replies are public get a public automatic defer; all others
+        # an ephemeral one, so a late private reply can't end up in the channel
+        self.public_commands = frozenset(public_commands)
+        self.ack_timeout = max(0.0, float(ack_timeout))
+        self.max_skew = float(max_skew)
+        self._clock = clock
+        # interaction id -> future for the HTTP response body
+        self._pending: dict[int, asyncio.Future] = {}
+        # interaction id -> (time it was auto-deferred, ephemeral defer); late replies become edits
+        self._deferred: OrderedDict[int, tuple[float, bool]] = OrderedDict()
+        self._runner = None
+        self.stats = {"requests": 0, "rejected": 0, "pings": 0, "inline": 0, "auto_deferred": 0, "late_replies": 0,
+                      "dispatch_errors": 0}
+
+    async def start(self, host: str, port: int, path: str = "/interactions") -> None:
+        from aiohttp import web
+
+        async def handle(request):
+            body = await request.read()
+            status, payload = await self.handle_body(
+                body,
+                request.headers.get("X-Signature-Ed25519", ""),
+                request.headers.get("X-Signature-Timestamp", ""),
+            )
+            if payload is None:
+                return web.Response(status=status)
+            return web.json_response(payload, status=status)
+
+        app = web.Application(client_max_size=MAX_BODY_BYTES)
+        app.router.add_post(path, handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _signed(self, body: bytes, signature: str, timestamp: str) -> bool:
+        try:
+            sig = bytes.fromhex(signature)
+            ts = int(timestamp)
+        except ValueError:
+            return False
+        if abs(self._clock() - ts) > self.max_skew:
+            return False
+        return self.verify(timestamp.encode() + body, sig)
+
+    async def handle_body(self, body: bytes, signature: str, timestamp: str) -> tuple[int, Optional[dict]]:
+        """(HTTP status, JSON response body or None) for one POST."""
+        loop = asyncio.get_running_loop()
+        # The ack deadline runs from arrival, so verification and dispatch count against it
+        arrived = loop.time()
+        self.stats["requests"] += 1
+        if not self._signed(body, signature, timestamp):
+            self.stats["rejected"] += 1
+            return 401, None
+        try:
+            payload = json.loads(body)
+            kind = int(payload["type"])
+            interaction_id = int(payload.get("id", 0))
+        except (ValueError, TypeError, KeyError):
+            return 400, None
+        if kind == PING:
+            self.stats["pings"] += 1
+            return 200, {"type": PONG}
+        future = self._pending[interaction_id] = loop.create_future()
+        try:
+            await self.dispatch(payload)
+            remaining = max(0.0, self.ack_timeout - (loop.time() - arrived))
+            await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            self.stats["dispatch_errors"] += 1
+            if self.on_error:
+                self.on_error(payload, e)
+            if not future.done():
+                # No handler is running to follow up on a defer, so let Discord
+                # show the interaction as failed right away
+                return 500, None
+        finally:
+            self._pending.pop(interaction_id, None)
+        # No await since the check: a reply that lands from now on sees the defer
+        if future.done():
+            self.stats["inline"] += 1
+            return 200, future.result()
+        ephemeral = kind == APPLICATION_COMMAND and (payload.get("data") or {}).get("name") not in self.public_commands
+        self._deferred[interaction_id] = (self._clock(), ephemeral)
+        self.stats["auto_deferred"] += 1
+        return 200, _auto_ack(kind, ephemeral)
+
+    def respond(self, interaction_id: int, body: dict) -> Optional[str]:
+        """Called with a handler's initial response. INLINE: it becomes the HTTP response.
+        DEFERRED / DEFERRED_EPHEMERAL: the HTTP response already went out as a public /
+        ephemeral automatic defer, so the caller should edit the original response
+        instead (or send a followup when the reply's visibility differs). None: not an
+        interaction waiting on this server (send it through the callback endpoint)."""
+        future = self._pending.get(interaction_id)
+        if future is not None and not future.done():
+            future.set_result(body)
+            return INLINE
+        now = self._clock()
+        while self._deferred and now - next(iter(self._deferred.values()))[0] > TOKEN_LIFETIME:
+            self._deferred.popitem(last=False)
+        deferred = self._deferred.get(interaction_id)
+        if deferred is not None:
+            self.stats["late_replies"] += 1
+            return DEFERRED_EPHEMERAL if deferred[1] else DEFERRED
+        return None
+
+
+__all__ = [
+    "DEFERRED",
+    "DEFERRED_EPHEMERAL",
+    "EPHEMERAL_FLAG",
+    "INLINE",
+    "InteractionServer",
+    "LocalSigner",
+    "make_verifier",
+]
@@ -0,0 +1,224 @@
+"""
+PersonaOCEAN event-loop lag watchdog
+
+Purpose
+- Measure event-loop scheduling lag: a task sleeps for a fixed interval and records
+  how much later than asked it woke up. Lag means something held the loop
+  (our own code), as opposed to slow gateway heartbeats (Discord or the network,
+  seen in bot.latency) or slow REST calls (seen in command durations)
+- Name the culprit: a sampler thread notices a tick that is overdue while the loop
+  is still stuck and captures the loop thread's stack at that moment, plus the
+  command its task was tagged with (tasks started by a tagged task inherit the
+  tag through a task factory), so the report says which command and which line
+  was running
+- Optionally keep the slowest callbacks reported by asyncio debug mode
+  (loop.slow_callback_duration); debug mode is costly, so it is opt-in
+
+Reports go to a caller-supplied `report(fields)` on the event loop, at most one
+per `min_gap` seconds; lagging ticks in between are counted in `suppressed`.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from types import FrameType
+from typing import Callable, Optional
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_GAP = 5.0
+# Slowest debug-mode callbacks kept between reports, and stack frames per culprit
+SLOW_CALLBACKS_KEPT = 5
+STACK_FRAMES = 6
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Collects asyncio debug-mode "Executing <handle> took N seconds" warnings."""
+
+    def __init__(self, keep: int):
+        super().__init__(level=logging.WARNING)
+        self.keep = keep
+        self._slowest: list[tuple[float, int, str]] = []
+        self._seq = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not str(record.msg).startswith("Executing") or not isinstance(record.args, tuple) or len(record.args) != 2:
+            return
+        handle, seconds = record.args
+        self._seq += 1
+        item = (float(seconds), self._seq, str(handle)[:300])
+        # Min-heap of the slowest `keep`; ties keep the earliest
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, item)
+        elif item[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def drain(self) -> list[dict]:
+        items = sorted(self._slowest, key=lambda it: (-it[0], it[1]))
+        self._slowest = []
+        return [{"callback": text, "ms": round(seconds * 1000, 1)} for seconds, _, text in items]
+
+
+class LoopWatchdog:
+    def __init__(
+        self,
+        report: Callable[[dict], None],
+        *,
+        interval: float = DEFAULT_INTERVAL,
+        threshold: float = DEFAULT_THRESHOLD,
+        min_gap: float = DEFAULT_MIN_GAP,
+        latency: Optional[Callable[[], float]] = None,
+        observe: Optional[Callable[[float], None]] = None,
+        debug_callbacks: bool = False,
+        root: Optional[str] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.report = report
+        self.interval = max(0.01, float(interval))
+        self.threshold = max(0.0, float(threshold))
+        self.min_gap = max(0.0, float(min_gap))
+        self.latency = latency
+        # Called with every tick's lag (e.g. a histogram)
+        self.observe = observe
+        self.debug_callbacks = debug_callbacks
+        # Frames under this folder (and outside site-packages) count as our code
+        self.root = os.path.abspath(root) if root else None
+        self._clock = clock
+        self._expected: Optional[float] = None
+        self._loop_thread: Optional[int] = None
+        self._culprit: Optional[dict] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # task -> command name it runs for (see tag())
+        self._tags: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._slow: Optional[_SlowCallbackHandler] = None
+        self._last_report = -float("inf")
+        self._suppressed = 0
+        self.stats = {"ticks": 0, "lagging": 0, "reports": 0, "max_lag": 0.0, "last_lag": 0.0}
+
+    async def run(self) -> None:
+        """Tick until cancelled. Starts the sampler thread (and debug capture) on entry."""
+        loop = self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._install_task_factory(loop)
+        if self.debug_callbacks:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+            self._slow = _SlowCallbackHandler(SLOW_CALLBACKS_KEPT)
+            logging.getLogger("asyncio").addHandler(self._slow)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                self._expected = self._clock() + self.interval
+                await asyncio.sleep(self.interval)
+                self._tick(self._clock() - self._expected)
+        finally:
+            self._stop.set()
+            if self._slow is not None:
+                logging.getLogger("asyncio").removeHandler(self._slow)
+                self._slow = None
+
+    def tag(self, command: str) -> None:
+        """Mark the current task (and tasks it starts from now on) as running `command`."""
+        task = asyncio.current_task()
+        if task is not None:
+            self._tags[task] = command
+
+    def _install_task_factory(self, loop: asyncio.AbstractEventLoop) -> None:
+        previous = loop.get_task_factory()
+        tags = self._tags
+
+        def factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous is not None else asyncio.Task(coro, loop=loop, **kwargs)
+            parent = asyncio.current_task(loop)
+            command = tags.get(parent) if parent is not None else None
+            if command is not None:
+                tags[task] = command
+            return task
+
+        loop.set_task_factory(factory)
+
+    def _tick(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        self.stats["ticks"] += 1
+        self.stats["last_lag"] = lag
+        self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+        if self.observe is not None:
+            self.observe(lag)
+        culprit, self._culprit = self._culprit, None
+        if lag < self.threshold:
+            return
+        self.stats["lagging"] += 1
+        now = self._clock()
+        if now - self._last_report < self.min_gap:
+            self._suppressed += 1
+            return
+        fields = {"lag_ms": round(lag * 1000, 1), "threshold_ms": round(self.threshold * 1000, 1)}
+        if self.latency is not None:
+            latency = self.latency()
+            if latency is not None and latency == latency and latency != float("inf"):
+                fields["gateway_latency_ms"] = round(latency * 1000, 1)
+        if culprit:
+            fields.update(culprit)
+        if self._slow is not None:
+            fields["slow_callbacks"] = self._slow.drain()
+        fields["suppressed"] = self._suppressed
+        self._suppressed = 0
+        self._last_report = now
+        self.stats["reports"] += 1
+        self.report(fields)
+
+    def _sample(self) -> None:
+        """Sampler thread: capture the loop thread's stack once per overdue tick."""
+        poll = min(self.interval, max(self.threshold, 0.01)) / 2
+        sampled_for = None
+        while not self._stop.wait(poll):
+            expected = self._expected
+            if expected is None or expected == sampled_for:
+                continue
+            if self._clock() - expected >= self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._culprit = self._describe(frame, asyncio.current_task(self._loop))
+                sampled_for = expected
+
+    def _describe(self, frame: FrameType, task: Optional[asyncio.Task]) -> dict:
+        """Our innermost frames of the loop thread's stack, and the running task's command."""
+        ours: list[str] = []
+        f = frame
+        while f is not None and len(ours) < STACK_FRAMES:
+            code = f.f_code
+            if self._is_ours(code.co_filename):
+                where = os.path.relpath(code.co_filename, self.root) if self.root else code.co_filename
+                ours.append(f"{where}:{f.f_lineno} {code.co_name}")
+            f = f.f_back
+        described: dict = {"stack": ours}
+        if task is not None:
+            described["task"] = task.get_name()
+            command = self._tags.get(task)
+            if command is not None:
+                described["command"] = command
+        return described
+
+    def _is_ours(self, filename: str) -> bool:
+        if self.root is None:
+            return True
+        path = os.path.abspath(filename)
+        return path.startswith(self.root + os.sep) and "site-packages" not in path
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+__all__ = [
+    "LoopWatchdog",
+]
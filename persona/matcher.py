@@ -0,0 +1,270 @@
+"""
+PersonaOCEAN compiled role matcher
+
+Purpose
+- Compile the roles.yaml mapping once into a dense role-by-trait weight matrix
+- Keep role names, descriptions and departments in arrays aligned with its rows
+- Score one member or N members against every role in a single matrix product
+
+Scoring is unchanged from the original loop: each 0–120 input is normalized to
+−1..+1 via (x − 60) / 60 and dotted with the role's O,C,E,A,N pattern; the highest
+score wins and ties go to the role listed first in roles.yaml. Scores are ranked
+at TIE_DECIMALS precision so exact ties don't depend on float summation order
+(which differs between BLAS kernels and the old pure-Python sum).
+
+Facets: each role's optional `facet_pattern` is compiled into a 30-column facet
+weight matrix (FACET_NAMES order; facets it doesn't mention weigh 0). Members with
+a facet vector (signed −1..+1, e.g. from /import_json) are scored as
+(1 − FACET_BLEND) × domain score + FACET_BLEND × facet score, as in the facet
+roadmap. Both terms come from one product against a precomputed (R, 35) matrix, so
+a facet match costs the same single matrix-vector product as a domain match.
+Members without facets are scored on domains alone.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .facets import FACET_NAMES, facet_index
+
+# Column order of the weight matrix and of every scores array passed in
+TRAITS: tuple[str, ...] = ("O", "C", "E", "A", "N")
+# Scores equal to this many decimals count as a tie (first-listed role wins)
+TIE_DECIMALS = 9
+# Share of the combined score taken from facets when a member has a facet vector
+FACET_BLEND = 0.3
+# Batch scoring works on row chunks of at most this many member × role scores
+MATCH_CHUNK_CELLS = 1 << 22
+
+
+def normalize_scores(scores) -> np.ndarray:
+    """Map raw 0–120 scores (any shape ending in 5) → −1..+1 as float64."""
+    return (np.asarray(scores, dtype=np.float64) - 60.0) / 60.0
+
+
+@dataclass(frozen=True)
+class CompiledRoles:
+    """Roles compiled into aligned arrays; row i of `weights` is role `names[i]`."""
+
+    names: tuple[str, ...]
+    descs: tuple[str, ...]
+    depts: tuple[str, ...]
+    weights: np.ndarray  # (R, 5) float64, columns in TRAITS order
+    facet_weights: np.ndarray  # (R, 30) float64, columns in FACET_NAMES order
+    blended: np.ndarray  # (R, 35): [(1 − blend) × weights | blend × facet_weights]
+    facet_blend: float = FACET_BLEND
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def facet_roles(self) -> int:
+        """Number of roles with at least one non-zero facet weight."""
+        return int(np.count_nonzero(self.facet_weights.any(axis=1)))
+
+    def index_of(self, name: str) -> int:
+        return self.names.index(name)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size: weight arrays and role text."""
+        size = self.weights.nbytes + self.facet_weights.nbytes + self.blended.nbytes
+        size += sum(len(s) for text in (self.names, self.descs, self.depts) for s in text)
+        return size
+
+
+def compile_roles(roles: dict, *, facet_blend: float = FACET_BLEND) -> CompiledRoles:
+    """Compile a roles mapping (as returned by load_roles) into a CompiledRoles.
+    Traits missing from a pattern weigh 0, matching the original per-key sum.
+    facet_pattern keys are matched to FACET_NAMES case-insensitively; unknown keys
+    are ignored (validate_roles warns about them).
+    """
+    if not roles:
+        raise ValueError("No roles found or roles.yaml pattern is invalid")
+    if not 0.0 <= facet_blend <= 1.0:
+        raise ValueError("facet_blend must be within [0, 1]")
+    names: list[str] = []
+    descs: list[str] = []
+    depts: list[str] = []
+    weights = np.zeros((len(roles), len(TRAITS)), dtype=np.float64)
+    facet_weights = np.zeros((len(roles), len(FACET_NAMES)), dtype=np.float64)
+    for i, (name, data) in enumerate(roles.items()):
+        pattern = data["pattern"]
+        for j, t in enumerate(TRAITS):
+            if t in pattern:
+                weights[i, j] = float(pattern[t])
+        for key, value in (data.get("facet_pattern") or {}).items():
+            j = facet_index(key)
+            if j is not None:
+                facet_weights[i, j] = float(value)
+        names.append(str(name))
+        descs.append(data["desc"])
+        depts.append(data["dept"])
+    blended = np.hstack(((1.0 - facet_blend) * weights, facet_blend * facet_weights))
+    for arr in (weights, facet_weights, blended):
+        arr.setflags(write=False)
+    return CompiledRoles(tuple(names), tuple(descs), tuple(depts), weights, facet_weights, blended, facet_blend)
+
+
+@dataclass(frozen=True)
+class BatchMatch:
+    """Result of match_roles_batch.
+
+    With top_k=None each array has shape (N,): the best role index, its score, and
+    its margin over the runner-up. With top_k=k each has shape (N, k), ranked best
+    first, and margin[:, i] is score[:, i] minus the next-ranked score (the last
+    column is measured against the (k+1)-th role, or is 0.0 when no role is left).
+    """
+
+    index: np.ndarray
+    score: np.ndarray
+    margin: np.ndarray
+    roles: CompiledRoles
+
+    def names(self) -> list:
+        return _take(self.roles.names, self.index)
+
+    def depts(self) -> list:
+        return _take(self.roles.depts, self.index)
+
+    def descs(self) -> list:
+        return _take(self.roles.descs, self.index)
+
+
+def _take(values: tuple[str, ...], index: np.ndarray) -> list:
+    if index.ndim == 1:
+        return [values[i] for i in index.tolist()]
+    return [[values[i] for i in row] for row in index.tolist()]
+
+
+def _facet_rows(facets, n: int) -> np.ndarray:
+    arr = np.asarray(facets, dtype=np.float64)
+    if arr.ndim == 1:
+        arr = arr.reshape(1, -1)
+    if arr.shape != (n, len(FACET_NAMES)):
+        raise ValueError(f"facets must have shape ({n}, {len(FACET_NAMES)}), got {arr.shape}")
+    return arr
+
+
+def _norm_rows(scores) -> np.ndarray:
+    norm = normalize_scores(scores)
+    if norm.ndim == 1:
+        norm = norm.reshape(1, -1)
+    if norm.shape[-1] != len(TRAITS):
+        raise ValueError(f"scores must have {len(TRAITS)} columns (O,C,E,A,N), got shape {norm.shape}")
+    return norm
+
+
+def _sims(compiled: CompiledRoles, norm: np.ndarray, facets) -> np.ndarray:
+    if facets is None:
+        return norm @ compiled.weights.T
+    has = ~np.isnan(facets).any(axis=1)
+    if has.all():
+        return np.hstack((norm, facets)) @ compiled.blended.T
+    sims = norm @ compiled.weights.T
+    if has.any():
+        sims[has] = np.hstack((norm[has], facets[has])) @ compiled.blended.T
+    return sims
+
+
+def score_matrix(compiled: CompiledRoles, scores, facets=None) -> np.ndarray:
+    """Return the (N, R) score of every member against every role.
+
+    `facets` is an optional (N, 30) array of signed facet scores; rows containing
+    NaN (members without facet data) are scored on domains only.
+    """
+    norm = _norm_rows(scores)
+    return _sims(compiled, norm, None if facets is None else _facet_rows(facets, len(norm)))
+
+
+def _rank(sims: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k columns per row of a score block, by rounded score then role order."""
+    n, r = sims.shape
+    key = -np.round(sims, TIE_DECIMALS)
+    rows = np.arange(n)[:, None]
+    if k == 2 < r:
+        # Best role and runner-up (the default batch match): argmin returns the
+        # first-listed role among ties, so two passes need no tie handling
+        best = np.argmin(key, axis=1)
+        key[rows[:, 0], best] = np.inf
+        ranked = np.stack((best, np.argmin(key, axis=1)), axis=1)
+    elif k < r:
+        part = np.argpartition(key, k - 1, axis=1)[:, :k]
+        # argpartition picks arbitrary roles among those tied with the k-th score;
+        # where such a tie crosses the cut, keep the first-listed tied roles instead
+        kth = key[rows, part].max(axis=1, keepdims=True)
+        cut = np.flatnonzero(np.count_nonzero(key <= kth, axis=1) > k)
+        if cut.size:
+            sub, bound = key[cut], kth[cut]
+            tied = sub == bound
+            fill = k - np.count_nonzero(sub < bound, axis=1)[:, None]
+            chosen = (sub < bound) | (tied & (np.cumsum(tied, axis=1) <= fill))
+            part[cut] = np.nonzero(chosen)[1].reshape(len(cut), k)
+        # Rank inside the selection: by score desc, then by role order
+        order = np.lexsort((part, key[rows, part]), axis=1)
+        ranked = part[rows, order]
+    else:
+        ranked = np.argsort(key, axis=1, kind="stable")
+    return ranked, sims[rows, ranked]
+
+
+def match_roles_batch(compiled: CompiledRoles, scores, *, top_k: int | None = None, facets=None) -> BatchMatch:
+    """Score N members (an (N, 5) array of raw 0–120 O,C,E,A,N scores, plus optional
+    (N, 30) facet vectors) against all roles and return the best role, or the top_k
+    roles, per row.
+
+    Large batches are scored in row chunks of at most MATCH_CHUNK_CELLS scores, so
+    memory stays bounded for any N × R. A few members without facets against a
+    large role set go through the role index instead of a full product.
+    """
+    norm = _norm_rows(scores)
+    facets = None if facets is None else _facet_rows(facets, len(norm))
+    n, r = len(norm), len(compiled)
+    if top_k is None:
+        # The runner-up is needed for the margin
+        k = min(2, r)
+    else:
+        if top_k < 1:
+            raise ValueError("top_k must be >= 1")
+        k = min(top_k + 1, r)
+    ranked = np.empty((n, k), dtype=np.intp)
+    ranked_scores = np.empty((n, k), dtype=np.float64)
+    step = max(1, MATCH_CHUNK_CELLS // r)
+    for start in range(0, n, step):
+        block = slice(start, start + step)
+        sims = _sims(compiled, norm[block], None if facets is None else facets[block])
+        ranked[block], ranked_scores[block] = _rank(sims, k)
+    margins = np.zeros_like(ranked_scores)
+    margins[:, :-1] = ranked_scores[:, :-1] - ranked_scores[:, 1:]
+    if top_k is None:
+        return BatchMatch(ranked[:, 0], ranked_scores[:, 0], margins[:, 0], compiled)
+    keep = min(top_k, r)
+    return BatchMatch(ranked[:, :keep], ranked_scores[:, :keep], margins[:, :keep], compiled)
+
+
+def match_one(compiled: CompiledRoles, O: float, C: float, E: float, A: float, N: float, *, facets=None):
+    """Single-member match; returns (role, desc, dept, score) like main.match_role.
+    With a 30-value signed `facets` vector the blended facet score is used.
+    """
+    norm = normalize_scores((O, C, E, A, N))
+    if facets is None:
+        sims = compiled.weights @ norm
+    else:
+        sims = compiled.blended @ np.concatenate((norm, _facet_rows(facets, 1)[0]))
+    i = int(np.argmax(np.round(sims, TIE_DECIMALS)))
+    return compiled.names[i], compiled.descs[i], compiled.depts[i], float(sims[i])
+
+
+__all__ = [
+    "FACET_BLEND",
+    "MATCH_CHUNK_CELLS",
+    "TRAITS",
+    "BatchMatch",
+    "CompiledRoles",
+    "compile_roles",
+    "match_one",
+    "match_roles_batch",
+    "normalize_scores",
+    "score_matrix",
+]
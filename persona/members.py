@@ -0,0 +1,152 @@
+"""
+PersonaOCEAN member display-name resolution
+
+Purpose
+- Resolve display names for many registered user ids in one call
+- Serve repeats from a shared TTL/LRU cache (keyed by guild and user)
+- Fill misses from the gateway member cache, then optionally from chunked gateway
+  member requests (up to 100 ids each), then from REST, with one concurrency bound shared by all calls
+
+Works on duck-typed guild objects (get_member, query_members, fetch_member) so it
+has no discord import of its own.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Iterable, Optional
+
+# Discord caps a gateway member request at 100 user ids
+GATEWAY_CHUNK_SIZE = 100
+
+
+class MemberNameResolver:
+    def __init__(
+        self,
+        *,
+        ttl: float = 600.0,
+        max_size: int = 50_000,
+        concurrency: int = 8,
+        gateway_chunks: bool = False,
+    ):
+        self.ttl = float(ttl)
+        self.max_size = max(1, int(max_size))
+        self.concurrency = max(1, int(concurrency))
+        self.gateway_chunks = gateway_chunks
+        # Shared by every resolve() call, so concurrent listings together stay
+        # within `concurrency` gateway member requests and REST fetches
+        self._sem = asyncio.Semaphore(self.concurrency)
+        # (guild_id, user_id) -> in-flight REST fetch, shared by concurrent resolves
+        self._fetches: dict[tuple[int, int], asyncio.Future] = {}
+        # (guild_id, user_id) -> (expires_at, display name or None for "left the guild")
+        self._cache: OrderedDict[tuple[int, int], tuple[float, Optional[str]]] = OrderedDict()
+
+    def _get(self, key: tuple[int, int], now: float):
+        item = self._cache.get(key)
+        if item is None:
+            return False, None
+        expires, name = item
+        if expires < now:
+            del self._cache[key]
+            return False, None
+        self._cache.move_to_end(key)
+        return True, name
+
+    def _put(self, key: tuple[int, int], name: Optional[str], now: float) -> None:
+        self._cache[key] = (now + self.ttl, name)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def remember(self, guild_id: int, user_id: int, name: str) -> None:
+        """Prime the cache with a name already in hand (e.g. from an interaction)."""
+        self._put((guild_id, user_id), name, time.monotonic())
+
+    def invalidate(self, guild_id: int, user_id: int) -> None:
+        """Forget a cached name (after /forget, or when the member leaves)."""
+        self._cache.pop((guild_id, user_id), None)
+
+    async def resolve(self, guild, user_ids: Iterable[int]) -> tuple[dict[int, Optional[str]], dict[str, int]]:
+        """Return ({user_id: display name or None}, stats). None means the member
+        could not be resolved (left the guild or lookups failed).
+        """
+        now = time.monotonic()
+        gid = guild.id
+        names: dict[int, Optional[str]] = {}
+        stats = {"hits": 0, "misses": 0, "local": 0, "gateway": 0, "fetched": 0, "unresolved": 0}
+        missing: list[int] = []
+        for uid in user_ids:
+            found, name = self._get((gid, uid), now)
+            if found:
+                names[uid] = name
+                stats["hits"] += 1
+                continue
+            stats["misses"] += 1
+            member = guild.get_member(uid)
+            if member is not None:
+                names[uid] = member.display_name
+                self._put((gid, uid), member.display_name, now)
+                stats["local"] += 1
+            else:
+                missing.append(uid)
+
+        if missing and self.gateway_chunks:
+            got = await self._query_chunks(guild, missing)
+            for uid, name in got.items():
+                names[uid] = name
+                self._put((gid, uid), name, now)
+            stats["gateway"] = len(got)
+            missing = [uid for uid in missing if uid not in got]
+
+        if missing:
+            results = await asyncio.gather(*(self._fetch_shared(guild, uid) for uid in missing))
+            for uid, (name, cacheable) in zip(missing, results):
+                names[uid] = name
+                if name is not None:
+                    stats["fetched"] += 1
+                else:
+                    stats["unresolved"] += 1
+                if cacheable:
+                    self._put((gid, uid), name, now)
+        return names, stats
+
+    async def _query_chunks(self, guild, user_ids: list[int]) -> dict[int, str]:
+        async def one(chunk: list[int]):
+            async with self._sem:
+                try:
+                    return await guild.query_members(user_ids=chunk, limit=len(chunk), cache=True)
+                except Exception:
+                    return []
+
+        chunks = [user_ids[i:i + GATEWAY_CHUNK_SIZE] for i in range(0, len(user_ids), GATEWAY_CHUNK_SIZE)]
+        out: dict[int, str] = {}
+        for members in await asyncio.gather(*(one(c) for c in chunks)):
+            for m in members or []:
+                out[m.id] = m.display_name
+        return out
+
+    def _fetch_shared(self, guild, uid: int) -> Awaitable[tuple[Optional[str], bool]]:
+        """One REST fetch per (guild, user) at a time; a caller that is cancelled
+        leaves the shared fetch running for the others."""
+        key = (guild.id, uid)
+        future = self._fetches.get(key)
+        if future is None:
+            future = self._fetches[key] = asyncio.ensure_future(self._fetch_one(guild, uid))
+            future.add_done_callback(lambda _: self._fetches.pop(key, None))
+        return asyncio.shield(future)
+
+    async def _fetch_one(self, guild, uid: int) -> tuple[Optional[str], bool]:
+        """Returns (name, cacheable). 404s are cached as None; other failures are not."""
+        async with self._sem:
+            try:
+                member = await guild.fetch_member(uid)
+            except Exception as e:
+                return None, getattr(e, "status", None) == 404
+        return (member.display_name if member else None), member is not None
+
+
+__all__ = [
+    "GATEWAY_CHUNK_SIZE",
+    "MemberNameResolver",
+]
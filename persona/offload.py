@@ -0,0 +1,74 @@
+"""
+PersonaOCEAN offload of CPU-heavy command work
+
+Purpose
+- Run pure compute functions (plain data in, plain data out) on a thread or
+  process pool, so a big guild or a big attachment doesn't hold the event loop
+  and delay gateway heartbeats and every other guild's interactions
+- Keep small jobs inline, where handing them to a pool costs more than the work
+
+Jobs are grouped by kind (e.g. "listing_index") with a size threshold per kind in
+the kind's own unit (members, bytes). Jobs must not touch discord objects or
+shared mutable state; with the process pool, the function must be module-level
+and its arguments and result picklable.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+THREAD = "thread"
+PROCESS = "process"
+OFF = "off"
+MODES = (THREAD, PROCESS, OFF)
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class Offloader:
+    def __init__(self, *, mode: str = THREAD, workers: int = DEFAULT_WORKERS, thresholds: Optional[dict[str, int]] = None):
+        if mode not in MODES:
+            raise ValueError(f"offload mode must be one of {', '.join(MODES)}, got {mode!r}")
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        # kind -> smallest size sent to the pool; kinds not listed always go to the pool
+        self.thresholds = dict(thresholds or {})
+        self._executor: Optional[Executor] = None
+        # kind -> {"inline": n, "pool": n}
+        self.stats: dict[str, dict[str, int]] = {}
+
+    def offloads(self, kind: str, size: int) -> bool:
+        return self.mode != OFF and size >= self.thresholds.get(kind, 0)
+
+    async def run(self, kind: str, fn: Callable[..., Any], *args, size: int, **kwargs) -> Any:
+        """fn(*args, **kwargs), on the pool if `size` reaches the kind's threshold, else inline."""
+        counts = self.stats.setdefault(kind, {"inline": 0, "pool": 0})
+        if not self.offloads(kind, size):
+            counts["inline"] += 1
+            return fn(*args, **kwargs)
+        counts["pool"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), functools.partial(fn, *args, **kwargs))
+
+    def _pool(self) -> Executor:
+        # Created on first use, so a bot that never sees big jobs never starts workers
+        if self._executor is None:
+            if self.mode == PROCESS:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="offload")
+        return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+__all__ = [
+    "MODES",
+    "Offloader",
+]
@@ -0,0 +1,241 @@
+"""
+PersonaOCEAN outbound reply scheduler
+
+Purpose
+- Optionally pace followups per channel with token buckets (off by default:
+  interaction followups use per-interaction webhook routes whose limits
+  discord.py already tracks, so pacing only adds queueing unless a deployment
+  wants a per-channel cap). Initial responses are never paced (only 3 s to land)
+- Deliver one interaction's sends in order (initial response before followups)
+- Send each reply once. discord.py's webhook adapter already sleeps through
+  ordinary 429s and retries 5xx itself (about 25 s over five attempts), so an
+  error that reaches us has had its retries, and resending a followup could
+  post it twice. A 429 that still surfaces is a global or Cloudflare block:
+  every send waits out its Retry-After, or gives up if that would pass the
+  interaction's deadline (3 s to respond, 15 min for followups)
+- Coalesce identical error notices per channel, so a failing route gets one
+  notice rather than one per failed reply. Callers use this for followup notices
+  only: an unacknowledged interaction needs its own notice to be acknowledged
+
+Errors are classified duck-typed (`status`, `retry_after`, `response.headers`) and
+sends are plain zero-argument coroutine functions, so this module has no discord
+import of its own. Exceptions without an HTTP status propagate unchanged.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, Optional
+
+# Followups per second per channel (None: no pacing), and how many may go out back to back
+DEFAULT_CHANNEL_RATE: Optional[float] = None
+DEFAULT_CHANNEL_BURST = 10
+# How long a surfaced 429 without Retry-After blocks every send (seconds)
+DEFAULT_BLOCK = 10.0
+# Identical notices to one channel are sent at most once per window (seconds)
+DEFAULT_NOTICE_WINDOW = 30.0
+# Idle channel buckets kept before the oldest full ones are dropped
+MAX_BUCKETS = 10_000
+
+# Delivery.reason values
+OK = "ok"
+EXPIRED = "expired"  # interaction token unknown/expired (404) or deadline already passed
+RATE_LIMITED = "rate_limited"  # globally rate limited (now, or until past the deadline)
+SERVER_ERROR = "server_error"  # 5xx after discord.py's own retries
+REJECTED = "rejected"  # other 4xx: retrying can't help
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a send may go out (0 if one can now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+@dataclass(frozen=True)
+class Delivery:
+    ok: bool
+    reason: str
+    attempts: int  # 1, or 0 if it never went out
+    waited: float  # seconds spent queued
+    error: Optional[BaseException] = None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Retry-After of a rate-limit error in seconds, if it says."""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class OutboundScheduler:
+    def __init__(
+        self,
+        *,
+        channel_rate: Optional[float] = DEFAULT_CHANNEL_RATE,
+        channel_burst: int = DEFAULT_CHANNEL_BURST,
+        block: float = DEFAULT_BLOCK,
+        notice_window: float = DEFAULT_NOTICE_WINDOW,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ):
+        self.channel_rate = max(0.001, float(channel_rate)) if channel_rate else None
+        self.channel_burst = max(1, int(channel_burst))
+        self.block = float(block)
+        self.notice_window = float(notice_window)
+        self._clock = clock
+        self._sleep = sleep
+        # A surfaced 429 (global or Cloudflare) blocks every send until then
+        self.blocked_until = 0.0
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+        # Per-channel FIFO for token waits and per-interaction delivery order
+        self._channel_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        self._interaction_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        # (channel, text) -> clock time until which the same notice is suppressed
+        self._notices: dict[tuple[Hashable, str], float] = {}
+        self.stats = {"sent": 0, "rate_limited": 0, "gave_up": 0, "notices": 0, "notices_coalesced": 0}
+
+    def _bucket(self, channel: Hashable, now: float) -> TokenBucket:
+        bucket = self._buckets.get(channel)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                for key in [k for k, b in self._buckets.items() if b.idle(now)][: MAX_BUCKETS // 10 or 1]:
+                    del self._buckets[key]
+            bucket = self._buckets[channel] = TokenBucket(self.channel_rate, self.channel_burst, now)
+        else:
+            self._buckets.move_to_end(channel)
+        return bucket
+
+    @staticmethod
+    def _lock(locks: weakref.WeakValueDictionary, key: Hashable) -> asyncio.Lock:
+        lock = locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            locks[key] = lock
+        return lock
+
+    async def _acquire(self, channel: Hashable, deadline: float, paced: bool) -> Optional[str]:
+        """Wait out a global block and (paced, with a channel rate set) the channel's
+        next token in FIFO order. None when the send may go out, else why it can't
+        before `deadline`."""
+        while True:
+            now = self._clock()
+            wait = self.blocked_until - now
+            if wait <= 0.0:
+                break
+            if now + wait > deadline:
+                return RATE_LIMITED
+            await self._sleep(wait)
+        if not paced or self.channel_rate is None:
+            return None
+        async with self._lock(self._channel_locks, channel):
+            while True:
+                now = self._clock()
+                bucket = self._bucket(channel, now)
+                wait = max(bucket.wait_time(now), self.blocked_until - now)
+                if wait <= 0.0:
+                    bucket.take(now)
+                    return None
+                if now + wait > deadline:
+                    return RATE_LIMITED if self.blocked_until > now else EXPIRED
+                await self._sleep(wait)
+
+    async def deliver(
+        self,
+        send: Callable[[], Awaitable],
+        *,
+        channel: Hashable,
+        interaction: Hashable,
+        deadline: float,
+        paced: bool = True,
+    ) -> Delivery:
+        """Call `send()` once, after pacing, unless it could not start before
+        `deadline` (a clock() time, e.g. when the interaction token stops accepting
+        this kind of reply)."""
+        start = self._clock()
+        async with self._lock(self._interaction_locks, interaction):
+            blocked = await self._acquire(channel, deadline, paced)
+            if blocked is not None:
+                return self._give_up(blocked, 0, start, self._clock(), None)
+            sent_at = self._clock()
+            try:
+                await send()
+            except Exception as e:
+                status = getattr(e, "status", None)
+                if not isinstance(status, int):
+                    raise
+                error = e
+            else:
+                self.stats["sent"] += 1
+                return Delivery(True, OK, 1, sent_at - start)
+
+        if status == 429:
+            self.stats["rate_limited"] += 1
+            pause = retry_after(error)
+            now = self._clock()
+            # discord.py sleeps through per-route limits itself: this one is global
+            self.blocked_until = max(self.blocked_until, now + (self.block if pause is None else pause))
+            return self._give_up(RATE_LIMITED, 1, start, sent_at, error)
+        if status >= 500:
+            return self._give_up(SERVER_ERROR, 1, start, sent_at, error)
+        if status == 404:
+            return self._give_up(EXPIRED, 1, start, sent_at, error)
+        return self._give_up(REJECTED, 1, start, sent_at, error)
+
+    def _give_up(self, reason: str, attempts: int, start: float, sent_at: float, error) -> Delivery:
+        self.stats["gave_up"] += 1
+        return Delivery(False, reason, attempts, sent_at - start, error)
+
+    def claim_notice(self, channel: Hashable, text: str) -> bool:
+        """True if `text` may be sent to `channel` now; identical notices within
+        notice_window after that are coalesced (False)."""
+        now = self._clock()
+        key = (channel, text)
+        if self._notices.get(key, 0.0) > now:
+            self.stats["notices_coalesced"] += 1
+            return False
+        if len(self._notices) >= MAX_BUCKETS:
+            self._notices = {k: until for k, until in self._notices.items() if until > now}
+        self._notices[key] = now + self.notice_window
+        self.stats["notices"] += 1
+        return True
+
+
+__all__ = [
+    "EXPIRED",
+    "OK",
+    "RATE_LIMITED",
+    "REJECTED",
+    "SERVER_ERROR",
+    "Delivery",
+    "OutboundScheduler",
+    "TokenBucket",
+    "retry_after",
+]
@@ -0,0 +1,170 @@
+"""
+PersonaOCEAN paginated roster listings
+
+Purpose
+- Keep a sorted per-guild index of registered members for /company and /departments
+- Render only the requested page, so the first page costs the same for any guild size
+- Cache the index per guild until its registry version changes, and rendered pages
+  until then too, but at most `page_ttl` seconds (the display names in them age like
+  the name cache) and per guild name (it is the page title). Pages with a name that
+  couldn't be resolved are not cached, so the next request retries the lookup
+
+Display names are looked up per page through a caller-supplied async resolver. The
+index itself can be built by a caller-supplied coroutine too (e.g. off the event
+loop for big guilds); concurrent requests for the same version share one build.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Sequence
+
+from .columnar import GuildTable
+
+# Discord rejects message content longer than this
+MAX_MESSAGE_CHARS = 2000
+# Longest display name rendered before truncation (keeps a full page under the limit)
+MAX_NAME_CHARS = 48
+# Rendered pages expire like cached display names (MEMBER_NAME_TTL)
+DEFAULT_PAGE_TTL = 600.0
+
+COMPANY = "company"
+DEPARTMENTS = "departments"
+
+# index row: (user_id, role, dept)
+Row = tuple[int, str, str]
+NameResolver = Callable[[list[int]], Awaitable[dict[int, Optional[str]]]]
+IndexBuilder = Callable[[str, GuildTable], Awaitable[Sequence[Row]]]
+
+
+def build_index(kind: str, registry: GuildTable) -> Sequence[Row]:
+    # Sorted by (role, dept, uid), or (dept, role, uid) for departments
+    return registry.ordered_rows(by_dept=kind == DEPARTMENTS)
+
+
+def _name(names: dict[int, Optional[str]], uid: int) -> str:
+    name = names.get(uid) or f"Unknown User ({uid})"
+    return name if len(name) <= MAX_NAME_CHARS else name[: MAX_NAME_CHARS - 1] + "…"
+
+
+def render_rows(kind: str, title: str, rows: list[Row], names: dict[int, Optional[str]], page: int, pages: int) -> str:
+    if kind == DEPARTMENTS:
+        lines = [f"🏢 **{title} — Departments:**"]
+        current = None
+        for uid, role, dept in rows:
+            if dept != current:
+                current = dept
+                lines.append(f"\n**{dept}:**")
+            lines.append(f"- {_name(names, uid)} — {role}")
+    else:
+        lines = [f"🏢 **{title} Company Members:**"]
+        for uid, role, dept in rows:
+            lines.append(f"- {_name(names, uid)}: {role} ({dept})")
+    if pages > 1:
+        lines.append(f"\nPage {page + 1}/{pages}")
+    text = "\n".join(lines)
+    if len(text) > MAX_MESSAGE_CHARS:
+        text = text[: MAX_MESSAGE_CHARS - 1] + "…"
+    return text
+
+
+class _Entry:
+    __slots__ = ("version", "rows", "pages")
+
+    def __init__(self, version: int, rows: Sequence[Row]):
+        self.version = version
+        self.rows = rows
+        # (page, title) -> (expires_at, text)
+        self.pages: dict[tuple[int, str], tuple[float, str]] = {}
+
+
+class ListingCache:
+    """Per-(guild, kind) sorted index plus rendered pages, LRU-bounded by guild count."""
+
+    def __init__(
+        self,
+        *,
+        page_size: int = 20,
+        max_entries: int = 512,
+        build: Optional[IndexBuilder] = None,
+        page_ttl: float = DEFAULT_PAGE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.page_size = max(1, int(page_size))
+        self.max_entries = max(1, int(max_entries))
+        self.page_ttl = float(page_ttl)
+        self._build = build
+        self._clock = clock
+        self._entries: OrderedDict[tuple[int, str], _Entry] = OrderedDict()
+        # (guild_id, kind, version) -> index build in progress
+        self._pending: dict[tuple[int, str, int], asyncio.Future] = {}
+
+    async def _entry(self, guild_id: int, kind: str, version: int, registry: GuildTable) -> _Entry:
+        key = (guild_id, kind)
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version:
+            if self._build is None:
+                entry = _Entry(version, build_index(kind, registry))
+            else:
+                rows = await self._shared_build(guild_id, kind, version, registry)
+                current = self._entries.get(key)
+                if current is not None and current.version == version:
+                    # Another request stored the same build (and maybe pages) meanwhile
+                    entry = current
+                else:
+                    entry = _Entry(version, rows)
+                    if current is not None and current.version > version:
+                        return entry  # don't replace a newer index; pages of this one aren't kept
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    async def _shared_build(self, guild_id: int, kind: str, version: int, registry: GuildTable) -> Sequence[Row]:
+        flight = (guild_id, kind, version)
+        future = self._pending.get(flight)
+        if future is None:
+            future = self._pending[flight] = asyncio.ensure_future(self._build(kind, registry))
+            future.add_done_callback(lambda _f: self._pending.pop(flight, None))
+        # Shielded: one request being cancelled must not cancel the shared build
+        return await asyncio.shield(future)
+
+    async def page(
+        self,
+        guild_id: int,
+        kind: str,
+        version: int,
+        registry: GuildTable,
+        page: int,
+        title: str,
+        resolve_names: NameResolver,
+    ) -> tuple[str, int, int, bool]:
+        """Return (text, page, pages, cached) with page clamped into range."""
+        entry = await self._entry(guild_id, kind, version, registry)
+        pages = max(1, -(-len(entry.rows) // self.page_size))
+        page = min(max(0, page), pages - 1)
+        cached = entry.pages.get((page, title))
+        if cached is not None:
+            if cached[0] > self._clock():
+                return cached[1], page, pages, True
+            del entry.pages[(page, title)]
+        rows = entry.rows[page * self.page_size:(page + 1) * self.page_size]
+        names = await resolve_names([uid for uid, _, _ in rows])
+        text = render_rows(kind, title, rows, names, page, pages)
+        # Only keep it if the registry didn't change while names were resolving, and
+        # every name resolved (a failed lookup shouldn't stick for the whole TTL)
+        if self._entries.get((guild_id, kind)) is entry and all(names.get(uid) for uid, _, _ in rows):
+            entry.pages[(page, title)] = (self._clock() + self.page_ttl, text)
+        return text, page, pages, False
+
+
+__all__ = [
+    "COMPANY",
+    "DEPARTMENTS",
+    "ListingCache",
+    "MAX_MESSAGE_CHARS",
+    "build_index",
+    "render_rows",
+]
@@ -0,0 +1,96 @@
+"""
+PersonaOCEAN rendered-result cache with single-flight builds
+
+Purpose
+- Keep the last rendered result per key (e.g. one guild's /summary in one mode)
+  for as long as its version (e.g. the guild's registry version) is unchanged, so
+  a repeated request costs one dict lookup
+- Let concurrent requests for the same key and version await one build instead of
+  each rebuilding the same result (single flight). This only matters for builds
+  that await (e.g. work on the offload pool): a build that never yields finishes
+  before another request can start, so its callers only ever see "hit" or "built"
+
+Builds are zero-argument coroutine functions and results are opaque, so this
+module has no discord import of its own. A failed build is not cached; everyone
+waiting on it gets the exception.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class RenderCache:
+    """One (version, value) per key, LRU-bounded by key count."""
+
+    def __init__(self, *, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max(1, int(max_entries))
+        self._entries: OrderedDict[Hashable, tuple[Hashable, Any]] = OrderedDict()
+        # (key, version) -> future of the build in progress
+        self._inflight: dict[tuple[Hashable, Hashable], asyncio.Future] = {}
+        self.stats = {"hits": 0, "builds": 0, "joined": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def peek(self, key: Hashable, version: Hashable) -> Any:
+        """The cached value for `key` at `version`, or None. Doesn't count as a hit."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    async def get(self, key: Hashable, version: Hashable, build: Callable[[], Awaitable[Any]]) -> tuple[Any, str]:
+        """Return (value, source) where source is "hit" (cached), "joined" (awaited a
+        build already running for the same key and version) or "built"."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1], "hit"
+        flight = (key, version)
+        future = self._inflight.get(flight)
+        if future is not None:
+            self.stats["joined"] += 1
+            try:
+                # Shielded: one waiter being cancelled must not cancel the shared build
+                return await asyncio.shield(future), "joined"
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The request running the build was cancelled: build it here instead
+                return await self.get(key, version, build)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight] = future
+        self.stats["builds"] += 1
+        try:
+            value = await build()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so an exception nobody joined isn't reported as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            # Last finished build wins; a late one for an outdated version costs the
+            # next request one rebuild, never a wrong answer (versions must match)
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value, "built"
+        finally:
+            if self._inflight.get(flight) is future:
+                del self._inflight[flight]
+
+
+__all__ = [
+    "RenderCache",
+]
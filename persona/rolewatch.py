@@ -0,0 +1,60 @@
+"""
+PersonaOCEAN roles file watcher
+
+Purpose
+- Detect edits to roles.yaml cheaply: stat (mtime, size) first, then a content hash
+- Ignore touches and rewrites that leave the content unchanged
+
+The caller decides what to do with a change (validate, compile, swap) and calls
+`accept()` once a version is live, so a rejected edit is reported only once.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Optional
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class FileWatcher:
+    def __init__(self, path: str):
+        self.path = path
+        self._stat: Optional[tuple[int, int]] = None
+        self.digest: Optional[str] = None
+        try:
+            self._stat = self._stat_key()
+            self.digest = file_digest(path)
+        except OSError:
+            pass
+
+    def _stat_key(self) -> tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def poll(self) -> Optional[str]:
+        """Return the new content digest if the file changed since the last poll, else None."""
+        try:
+            key = self._stat_key()
+        except OSError:
+            return None
+        if key == self._stat:
+            return None
+        self._stat = key
+        try:
+            digest = file_digest(self.path)
+        except OSError:
+            return None
+        return digest if digest != self.digest else None
+
+    def accept(self, digest: str) -> None:
+        self.digest = digest
+
+
+__all__ = [
+    "FileWatcher",
+    "file_digest",
+]
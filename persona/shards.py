@@ -0,0 +1,176 @@
+"""
+PersonaOCEAN shard layout
+
+Purpose
+- Describe which Discord gateway shards this process runs: all of them on one
+  connection (unsharded), all of them through AutoShardedClient, or a fixed range
+  out of SHARD_COUNT so several processes split the bot between them
+- Map a guild to its shard with Discord's formula, (guild_id >> 22) % shard_count,
+  so the registry, stores, snapshots and per-guild role files keep only the guilds
+  this process serves
+- Name per-process state files after the shard range, so processes sharing a
+  folder don't overwrite each other
+
+No discord import: main.py turns a ShardPlan into client keyword arguments.
+"""
+from __future__ import annotations
+
+import glob
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    return (int(guild_id) >> 22) % int(shard_count)
+
+
+def parse_shard_ids(spec: str, shard_count: int) -> tuple[int, ...]:
+    """Parse "0-3,7" into sorted shard ids, each in [0, shard_count)."""
+    ids: set[int] = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        try:
+            lo = int(first)
+            hi = int(last) if sep else lo
+        except ValueError:
+            raise ValueError(f"bad shard id range {part!r} in SHARD_IDS") from None
+        if lo > hi or lo < 0 or hi >= shard_count:
+            raise ValueError(f"shard ids {part!r} outside 0..{shard_count - 1}")
+        ids.update(range(lo, hi + 1))
+    if not ids:
+        raise ValueError("SHARD_IDS lists no shards")
+    return tuple(sorted(ids))
+
+
+@dataclass
+class ShardPlan:
+    """`sharded`: run AutoShardedClient. `count`: total shards (None until Discord's
+    recommended count is known in auto mode). `ids`: shards run by this process
+    (None: all of them)."""
+
+    sharded: bool = False
+    count: Optional[int] = 1
+    ids: Optional[tuple[int, ...]] = None
+
+    @property
+    def partial(self) -> bool:
+        """True if other processes run the remaining shards."""
+        return self.ids is not None and self.count is not None and len(self.ids) < self.count
+
+    def shard_of(self, guild_id: int) -> Optional[int]:
+        if not self.count:
+            return None
+        return shard_for(guild_id, self.count)
+
+    def owns(self, guild_id: int) -> bool:
+        return not self.partial or shard_for(guild_id, self.count) in self.ids
+
+    def owns_shard(self, shard_id: int) -> bool:
+        return self.ids is None or shard_id in self.ids
+
+    @property
+    def label(self) -> str:
+        """"all" or e.g. "0-3of8" / "0,2of8" (for logs and state file names)."""
+        if not self.partial:
+            return "all"
+        runs, start = [], self.ids[0]
+        for prev, cur in zip(self.ids, self.ids[1:] + (None,)):
+            if cur != prev + 1:
+                runs.append(f"{start}-{prev}" if prev != start else str(start))
+                start = cur
+        return f"{','.join(runs)}of{self.count}"
+
+    def client_kwargs(self) -> dict:
+        if not self.sharded:
+            return {}
+        kwargs: dict = {"shard_count": self.count}
+        if self.ids is not None:
+            kwargs["shard_ids"] = list(self.ids)
+        return kwargs
+
+    def state_path(self, path: str) -> str:
+        """`path` for a process running every shard, else with the shard range before
+        the extension: registry.snap -> registry.shards-0-3of8.snap."""
+        if not path or not self.partial:
+            return path
+        stem, ext = os.path.splitext(path)
+        return f"{stem}.shards-{self.label.replace(',', '_')}{ext}"
+
+    def sibling_state_paths(self, path: str) -> list[tuple[str, "ShardPlan"]]:
+        """Every existing state file for `path` under any shard layout (including the
+        unsharded one) with the layout that wrote it, newest first. Used to adopt
+        guilds after a layout change."""
+        stem, ext = os.path.splitext(path)
+        found = {}
+        for p in glob.glob(glob.escape(stem) + ".shards-*" + glob.escape(ext)):
+            plan = _plan_from_label(p[len(stem) + len(".shards-"):len(p) - len(ext)])
+            if plan is not None:
+                found[p] = plan
+        if os.path.exists(path):
+            found[path] = ShardPlan()
+        return sorted(found.items(), key=lambda item: os.path.getmtime(item[0]), reverse=True)
+
+    def superseded_state_paths(self, path: str) -> list[str]:
+        """Sibling state files of `path` whose every guild is owned by a newer file
+        (newer files of one layout cover all shards), so adoption never reads them."""
+        stale, newer = [], []
+        for p, plan in self.sibling_state_paths(path):
+            if _covers(newer):
+                stale.append(p)
+            else:
+                newer.append(plan)
+        return stale
+
+
+def _plan_from_label(label: str) -> Optional[ShardPlan]:
+    """Inverse of the state file label ("0-3of8", "0_2of8"); None if it isn't one."""
+    ids, sep, count = label.rpartition("of")
+    try:
+        return ShardPlan(sharded=True, count=int(count), ids=parse_shard_ids(ids.replace("_", ","), int(count))) if sep else None
+    except ValueError:
+        return None
+
+
+def _covers(plans: list[ShardPlan]) -> bool:
+    """True if the plans together own every guild: an unsharded one, or one shard
+    count whose ranges add up to all of its shards."""
+    by_count: dict[int, set[int]] = {}
+    for plan in plans:
+        if not plan.partial:
+            return True
+        by_count.setdefault(plan.count, set()).update(plan.ids)
+    return any(len(ids) == count for count, ids in by_count.items())
+
+
+def shard_plan(shard_count: str = "", shard_ids: str = "") -> ShardPlan:
+    """Plan from SHARD_COUNT ("" unsharded, "auto" or a number) and SHARD_IDS
+    (optional range like "0-3"; needs a numeric SHARD_COUNT)."""
+    shard_count = (shard_count or "").strip().lower()
+    shard_ids = (shard_ids or "").strip()
+    if not shard_count:
+        if shard_ids:
+            raise ValueError("SHARD_IDS needs SHARD_COUNT")
+        return ShardPlan()
+    if shard_count == "auto":
+        if shard_ids:
+            raise ValueError("SHARD_IDS needs a numeric SHARD_COUNT, not auto")
+        return ShardPlan(sharded=True, count=None)
+    try:
+        count = int(shard_count)
+    except ValueError:
+        raise ValueError(f"SHARD_COUNT must be a number or 'auto', got {shard_count!r}") from None
+    if count < 1:
+        raise ValueError("SHARD_COUNT must be at least 1")
+    ids = parse_shard_ids(shard_ids, count) if shard_ids else None
+    return ShardPlan(sharded=True, count=count, ids=ids)
+
+
+__all__ = [
+    "ShardPlan",
+    "parse_shard_ids",
+    "shard_for",
+    "shard_plan",
+]
@@ -0,0 +1,222 @@
+"""
+PersonaOCEAN binary registry snapshots
+
+Purpose
+- Save every GuildTable to one compact, versioned binary file with a CRC32 checksum
+- Load it back through mmap on startup, so a warm restart copies column arrays
+  instead of parsing text or replaying rows
+- Write atomically: stream to a temp file in the same directory, fsync, rename
+
+File layout (little-endian, sections 8-byte aligned):
+  header      magic "POCNSNAP", format version, facet width, guild count,
+              created_at, total rows, payload length, CRC32 of the payload
+  directory   per guild: guild_id i8, rows u8, facet rows u8, names length u8
+  names       per guild: UTF-8 JSON [role names, dept names] (code order)
+  columns     per guild: uids i8[n], traits u1[n×5], role codes u2[n],
+              dept codes u2[n], facet uids i8[f], facet values f8[f×width]
+
+`capture` copies the tables' live rows (cheap array copies, run it on the event
+loop); `write_snapshot` does the slow part and is safe to run in a thread.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from .columnar import TRAIT_KEYS, GuildTable
+
+MAGIC = b"POCNSNAP"
+FORMAT_VERSION = 1
+# magic, version, facet width, guild count, created_at, total rows, payload length, crc32
+_HEADER = struct.Struct("<8sHHIdQQI4x")
+_DIRECTORY = np.dtype([("guild_id", "<i8"), ("rows", "<u8"), ("facets", "<u8"), ("names", "<u8")])
+
+
+class SnapshotError(Exception):
+    """The snapshot file is truncated, corrupt or from an unknown format version."""
+
+
+@dataclass(frozen=True)
+class GuildSnapshot:
+    guild_id: int
+    uids: np.ndarray
+    traits: np.ndarray
+    role_codes: np.ndarray
+    dept_codes: np.ndarray
+    role_names: tuple[str, ...]
+    dept_names: tuple[str, ...]
+    facets: dict
+
+
+def capture(companies: dict[int, GuildTable]) -> list[GuildSnapshot]:
+    """Copy the live rows of every non-empty table (consistent per guild)."""
+    out = []
+    for gid, table in companies.items():
+        n = len(table)
+        if not n:
+            continue
+        out.append(GuildSnapshot(
+            int(gid),
+            table.uids[:n].copy(),
+            table.traits[:n].copy(),
+            table.role_codes[:n].copy(),
+            table.dept_codes[:n].copy(),
+            tuple(table.roles.names),
+            tuple(table.depts.names),
+            dict(table.facets),
+        ))
+    return out
+
+
+def _pad(n: int) -> int:
+    return -n % 8
+
+
+def write_snapshot(path: str, guilds: list[GuildSnapshot], facet_width: int) -> int:
+    """Atomically write a snapshot; returns the file size in bytes."""
+    directory = np.zeros(len(guilds), dtype=_DIRECTORY)
+    names_blobs = []
+    for i, g in enumerate(guilds):
+        blob = json.dumps([list(g.role_names), list(g.dept_names)], ensure_ascii=False).encode("utf-8")
+        names_blobs.append(blob)
+        directory[i] = (g.guild_id, len(g.uids), len(g.facets), len(blob))
+
+    def sections():
+        yield directory.tobytes()
+        yield from names_blobs
+        for g in guilds:
+            facet_uids = np.fromiter(g.facets.keys(), dtype="<i8", count=len(g.facets))
+            facet_values = np.array(list(g.facets.values()), dtype="<f8").reshape(len(g.facets), facet_width)
+            yield g.uids.astype("<i8", copy=False).tobytes()
+            yield g.traits.astype("u1", copy=False).tobytes()
+            yield g.role_codes.astype("<u2", copy=False).tobytes()
+            yield g.dept_codes.astype("<u2", copy=False).tobytes()
+            yield facet_uids.tobytes()
+            yield facet_values.tobytes()
+
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".snapshot-", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # Stream sections after a placeholder header, then fill in length and CRC
+            f.write(b"\0" * _HEADER.size)
+            crc = 0
+            length = 0
+            for data in sections():
+                for part in (data, b"\0" * _pad(len(data))):
+                    crc = zlib.crc32(part, crc)
+                    length += len(part)
+                    f.write(part)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, facet_width, len(guilds), time.time(),
+                                 sum(len(g.uids) for g in guilds), length, crc))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return _HEADER.size + length
+
+
+def read_snapshot(
+    path: str, facet_width: int, keep: Optional[Callable[[int], bool]] = None
+) -> tuple[dict[int, GuildTable], dict]:
+    """Map a snapshot file and rebuild its tables (only guilds `keep` accepts, if given).
+    Returns (companies, info) where info has format_version, created_at, guilds,
+    members and bytes for the whole file.
+    Raises FileNotFoundError if absent and SnapshotError if unusable.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            raise SnapshotError("file too short for a snapshot header")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        companies, info = _parse(mm, size, facet_width, keep)
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            pass  # a stray view still references the map; the GC will release it
+    return companies, info
+
+
+def _parse(mm: mmap.mmap, size: int, facet_width: int, keep) -> tuple[dict[int, GuildTable], dict]:
+    magic, version, width, guild_count, created, rows, length, crc = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise SnapshotError("not a PersonaOCEAN snapshot (bad magic)")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"unsupported snapshot format version {version}")
+    if width != facet_width:
+        raise SnapshotError(f"snapshot facet width {width} does not match {facet_width}")
+    if _HEADER.size + length != size:
+        raise SnapshotError("snapshot length does not match its header (truncated?)")
+    with memoryview(mm) as view:
+        actual = zlib.crc32(view[_HEADER.size:])
+    if actual != crc:
+        raise SnapshotError("snapshot checksum mismatch")
+
+    offset = _HEADER.size
+
+    def take(dtype, count: int) -> np.ndarray:
+        nonlocal offset
+        dtype = np.dtype(dtype)
+        arr = np.frombuffer(mm, dtype=dtype, count=count, offset=offset)
+        offset += dtype.itemsize * count
+        offset += _pad(offset)
+        return arr
+
+    directory = take(_DIRECTORY, guild_count)
+    names = []
+    for blob_len in directory["names"].tolist():
+        blob = bytes(mm[offset:offset + blob_len])
+        offset += blob_len + _pad(blob_len)
+        names.append(json.loads(blob.decode("utf-8")))
+
+    companies: dict[int, GuildTable] = {}
+    for (gid, n, f, _), (role_names, dept_names) in zip(directory.tolist(), names):
+        uids = take("<i8", n)
+        traits = take("u1", n * len(TRAIT_KEYS))
+        role_codes = take("<u2", n)
+        dept_codes = take("<u2", n)
+        facet_uids = take("<i8", f)
+        facet_values = take("<f8", f * width).reshape(f, width)
+        if keep is not None and not keep(gid):
+            # Skipped guilds only cost the offset arithmetic; nothing is copied
+            del uids, traits, role_codes, dept_codes, facet_uids, facet_values
+            continue
+        facets = dict(zip(facet_uids.tolist(), facet_values.tolist()))
+        companies[gid] = GuildTable.from_arrays(uids, traits, role_codes, dept_codes, role_names, dept_names, facets)
+        del uids, traits, role_codes, dept_codes, facet_uids, facet_values
+    del directory
+    info = {
+        "format_version": version,
+        "created_at": created,
+        "guilds": guild_count,
+        "members": rows,
+        "bytes": size,
+    }
+    return companies, info
+
+
+__all__ = [
+    "FORMAT_VERSION",
+    "GuildSnapshot",
+    "SnapshotError",
+    "capture",
+    "read_snapshot",
+    "write_snapshot",
+]
@@ -0,0 +1,314 @@
+"""
+PersonaOCEAN registry storage backends
+
+Purpose
+- Keep the per-guild registry durable across restarts without adding disk latency
+  to interaction handling
+- `MemoryStore`: no persistence (the historical behavior; data resets on restart)
+- `SQLiteStore`: SQLite in WAL mode with write-behind batching
+
+The bot always reads from its in-memory `companies` hot cache. Stores are only
+loaded once at startup and then fed writes: `put`/`delete` just enqueue, and a
+background writer thread drains the queue and applies each batch in a single
+transaction, so the event loop never waits on disk. A batch that fails to commit
+is kept and retried until it does; close() reports what is still unwritten.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+TRAIT_KEYS = ("O", "C", "E", "A", "N")
+
+# Registry shape: {guild_id: {user_id: {traits: {O,C,E,A,N}, role: str, dept: str[, facets: list]}}}
+Registry = dict[int, dict[int, dict]]
+
+
+class MemoryStore:
+    """No-op backend: the hot cache is the only copy."""
+
+    name = "memory"
+
+    def load(self, shard_count: Optional[int] = None, shard_ids: Optional[tuple[int, ...]] = None) -> Registry:
+        return {}
+
+    def put(self, guild_id: int, user_id: int, entry: dict) -> None:
+        pass
+
+    def delete(self, guild_id: int, user_id: int) -> None:
+        pass
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> int:
+        return 0
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    c INTEGER NOT NULL,
+    e INTEGER NOT NULL,
+    a INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    dept TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    facets TEXT,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID
+"""
+
+# Columns added after the first release; (name, DDL) applied to older databases on open
+_MIGRATIONS = (
+    ("facets", "ALTER TABLE profiles ADD COLUMN facets TEXT"),
+)
+
+_UPSERT = """
+INSERT INTO profiles (guild_id, user_id, o, c, e, a, n, role, dept, updated_at, facets)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (guild_id, user_id) DO UPDATE SET
+    o = excluded.o, c = excluded.c, e = excluded.e, a = excluded.a, n = excluded.n,
+    role = excluded.role, dept = excluded.dept, updated_at = excluded.updated_at,
+    facets = excluded.facets
+"""
+
+_DELETE = "DELETE FROM profiles WHERE guild_id = ? AND user_id = ?"
+
+# Sentinel that asks the writer thread to exit after draining
+_STOP = object()
+
+DEFAULT_MAX_QUEUE = 100_000
+# A failed commit is retried after base × 2^(failures - 1) seconds, capped
+RETRY_BACKOFF = 0.5
+MAX_RETRY_BACKOFF = 30.0
+# close() keeps retrying unwritten changes this long before giving up on them
+DEFAULT_CLOSE_TIMEOUT = 10.0
+
+
+class SQLiteStore:
+    """SQLite (WAL) backend with a write-behind queue.
+
+    Writes are coalesced per (guild_id, user_id) until they commit, so a burst of
+    /ocean re-runs by one member costs a single row write. A failed transaction
+    (disk full, database locked) keeps its changes and is retried with backoff;
+    writes queued meanwhile are merged in. The queue is bounded: when it is full
+    a write is dropped and reported through `on_drop` rather than blocking the
+    caller (the event loop).
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch_size: int = 500,
+        flush_interval: float = 0.25,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        on_error: Optional[Callable[[Exception, int], None]] = None,
+        on_drop: Optional[Callable[[int], None]] = None,
+    ):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.on_error = on_error
+        self.on_drop = on_drop
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._closed = False
+        # Writes dropped because the queue was full, and when that was last reported
+        self.dropped = 0
+        self._drop_reported = 0.0
+        # Changes the writer still holds when it exits (set by the writer thread)
+        self.unwritten = 0
+        self._close_deadline = 0.0
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(profiles)")}
+            for column, ddl in _MIGRATIONS:
+                if column not in columns:
+                    conn.execute(ddl)
+        self._thread = threading.Thread(target=self._writer, name="registry-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Startup ---
+    def load(self, shard_count: Optional[int] = None, shard_ids: Optional[tuple[int, ...]] = None) -> Registry:
+        """All stored profiles, or only guilds on `shard_ids` out of `shard_count`
+        (Discord's (guild_id >> 22) % shard_count) when several processes share the file."""
+        out: Registry = {}
+        query = "SELECT guild_id, user_id, o, c, e, a, n, role, dept, facets FROM profiles"
+        params: tuple = ()
+        if shard_count and shard_ids is not None:
+            query += f" WHERE ((guild_id >> 22) % ?) IN ({','.join('?' * len(shard_ids))})"
+            params = (int(shard_count), *(int(s) for s in shard_ids))
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params)
+            for gid, uid, o, c, e, a, n, role, dept, facets in rows:
+                entry = {
+                    "traits": {"O": o, "C": c, "E": e, "A": a, "N": n},
+                    "role": role,
+                    "dept": dept,
+                }
+                if facets:
+                    entry["facets"] = json.loads(facets)
+                out.setdefault(gid, {})[uid] = entry
+        finally:
+            conn.close()
+        return out
+
+    # --- Write-behind API (non-blocking) ---
+    def put(self, guild_id: int, user_id: int, entry: dict) -> None:
+        t = entry["traits"]
+        facets = entry.get("facets")
+        row = (
+            guild_id, user_id, *(int(t[k]) for k in TRAIT_KEYS), entry["role"], entry["dept"], time.time(),
+            json.dumps(facets) if facets is not None else None,
+        )
+        self._enqueue(("put", guild_id, user_id, row))
+
+    def delete(self, guild_id: int, user_id: int) -> None:
+        self._enqueue(("delete", guild_id, user_id, None))
+
+    def _enqueue(self, item: tuple) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            now = time.monotonic()
+            # Reported at most once a second, with the running total
+            if self.on_drop and now - self._drop_reported >= 1.0:
+                self._drop_reported = now
+                self.on_drop(self.dropped)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued write is committed (call from a thread, not the loop).
+        False if some are still unwritten after `timeout` (e.g. commits keep failing)."""
+        done = threading.Event()
+        self._queue.put(("flush", None, None, done), timeout=timeout)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = DEFAULT_CLOSE_TIMEOUT) -> int:
+        """Stop the writer after it commits what is queued, retrying failed commits for
+        up to `timeout` seconds. Returns the number of changes left unwritten."""
+        if self._closed:
+            return self.unwritten
+        self._closed = True
+        self._close_deadline = time.monotonic() + max(0.0, float(timeout))
+        self._queue.put(_STOP)
+        self._thread.join()
+        return self.unwritten
+
+    # --- Writer thread ---
+    def _take(self, pending: dict, waiters: list, timeout: Optional[float]) -> bool:
+        """Move queued writes into `pending` (latest per member) and flush requests into
+        `waiters`, waiting up to `timeout` (None: forever) for the first. True on stop."""
+        try:
+            first = self._queue.get(timeout=timeout) if timeout is None or timeout > 0 else self._queue.get_nowait()
+        except queue.Empty:
+            return False
+        items = [first]
+        if first is not _STOP and self.flush_interval and not pending:
+            # Give a burst a moment to accumulate into one transaction
+            time.sleep(self.flush_interval)
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        stop = False
+        for item in items:
+            if item is _STOP:
+                stop = True
+                continue
+            op, gid, uid, payload = item
+            if op == "flush":
+                waiters.append(payload)
+            else:
+                pending[(gid, uid)] = (op, payload)
+        return stop
+
+    def _writer(self) -> None:
+        conn = self._connect()
+        pending: dict[tuple[int, int], tuple] = {}
+        waiters: list[threading.Event] = []
+        failures = 0
+        retry_at = 0.0
+        stopping = False
+        try:
+            while True:
+                now = time.monotonic()
+                if stopping:
+                    timeout = 0.0
+                elif pending:
+                    timeout = max(0.0, retry_at - now)
+                else:
+                    timeout = None
+                if self._take(pending, waiters, timeout):
+                    stopping = True
+                now = time.monotonic()
+                if stopping and pending and now < retry_at:
+                    # Shutting down: one more attempt at the next retry or the deadline
+                    time.sleep(max(0.0, min(retry_at, self._close_deadline) - now))
+                    now = retry_at = time.monotonic()
+                if pending and now >= retry_at:
+                    try:
+                        self._apply(conn, pending)
+                    except Exception as e:
+                        failures += 1
+                        retry_at = now + min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** (failures - 1))
+                        if self.on_error:
+                            self.on_error(e, len(pending))
+                        if stopping and now >= self._close_deadline:
+                            while not self._queue.empty():
+                                self._take(pending, waiters, 0.0)
+                            self.unwritten = len(pending)
+                            return
+                        continue
+                    pending.clear()
+                    failures = 0
+                if not pending:
+                    # Everything queued before these requests is committed
+                    for w in waiters:
+                        w.set()
+                    waiters.clear()
+                    if stopping and self._queue.empty():
+                        return
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, pending: dict) -> None:
+        with conn:
+            conn.executemany(_UPSERT, [p for op, p in pending.values() if op == "put"])
+            conn.executemany(_DELETE, [k for k, (op, _) in pending.items() if op == "delete"])
+
+
+def open_store(backend: str, path: str, **kwargs):
+    """Build a store from a backend name ('memory' or 'sqlite')."""
+    backend = (backend or "memory").strip().lower()
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "sqlite":
+        return SQLiteStore(path, **kwargs)
+    raise ValueError(f"Unknown REGISTRY_BACKEND {backend!r}; expected 'memory' or 'sqlite'")
+
+
+__all__ = [
+    "MemoryStore",
+    "SQLiteStore",
+    "open_store",
+]
@@ -0,0 +1,255 @@
+"""
+PersonaOCEAN balanced team partitioning
+
+Purpose
+- Score groups with the /summary teamwork index (Curșeu et al. 2018): the
+  inverted U of the average E, A and C, plus a low-N stability bonus and a
+  mid-range O bonus, clamped to [0, 1]. Vectorized over any number of groups,
+  from their trait sums and sizes
+- Split members into k teams of equal size (±1) with every department spread
+  evenly (±1) across them, maximizing the weakest team's index:
+  1. greedy seeding: each department is dealt out in blocks (the most extreme
+     members first) that give every team the same number of members, and within
+     a block the currently weakest team picks the member that lifts it most
+  2. local search: swaps between the weakest team and each other team, between
+     members of the same department (so sizes and department mix never change).
+     A swap moves two teams' sums by ± the members' difference, so a whole
+     batch of candidate swaps is scored at once from the (k, 5) sums, and
+     applying one is O(1). Runs until no swap helps, the weakest team reaches the
+     ceiling (the index is concave, so no team can beat everyone's average
+     index), or the time budget is spent
+
+Pure numpy on plain arrays, so it can run on the offload pool. The search works
+on the unclamped index (teams above 1.0 still differ) and reports clamped values.
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+import numpy as np
+
+from .columnar import MAX_SCORE
+
+# Column order of the trait arrays (GuildTable.traits)
+O, C, E, A, N = range(5)
+
+DEFAULT_BUDGET = 0.8
+# Members per side sampled when scoring swaps between two big teams (256² pairs per batch)
+SWAP_SAMPLE = 256
+# Rounds in a row without an improving swap (with sampling) before giving up early
+PATIENCE = 8
+# Weight of the two swapped teams' own indexes next to the minimum, so swaps that
+# lift the weakest team still count while another team ties it
+TIE_WEIGHT = 1e-3
+EPS = 1e-12
+# Seeding deals each team at most one member per this many it already holds per
+# block, so blocks (and numpy calls) stay few while early picks are still one by one
+SEED_BATCH = 8
+# Close enough to the ceiling to stop searching (the embed shows two decimals)
+TOLERANCE = 1e-4
+
+
+def teamwork_index(sums: np.ndarray, counts, *, clip: bool = True) -> np.ndarray:
+    """Teamwork index of groups from their O,C,E,A,N sums (..., 5) and sizes (...)."""
+    x = np.asarray(sums, dtype=np.float64) / (np.asarray(counts, dtype=np.float64)[..., None] * MAX_SCORE)
+
+    def inverted_u(v):
+        # Peak at the middle of the scale, 0 at both ends
+        return 1 - 4 * (v - 0.5) ** 2
+
+    index = (inverted_u(x[..., E]) + inverted_u(x[..., A]) + inverted_u(x[..., C])) / 3
+    index = index + 0.1 * (1 - x[..., N]) + 0.05 * (1 - np.abs(x[..., O] - 0.5) * 2)
+    return np.clip(index, 0.0, 1.0) if clip else index
+
+
+def _swap_matrix(total: np.ndarray, count: int, out: np.ndarray, into: np.ndarray) -> np.ndarray:
+    """Unclamped index of a team (trait sums `total`, `count` members) after swapping
+    each row of `out` for each row of `into`, shape (len(out), len(into)). The inverted
+    U is quadratic in the average, so only its cross term is pairwise (a rank-3 product)."""
+    scale = count * MAX_SCORE
+    centre = total / scale - 0.5
+    xo, xi = out / scale, into / scale
+    cea = [C, E, A]
+    p = centre[cea] - xo[:, cea]
+    q = xi[:, cea]
+    squares = (p * p).sum(axis=1)[:, None] + (q * q).sum(axis=1)[None, :] + 2 * (p @ q.T)
+    index = 1 - 4 * squares / 3
+    index += 0.1 * (0.5 - centre[N] + xo[:, N][:, None] - xi[:, N][None, :])
+    index += 0.05 * (1 - 2 * np.abs(centre[O] - xo[:, O][:, None] + xi[:, O][None, :]))
+    return index
+
+
+def _seed(x: np.ndarray, depts: np.ndarray, k: int) -> np.ndarray:
+    n = len(x)
+    team_of = np.empty(n, dtype=np.int32)
+    sums = np.zeros((k, x.shape[1]))
+    counts = np.zeros(k, dtype=np.int64)
+    # Far from the middle on C, E, A (or high N) first, while every team can still take them
+    extremeness = np.abs(x[:, [C, E, A]] - MAX_SCORE / 2).sum(axis=1) + x[:, N]
+    codes, sizes = np.unique(depts, return_counts=True)
+    for code in codes[np.argsort(-sizes, kind="stable")]:
+        rows = np.flatnonzero(depts == code)
+        rows = rows[np.argsort(-extremeness[rows], kind="stable")]
+        start = 0
+        while start < len(rows):
+            # Each team takes one member per SEED_BATCH it already has from a block, all
+            # scored against the sums at the block's start (one numpy call per block)
+            per_team = max(1, int(counts.min()) // SEED_BATCH)
+            block = rows[start:start + k * per_team]
+            start += len(block)
+            # Only a department's last block is short: its extra members go to the
+            # smallest teams, keeping sizes and each department's spread within one
+            full, extra = divmod(len(block), k)
+            takes = np.full(k, full)
+            takes[np.argsort(counts, kind="stable")[:extra]] += 1
+            gain = teamwork_index(sums[:, None, :] + x[block][None, :, :], (counts + 1)[:, None], clip=False)
+            current = np.where(counts > 0, teamwork_index(sums, np.maximum(counts, 1), clip=False), -np.inf)
+            order = np.argsort(current, kind="stable").tolist()
+            for turn in range(int(takes.max())):
+                # Weakest team first, each picking the member that lifts it most
+                for team in order:
+                    if takes[team] > turn:
+                        pick = int(np.argmax(gain[team]))
+                        gain[:, pick] = -np.inf
+                        team_of[block[pick]] = team
+            np.add.at(sums, team_of[block], x[block])
+            counts += takes
+    return team_of
+
+
+def partition(
+    traits: np.ndarray,
+    depts: np.ndarray,
+    k: int,
+    *,
+    budget: float = DEFAULT_BUDGET,
+    seed: int = 0,
+    clock: Callable[[], float] = time.perf_counter,
+) -> tuple[np.ndarray, dict]:
+    """Split rows into k teams. Returns (team of each row, stats) where stats has the
+    seeded and final minimum index, swaps applied and why the search stopped."""
+    start = clock()
+    x = np.asarray(traits, dtype=np.float64)
+    depts = np.asarray(depts)
+    n = len(x)
+    if not 1 <= k <= n:
+        raise ValueError(f"need 1 <= k <= {n} members, got k={k}")
+    team_of = _seed(x, depts, k)
+    counts = np.bincount(team_of, minlength=k)
+    sums = np.zeros((k, x.shape[1]))
+    np.add.at(sums, team_of, x)
+    index = teamwork_index(sums, counts, clip=False)
+    seed_min = float(index.min())
+    # The index is concave in the team average, so no team split can lift the weakest
+    # team above the index of everyone together (or above the clamp at 1.0)
+    ceiling = min(1.0, float(teamwork_index(x.sum(axis=0), n, clip=False)))
+
+    # Team member lists with each row's position, for O(1) swaps
+    members = [np.flatnonzero(team_of == t) for t in range(k)]
+    pos = np.empty(n, dtype=np.int64)
+    for m in members:
+        pos[m] = np.arange(len(m))
+
+    rng = np.random.default_rng(seed)
+    deadline = start + max(0.0, budget)
+    swaps = rounds = stale = 0
+    stopped = "converged"
+    while k > 1:
+        if index.min() >= ceiling - TOLERANCE:
+            stopped = "ceiling"
+            break
+        if clock() >= deadline:
+            stopped = "budget"
+            break
+        rounds += 1
+        a = int(np.argmin(index))
+        sampled = False
+        applied = False
+        for b in np.argsort(-index, kind="stable"):
+            b = int(b)
+            if b == a:
+                continue
+            side_a, side_b = members[a], members[b]
+            if len(side_a) > SWAP_SAMPLE:
+                side_a, sampled = rng.choice(side_a, SWAP_SAMPLE, replace=False), True
+            if len(side_b) > SWAP_SAMPLE:
+                side_b, sampled = rng.choice(side_b, SWAP_SAMPLE, replace=False), True
+            same = depts[side_a][:, None] == depts[side_b][None, :]
+            if not same.any():
+                continue
+            # Swapping i (in a) with j (in b) moves x[j] - x[i] from b to a
+            new_a = _swap_matrix(sums[a], counts[a], x[side_a], x[side_b])
+            new_b = _swap_matrix(sums[b], counts[b], x[side_b], x[side_a]).T
+            rest = np.delete(index, [a, b]).min() if k > 2 else np.inf
+            score = np.minimum(np.minimum(new_a, new_b), rest) + TIE_WEIGHT * (new_a + new_b)
+            score[~same] = -np.inf
+            best = int(np.argmax(score))
+            if score.flat[best] <= index.min() + TIE_WEIGHT * (index[a] + index[b]) + EPS:
+                continue
+            i, j = np.unravel_index(best, score.shape)
+            ri, rj = int(side_a[i]), int(side_b[j])
+            d = x[rj] - x[ri]
+            sums[a] += d
+            sums[b] -= d
+            index[a] = new_a[i, j]
+            index[b] = new_b[i, j]
+            members[a][pos[ri]], members[b][pos[rj]] = rj, ri
+            pos[ri], pos[rj] = pos[rj], pos[ri]
+            team_of[ri], team_of[rj] = b, a
+            swaps += 1
+            applied = True
+            break
+        if applied:
+            stale = 0
+            continue
+        # Every pair was scored and none helps: a local optimum. With sampling, retry
+        # with fresh samples a few times
+        if not sampled:
+            break
+        stale += 1
+        if stale >= PATIENCE:
+            break
+    final = teamwork_index(sums, counts)
+    return team_of, {
+        "seed_min": round(min(1.0, max(0.0, seed_min)), 4),
+        "min": round(float(final.min()), 4),
+        "ceiling": round(max(0.0, ceiling), 4),
+        "swaps": swaps,
+        "rounds": rounds,
+        "stopped": stopped,
+        "elapsed_ms": round((clock() - start) * 1000, 1),
+    }
+
+
+def team_summaries(traits: np.ndarray, depts: np.ndarray, team_of: np.ndarray, k: int) -> list[dict]:
+    """Per team: rows, size, clamped index and {dept code: count}."""
+    x = np.asarray(traits, dtype=np.float64)
+    out = []
+    for t in range(k):
+        rows = np.flatnonzero(team_of == t)
+        codes, counts = np.unique(np.asarray(depts)[rows], return_counts=True)
+        out.append({
+            "rows": rows,
+            "size": len(rows),
+            "index": float(teamwork_index(x[rows].sum(axis=0), max(1, len(rows)))),
+            "depts": dict(zip(codes.tolist(), counts.tolist())),
+        })
+    return out
+
+
+def dept_spread(depts: np.ndarray, team_of: np.ndarray, k: int) -> int:
+    """Largest difference between two teams' counts of one department (0 or 1 when balanced)."""
+    table = np.zeros((int(np.max(depts)) + 1 if len(depts) else 1, k), dtype=np.int64)
+    np.add.at(table, (np.asarray(depts), team_of), 1)
+    present = table.sum(axis=1) > 0
+    return int((table.max(axis=1) - table.min(axis=1))[present].max()) if present.any() else 0
+
+
+__all__ = [
+    "DEFAULT_BUDGET",
+    "dept_spread",
+    "partition",
+    "team_summaries",
+    "teamwork_index",
+]
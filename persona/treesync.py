@@ -0,0 +1,77 @@
+"""
+PersonaOCEAN command tree sync fingerprints
+
+Purpose
+- Hash the slash command payloads discord.py would upload (names, descriptions,
+  parameters, choices, permissions) into one stable fingerprint
+- Remember the fingerprint last synced per application and scope (global or one
+  guild) in a small JSON file, so a restart skips the rate-limited bulk upsert
+  when the command tree hasn't changed
+
+Payloads are plain dicts (Command.to_dict(tree)), so this module has no discord
+import of its own.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+
+def tree_fingerprint(payloads: list[dict]) -> str:
+    """SHA-256 of the command payloads, independent of registration order and dict key order."""
+    canonical = sorted(payloads, key=lambda p: (p.get("type", 1), p.get("name", "")))
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def sync_key(application_id: int, guild_id: Optional[int] = None) -> str:
+    return f"{application_id}:{guild_id if guild_id is not None else 'global'}"
+
+
+class SyncState:
+    """Last synced fingerprint per sync_key, persisted as JSON at `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._synced: dict[str, str] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._synced = {str(k): str(v) for k, v in data.items()}
+        except (OSError, ValueError):
+            pass  # missing or unreadable: everything counts as never synced
+
+    def synced(self, key: str) -> Optional[str]:
+        return self._synced.get(key)
+
+    def record(self, key: str, fingerprint: str) -> bool:
+        """Remember a successful sync and write the file atomically. Returns False if
+        the file couldn't be written (the next start then just syncs again)."""
+        self._synced[key] = fingerprint
+        folder = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=".command-sync-", suffix=".json", dir=folder)
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._synced, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
+        return True
+
+
+__all__ = [
+    "SyncState",
+    "sync_key",
+    "tree_fingerprint",
+]
@@ -5,7 +5,7 @@ Checks:
 - Top-level 'roles' exists and is a mapping
 - Each role has 'pattern', 'dept', 'desc'
 - Pattern contains exactly keys O,C,E,A,N with numeric weights in [-1.0, 1.0]
-- Warns on obviously odd values (like all zeros)
+- Warns on obviously odd values (like all zeros) and unknown facet_pattern names
 
 Usage:
   python validate_roles.py
@@ -16,6 +16,8 @@ import math
 from pathlib import Path
 import yaml
 
+from persona.facets import facet_index
+
 ROLES_FILE = Path(__file__).with_name("roles.yaml")
 
 REQUIRED_KEYS = {"O", "C", "E", "A", "N"}
@@ -24,28 +26,31 @@ REQUIRED_KEYS = {"O", "C", "E", "A", "N"}
 MAX_FACET_KEY_LENGTH = 40
 
 # Optional facet support: accept a 'facet_pattern' mapping with numeric weights in [-1,1].
-# We do not enforce a global list of facet names here to remain non-breaking, but warn on suspicious keys.
-def _validate_facet_pattern(name: str, meta: dict) -> tuple[int, int]:
+# Unknown facet names only warn (to remain non-breaking); the matcher ignores them.
+def _validate_facet_pattern(name: str, meta: dict, out=None) -> tuple[int, int]:
     errors = 0
     warnings = 0
     facet_pat = meta.get("facet_pattern")
     if facet_pat is None:
         return errors, warnings
     if not isinstance(facet_pat, dict):
-        print(f"❌ Role '{name}' facet_pattern must be a mapping if present")
+        print(f"❌ Role '{name}' facet_pattern must be a mapping if present", file=out)
         return 1, warnings
     for fk, fv in facet_pat.items():
         if not is_number(fv):
-            print(f"❌ Role '{name}' facet_pattern '{fk}' must be numeric, got {type(fv).__name__}")
+            print(f"❌ Role '{name}' facet_pattern '{fk}' must be numeric, got {type(fv).__name__}", file=out)
             errors += 1
             continue
         vf = float(fv)
         if vf < -1.0 or vf > 1.0:
-            print(f"❌ Role '{name}' facet_pattern '{fk}' out of range [-1,1]: {vf}")
+            print(f"❌ Role '{name}' facet_pattern '{fk}' out of range [-1,1]: {vf}", file=out)
             errors += 1
         # Heuristic warning: unusually long facet key may indicate typos
         if isinstance(fk, str) and len(fk) > MAX_FACET_KEY_LENGTH:
-            print(f"⚠️  Role '{name}' facet key looks unusual (>{MAX_FACET_KEY_LENGTH} chars): {fk!r}")
+            print(f"⚠️  Role '{name}' facet key looks unusual (>{MAX_FACET_KEY_LENGTH} chars): {fk!r}", file=out)
+            warnings += 1
+        elif facet_index(fk) is None:
+            print(f"⚠️  Role '{name}' facet_pattern '{fk}' is not a known facet; it will be ignored", file=out)
             warnings += 1
     return errors, warnings
 
@@ -58,21 +63,26 @@ def is_number(x) -> bool:
         return False
 
 
-def validate_roles(path: Path) -> int:
+def validate_roles(path: Path, out=None) -> int:
+    """Validate a roles file; messages go to `out` (default: stdout). Returns an exit code."""
     if not path.exists():
-        print(f"❌ roles file not found: {path}")
+        print(f"❌ roles file not found: {path}", file=out)
         return 1
 
     with path.open("r", encoding="utf-8") as f:
         data = yaml.safe_load(f)
+    return validate_roles_data(data, out)
+
 
+def validate_roles_data(data, out=None) -> int:
+    """Validate already-parsed roles YAML (e.g. a guild upload); same checks and exit codes."""
     if not isinstance(data, dict) or "roles" not in data or not isinstance(data["roles"], dict):
-        print("❌ roles.yaml must contain a top-level 'roles' mapping")
+        print("❌ roles.yaml must contain a top-level 'roles' mapping", file=out)
         return 1
 
     roles = data["roles"]
     if not roles:
-        print("❌ roles.yaml contains no roles")
+        print("❌ roles.yaml contains no roles", file=out)
         return 1
 
     errors = 0
@@ -80,50 +90,50 @@ def validate_roles(path: Path) -> int:
 
     for name, meta in roles.items():
         if not isinstance(meta, dict):
-            print(f"❌ Role '{name}' must be a mapping")
+            print(f"❌ Role '{name}' must be a mapping", file=out)
             errors += 1
             continue
         for req in ("pattern", "dept", "desc"):
             if req not in meta:
-                print(f"❌ Role '{name}' missing key: {req}")
+                print(f"❌ Role '{name}' missing key: {req}", file=out)
                 errors += 1
         pattern = meta.get("pattern", {})
         if not isinstance(pattern, dict):
-            print(f"❌ Role '{name}' pattern must be a mapping")
+            print(f"❌ Role '{name}' pattern must be a mapping", file=out)
             errors += 1
             continue
         keys = set(pattern.keys())
         if keys != REQUIRED_KEYS:
-            print(f"❌ Role '{name}' pattern keys must be exactly {sorted(REQUIRED_KEYS)}, got {sorted(keys)}")
+            print(f"❌ Role '{name}' pattern keys must be exactly {sorted(REQUIRED_KEYS)}, got {sorted(keys)}", file=out)
             errors += 1
         # validate weights
         for k in REQUIRED_KEYS:
             v = pattern.get(k)
             if not is_number(v):
-                print(f"❌ Role '{name}' pattern '{k}' must be a number, got {type(v).__name__}")
+                print(f"❌ Role '{name}' pattern '{k}' must be a number, got {type(v).__name__}", file=out)
                 errors += 1
                 continue
             vf = float(v)
             if vf < -1.0 or vf > 1.0:
-                print(f"❌ Role '{name}' pattern '{k}' out of range [-1,1]: {vf}")
+                print(f"❌ Role '{name}' pattern '{k}' out of range [-1,1]: {vf}", file=out)
                 errors += 1
         # warn: all zeros
         if all(float(pattern.get(k, 0)) == 0.0 for k in REQUIRED_KEYS):
-            print(f"⚠️  Role '{name}' has all-zero weights; it will never match.")
+            print(f"⚠️  Role '{name}' has all-zero weights; it will never match.", file=out)
             warnings += 1
 
         # Optional facet_pattern checks (non-breaking)
-        e2, w2 = _validate_facet_pattern(name, meta)
+        e2, w2 = _validate_facet_pattern(name, meta, out)
         errors += e2
         warnings += w2
 
     if errors == 0:
-        print("✅ roles.yaml validation passed")
+        print("✅ roles.yaml validation passed", file=out)
         if warnings:
-            print(f"ℹ️  Completed with {warnings} warning(s)")
+            print(f"ℹ️  Completed with {warnings} warning(s)", file=out)
         return 0
     else:
-        print(f"❌ Validation failed with {errors} error(s) and {warnings} warning(s)")
+        print(f"❌ Validation failed with {errors} error(s) and {warnings} warning(s)", file=out)
         return 2
 
 